@@ -1,22 +1,37 @@
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core import passwords
+from app.core.cache import MISSING, TTLCache
 from app.core.config import settings
 from app.db.database import get_db
 from app.models.user import User, UserRole
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash when the stored one should be rehashed at the current cost)"""
+    try:
+        return passwords.verify_and_update(plain_password, hashed_password)
+    except passwords.PasswordHasherBusy:
+        raise _hasher_busy()
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    try:
+        return passwords.hash_password(password)
+    except passwords.PasswordHasherBusy:
+        raise _hasher_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -28,24 +43,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+def create_user_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """Access token whose claims identify the user, so requests can be authorised without a lookup"""
+    return create_access_token(
+        data={"sub": user.username, "uid": str(user.id), "role": user.role.value},
+        expires_delta=expires_delta
+    )
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Return the claims of a valid token"""
     try:
         payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
+        if payload.get("sub") is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
             )
-        return username
+        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(verify_token)) -> User:
-    user = db.query(User).filter(User.username == token).first()
+class AuthenticatedUser(NamedTuple):
+    """The fields authorisation needs; load the User row only where an endpoint needs more"""
+    id: uuid.UUID
+    username: str
+    role: UserRole
+
+# AuthenticatedUser (or None for deleted users) keyed by user id. Invalidated on
+# role, profile and account changes in this process; ttl bounds staleness across workers.
+user_cache = TTLCache(maxsize=settings.user_cache_max_entries, ttl=settings.user_cache_ttl_seconds)
+
+def invalidate_user(user_id) -> None:
+    user_cache.invalidate(str(user_id))
+
+def _load_authenticated_user(db: Session, criterion) -> Optional[AuthenticatedUser]:
+    row = db.query(User.id, User.username, User.role).filter(criterion).first()
+    return AuthenticatedUser(*row) if row is not None else None
+
+def get_authenticated_user(db: Session = Depends(get_db), claims: dict = Depends(verify_token)) -> AuthenticatedUser:
+    user_id = claims.get("uid")
+    if user_id is None:
+        # Tokens issued before claims carried the id
+        user = _load_authenticated_user(db, User.username == claims["sub"])
+    else:
+        user = user_cache.get(user_id)
+        if user is MISSING:
+            version = user_cache.begin()
+            try:
+                user = _load_authenticated_user(db, User.id == uuid.UUID(user_id))
+            except ValueError:
+                user = None
+            user_cache.set(user_id, user, version)
+
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,11 +105,24 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(verify_
         )
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: AuthenticatedUser = Depends(get_authenticated_user)) -> AuthenticatedUser:
     return current_user
 
+def get_current_user(
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user)
+) -> User:
+    """The full User row, for endpoints that read or change the profile"""
+    user = db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return user
+
 def require_role(required_role: UserRole):
-    def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+    def role_checker(current_user: AuthenticatedUser = Depends(get_current_active_user)) -> AuthenticatedUser:
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -67,7 +132,7 @@ def require_role(required_role: UserRole):
     return role_checker
 
 def require_roles(required_roles: list[UserRole]):
-    def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+    def role_checker(current_user: AuthenticatedUser = Depends(get_current_active_user)) -> AuthenticatedUser:
         if current_user.role not in required_roles:
             roles_str = ", ".join([role.value for role in required_roles])
             raise HTTPException(
@@ -81,6 +146,17 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     user = db.query(User).filter(User.username == username).first()
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+
+    # Don't hold a pooled connection while bcrypt runs
+    db.expunge(user)
+    db.rollback()
+
+    matches, new_hash = verify_password(password, user.password_hash)
+    if not matches:
         return None
-    return user
\ No newline at end of file
+    if new_hash is not None:
+        # The work factor changed since this password was set
+        db.query(User).filter(User.id == user.id).update({User.password_hash: new_hash}, synchronize_session=False)
+        db.commit()
+        user.password_hash = new_hash
+    return user
@@ -0,0 +1,60 @@
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class BodyTooLargeError(HTTPException):
+    # An HTTPException, so a route parsing the body answers 413 instead of "error parsing the body"
+    def __init__(self, max_body_size: int):
+        super().__init__(413, f"Request body too large. Maximum size is {max_body_size // (1024 * 1024)}MB")
+
+class BodySizeLimitMiddleware:
+    """
+    Refuse request bodies over `max_body_size` bytes with 413 before they are
+    spooled: at once when Content-Length declares more, otherwise (chunked
+    bodies, lying clients) as soon as that many bytes have been received.
+    Per-file limits of uploads are checked afterwards by file_service.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    def _too_large(self) -> JSONResponse:
+        error = BodyTooLargeError(self.max_body_size)
+        return JSONResponse({"detail": error.detail}, status_code=error.status_code)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise BodyTooLargeError(self.max_body_size)
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except BodyTooLargeError:
+            if response_started:
+                raise
+            await self._too_large()(scope, receive, send)
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Fills are versioned: call `begin()` before loading a value and pass the
+    returned version to `set()`. If the key was invalidated while the value
+    was being loaded, the (now stale) value is dropped instead of cached.
+    The cache is per process; `ttl` bounds staleness across workers.
+    With `max_bytes`, values must support len() and their total length is
+    bounded too; a value longer than that on its own is not cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_bytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._invalidated: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._version = 0
+        self._cleared_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def begin(self) -> int:
+        """Return the version to pass to set() for a value about to be loaded"""
+        with self._lock:
+            return self._version
+
+    def _size(self, value: Any) -> int:
+        return len(value) if self.max_bytes is not None else 0
+
+    def _remove(self, key: Hashable) -> None:
+        # Caller holds the lock
+        value, _ = self._entries.pop(key)
+        self._bytes -= self._size(value)
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if version is not None:
+                if version < self._cleared_version:
+                    return False
+                invalidated = self._invalidated.get(key)
+                if invalidated is not None and invalidated[0] > version:
+                    return False
+            size = self._size(value)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, now + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._version += 1
+            if key in self._entries:
+                self._remove(key)
+            self._invalidated[key] = (self._version, now)
+            self._invalidated.move_to_end(key)
+            self.invalidations += 1
+            # Loads outlive neither the TTL nor this window; older markers are useless
+            while self._invalidated:
+                oldest_key, (_, invalidated_at) = next(iter(self._invalidated.items()))
+                if now - invalidated_at <= self.ttl:
+                    break
+                del self._invalidated[oldest_key]
+
+    def invalidated_within(self, key: Hashable, seconds: float) -> bool:
+        """Whether `key` was invalidated in the last `seconds` (remembered for at most `ttl`)"""
+        with self._lock:
+            invalidated = self._invalidated.get(key)
+            return invalidated is not None and time.monotonic() - invalidated[1] <= seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._cleared_version = self._version
+            self._entries.clear()
+            self._bytes = 0
+            self._invalidated.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                **({"bytes": self._bytes, "max_bytes": self.max_bytes} if self.max_bytes is not None else {}),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,150 @@
+import zlib
+from typing import Optional
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Only text-like bodies are worth compressing; media and archives already are
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml", "image/svg+xml")
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ("br", "gzip"):
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31: deflate with a gzip header and trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            chunk = self._brotli.process(data)
+            return chunk + (self._brotli.finish() if final else self._brotli.flush())
+        chunk = self._zlib.compress(data)
+        return chunk + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip response compression, negotiated per request from
+    Accept-Encoding. Bodies below `minimum_size`, partial and not-modified
+    responses, and non-text content types are sent as they are. A 304 gets
+    the validators of the compressed 200 it revalidates.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        responder = _CompressingResponder(send, encoding, self, request_headers.get("if-none-match"))
+        await self.app(scope, receive, responder.send)
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: Optional[str], options: CompressionMiddleware, if_none_match: Optional[str]):
+        self._send = send
+        self.encoding = encoding
+        self.options = options
+        self.if_none_match = if_none_match
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        if self.start_message["status"] != 200:
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _weaken_etag(self, headers: MutableHeaders) -> None:
+        # The compressed body is a different representation: only weakly equal
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    def _set_encoding_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        self._weaken_etag(headers)
+
+    def _set_not_modified_headers(self, headers: MutableHeaders) -> None:
+        headers.add_vary_header("Accept-Encoding")
+        # A client revalidating with the strong tag holds an uncompressed 200 (small, or
+        # not compressible): its validator stays as it is
+        etag = headers.get("etag")
+        held = [tag.strip() for tag in (self.if_none_match or "").split(",")]
+        if etag not in held:
+            self._weaken_etag(headers)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if message["status"] == 304 and self.encoding is not None:
+                self._set_not_modified_headers(MutableHeaders(raw=message["headers"]))
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            eligible = self._eligible(headers)
+            if eligible:
+                # Shared caches must key compressible responses on Accept-Encoding
+                headers.add_vary_header("Accept-Encoding")
+            if not eligible or self.encoding is None or (not more_body and len(body) < self.options.minimum_size):
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.options.gzip_level, self.options.brotli_quality)
+            self._set_encoding_headers(headers)
+            if more_body:
+                # Streaming: the final length isn't known up front
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body, final=True)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(self.start_message)
+
+        await self._send({
+            "type": "http.response.body",
+            "body": self.compressor.compress(body, final=not more_body),
+            "more_body": more_body,
+        })
@@ -3,15 +3,111 @@ from typing import Optional
 
 class Settings(BaseSettings):
     database_url: str
+
+    # Connection pool, per engine (sync and async) and per worker process.
+    # Keep size + overflow at or above the 40-thread request threadpool.
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 10.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    # Server-side limit for any single statement
+    db_statement_timeout_ms: int = 30000
+    # Log requests over their @max_queries budget or running one statement this many times (development)
+    db_query_debug: bool = False
+    db_query_repeat_threshold: int = 3
+
+    # Optional read replica for public GET endpoints (any second Postgres works for local testing).
+    # After a write, that client reads from the primary for replica_sticky_seconds; the replica is
+    # skipped while its replay lag exceeds replica_max_lag_seconds (checked every interval).
+    database_replica_url: Optional[str] = None
+    replica_sticky_seconds: float = 5.0
+    replica_max_lag_seconds: float = 10.0
+    replica_lag_check_interval_seconds: float = 5.0
+
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
-    google_cloud_project: str
-    google_cloud_storage_bucket: str
+    # Only needed by the services that use them, checked when those are first used
+    google_cloud_project: Optional[str] = None
+    google_cloud_storage_bucket: Optional[str] = None
     google_application_credentials: Optional[str] = None
 
-    gemini_api_key: str
+    # Where uploads and QR codes are stored: "gcs" or "local" (served under /media)
+    storage_backend: str = "gcs"
+    storage_pool_size: int = 16
+    local_storage_path: str = "media"
+    local_storage_base_url: str = "http://localhost:8000/media"
+
+    gemini_api_key: Optional[str] = None
+
+    # Tour text search backend: "postgres" (tsvector + pg_trgm) or "memory".
+    # The memory index applies this process's commits at once and reloads from the database after the TTL.
+    search_backend: str = "postgres"
+    search_memory_index_ttl_seconds: float = 60.0
+
+    # Largest request body (bytes), i.e. all files of one upload; bigger ones get 413 before being spooled.
+    # Each file's own limit (file_service) is checked once the body is in.
+    max_request_body_bytes: int = 200 * 1024 * 1024
+
+    # Responses smaller than this (bytes) are sent uncompressed
+    compression_minimum_size: int = 1024
+
+    # Cache-Control max-age for public tour/POI reads (validated with ETags afterwards)
+    http_cache_max_age: int = 60
+
+    # In-process cache for the QR-scan endpoint GET /pois/{poi_id}
+    poi_cache_max_entries: int = 10000
+    poi_cache_ttl_seconds: int = 60
+
+    # Authenticated users (id, username, role) by id, so requests skip the users lookup.
+    # Role changes and deletions reach other workers after at most the TTL.
+    user_cache_max_entries: int = 10000
+    user_cache_ttl_seconds: int = 60
+
+    # bcrypt work factor; stored hashes at another cost are rehashed on next login
+    bcrypt_rounds: int = 12
+    # Processes running bcrypt, and calls allowed to wait for one before answering 503
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 8
+
+    # In-memory front of the Gemini enhancement cache (the table is unbounded)
+    enhancement_cache_max_entries: int = 5000
+    enhancement_cache_ttl_seconds: int = 86400
+
+    # Printable QR sheets (GET /tours/{tour_id}/qr-sheet)
+    qr_sheet_workers: int = 4
+    qr_sheet_cache_max_entries: int = 64
+    qr_sheet_cache_ttl_seconds: int = 3600
+
+    # Files of one multi-file upload request sent to storage in parallel
+    upload_concurrency: int = 4
+    # Processes resizing uploaded images into thumb/medium/full WebP variants
+    image_workers: int = 2
+
+    # Offline tour bundles (GET /tours/{tour_id}/bundle): full archives are streamed from
+    # storage, delta archives kept in memory up to this many entries and bytes per process
+    bundle_cache_max_entries: int = 16
+    bundle_cache_max_bytes: int = 64 * 1024 * 1024
+    bundle_cache_ttl_seconds: int = 3600
+    # A published tour's bundle is rebuilt this long after a content change, one build per burst of edits
+    bundle_rebuild_delay_seconds: float = 30.0
+
+    # Background job queue (see app.worker)
+    job_max_attempts: int = 5
+    job_backoff_base_seconds: float = 10.0
+    job_backoff_max_seconds: float = 3600.0
+    job_lease_seconds: int = 600
+    job_poll_interval_seconds: float = 1.0
+    # Every interval the worker deletes done jobs, and failed ones once older than the retention
+    job_sweep_interval_seconds: float = 300.0
+    job_failed_retention_days: int = 7
+    worker_processes: int = 2
+    # Jobs are mostly network-bound (Gemini, GCS); each process runs this many claim loops
+    worker_threads: int = 4
+    # Port for the job worker's Prometheus metrics (summed over its processes); unset: not served
+    worker_metrics_port: Optional[int] = None
 
     paypal_client_id: Optional[str] = None
     paypal_client_secret: Optional[str] = None
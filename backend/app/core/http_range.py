@@ -0,0 +1,100 @@
+import re
+from typing import Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Streamed bodies are read from their source in pieces of this size
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+
+def _parse_range(header: str, size: int) -> Optional[tuple]:
+    """
+    Return (start, end) inclusive for a single "bytes=" range, None when the
+    header should be ignored, or () when the range can't be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return ()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return ()
+    return start, end
+
+def _conditional_range(request: Request, size: int, headers: Dict[str, str]) -> Tuple[Optional[Response], Optional[tuple]]:
+    """
+    (304 or 416 response, None) when no body should be sent, otherwise
+    (None, (start, end)) for a partial body or (None, None) for the whole one.
+    """
+    quoted_etag = headers["ETag"]
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and quoted_etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers), None
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == quoted_etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range == ():
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers), None
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return None, byte_range
+    return None, None
+
+def ranged_response(
+    request: Request,
+    content: bytes,
+    media_type: str,
+    etag: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Serve `content` honouring If-None-Match and single-part Range / If-Range
+    requests, so clients can resume interrupted downloads.
+    """
+    headers = {**(headers or {}), "ETag": f'"{etag}"', "Accept-Ranges": "bytes"}
+    response, byte_range = _conditional_range(request, len(content), headers)
+    if response is not None:
+        return response
+    if byte_range is not None:
+        start, end = byte_range
+        return Response(content=content[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+def ranged_stream_response(
+    request: Request,
+    size: int,
+    read_range: Callable[[int, int], bytes],
+    media_type: str,
+    etag: str,
+    headers: Optional[Dict[str, str]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Response:
+    """
+    ranged_response for content that isn't in memory: `read_range(start, end)`
+    (inclusive) is called for one chunk at a time as the body is sent.
+    """
+    headers = {**(headers or {}), "ETag": f'"{etag}"', "Accept-Ranges": "bytes"}
+    response, byte_range = _conditional_range(request, size, headers)
+    if response is not None:
+        return response
+    start, end = byte_range if byte_range is not None else (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+
+    def chunks():
+        for offset in range(start, end + 1, chunk_size):
+            yield read_range(offset, min(offset + chunk_size, end + 1) - 1)
+
+    status_code = 206 if byte_range is not None else 200
+    return StreamingResponse(chunks(), status_code=status_code, media_type=media_type, headers=headers)
@@ -0,0 +1,200 @@
+"""
+Prometheus metrics: request latency per route, outbound dependency calls and
+SQL statements, served by GET /metrics.
+
+Values are per process. With several workers (uvicorn --workers, the job
+worker's processes) set PROMETHEUS_MULTIPROC_DIR to an empty directory shared
+by them, cleared before they start: every process then writes its values to
+its own file there and /metrics sums all of them, whichever worker serves it.
+"""
+import os
+import time
+from functools import wraps
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    start_http_server
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Route template ("/tours/{tour_id}") of the request being served; SQL run outside one is "background"
+current_route_template: ContextVar[str] = ContextVar("current_route_template", default="background")
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status code",
+    ["method", "route", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to send the full response",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being served",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+DEPENDENCY_DURATION = Histogram(
+    "dependency_call_duration_seconds", "Outbound calls (Gemini, storage, QR rendering) by outcome",
+    ["dependency", "operation", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+SQL_DURATION = Histogram(
+    "db_statement_duration_seconds", "SQL statements by engine and the route that ran them",
+    ["engine", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+ENHANCEMENT_CACHE_LOOKUPS = Counter(
+    "enhancement_cache_lookups_total", "Gemini enhancement cache lookups by result",
+    ["result"]  # memory_hit, db_hit, miss
+)
+ENHANCEMENT_GENERATIONS = Counter(
+    "enhancement_generations_total", "Enhancements generated by Gemini on a cache miss"
+)
+
+class track_dependency:
+    """
+    Time an outbound call, as a context manager or decorator:
+
+        with track_dependency("gemini", "generate_content"):
+            ...
+    """
+
+    def __init__(self, dependency: str, operation: str):
+        self.dependency = dependency
+        self.operation = operation
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "error" if exc_type is not None else "ok"
+        DEPENDENCY_DURATION.labels(self.dependency, self.operation, outcome).observe(
+            time.perf_counter() - self._started
+        )
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call: the decorated function may run on several threads at once
+            with track_dependency(self.dependency, self.operation):
+                return func(*args, **kwargs)
+        return wrapper
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Time every statement the engine runs (for async engines, pass .sync_engine)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        SQL_DURATION.labels(name, current_route_template.get()).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # after_cursor_execute doesn't run for failed statements
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+
+def _first_segment(path: str) -> str:
+    segment = path.lstrip("/").split("/", 1)[0]
+    return "*" if "{" in segment else segment
+
+class RouteIndex:
+    """
+    Route template for a request, matching only the routes that share its first
+    path segment (plus any starting with a parameter), in the router's order.
+    """
+
+    def __init__(self, routes):
+        self._routes = list(routes)
+        self._wildcard = [route for route in self._routes if _first_segment(route.path) == "*"]
+        self._by_segment = {}
+        for route in self._routes:
+            segment = _first_segment(route.path)
+            if segment != "*" and segment not in self._by_segment:
+                self._by_segment[segment] = [
+                    candidate for candidate in self._routes if _first_segment(candidate.path) in (segment, "*")
+                ]
+
+    def template(self, scope) -> str:
+        for route in self._by_segment.get(_first_segment(scope["path"]), self._wildcard):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Latency, status and in-flight count per route template (not raw path, to bound cardinality)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._index = None  # routes are all registered by the first request
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._index is None:
+            self._index = RouteIndex(scope["app"].router.routes)
+        method = scope["method"]
+        route = self._index.template(scope)
+        status = 500  # unless a response starts
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        token = current_route_template.set(route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.labels(method, route).observe(time.perf_counter() - started)
+            REQUESTS.labels(method, route, str(status)).inc()
+            in_progress.dec()
+            current_route_template.reset(token)
+
+def _registry() -> CollectorRegistry:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition-format body and content type, summed over all processes in multiprocess mode"""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+def sample_value(name: str, labels: Optional[Dict[str, str]] = None) -> float:
+    """Current value of a sample, summed over all processes in multiprocess mode (0 if never set)"""
+    return _registry().get_sample_value(name, labels or {}) or 0.0
+
+def mark_process_dead() -> None:
+    """Drop this process's in-flight gauges from the shared directory (on shutdown)"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+def serve_worker_metrics(port: int) -> None:
+    """Serve the summed metrics of every process from a background thread (job worker parent)"""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
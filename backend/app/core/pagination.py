@@ -0,0 +1,70 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(sort_by: str, order: str, sort_value: Any, row_id: Any) -> str:
+    """
+    Build an opaque keyset cursor from the last row of a page.
+    The sort key and direction are embedded so a cursor can't be replayed
+    against a differently ordered listing.
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_by, order, sort_value, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+def _datetime_value(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise _invalid_cursor()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise _invalid_cursor()
+
+def _number_value(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    # bool is an int subclass, and not a sort value
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise _invalid_cursor()
+    return float(value)
+
+# Sort key -> parser of the cursor's sort value (None for a row without one), rejecting other types
+CURSOR_VALUE_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "created_at": _datetime_value,
+    "average_rating": _number_value,
+    "relevance": _number_value,
+}
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, uuid.UUID]:
+    """Return (sort_value, row_id) from a cursor produced by encode_cursor, sort_value parsed for `sort_by`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort_by, cursor_order, sort_value, row_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        row_id = uuid.UUID(row_id)
+    except (ValueError, TypeError, AttributeError):
+        raise _invalid_cursor()
+
+    if cursor_sort_by != sort_by or cursor_order != order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match the requested sort order"
+        )
+
+    return CURSOR_VALUE_PARSERS[sort_by](sort_value), row_id
@@ -0,0 +1,74 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.core.config import settings
+
+class PasswordHasherBusy(Exception):
+    """Every worker is busy and the pending queue is full"""
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded API server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _slots = threading.BoundedSemaphore(settings.password_hash_workers + settings.password_hash_max_pending)
+        return _pool
+
+def shutdown_pool() -> None:
+    """Stop the worker processes, if any were started (application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+@lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    # Hashes at any other cost are verified, then flagged for rehashing
+    return CryptContext(
+        schemes=["bcrypt"],
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds
+    )
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+def _run(fn, *args):
+    """
+    Run bcrypt on the pool. The calling thread waits for the result, but
+    admission is bounded: past workers + max_pending in-flight calls we fail
+    fast instead of tying up more of the request threadpool.
+    """
+    pool = _get_pool()
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future: Future = pool.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password, settings.bcrypt_rounds)
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash) - new hash is set when the stored one uses a different work factor"""
+    return _run(_verify_and_update, password, hashed_password, settings.bcrypt_rounds)
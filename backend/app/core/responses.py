@@ -0,0 +1,58 @@
+import uuid
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type, Union, get_args, get_origin
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+def _default(value: Any) -> Any:
+    # asyncpg returns its own UUID subclass, which orjson doesn't serialise natively
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON rendered by orjson. UUIDs, datetimes (UTC as "Z", like pydantic)
+    and enums are serialised natively, so plain dicts of ORM values can be
+    returned without going through pydantic.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+def _nested_model(annotation) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """(schema, is_list) for fields holding response schemas, (None, False) otherwise"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        model, _ = _nested_model(get_args(annotation)[0])
+        return model, model is not None
+    if origin is Union:
+        for arg in get_args(annotation):
+            if arg is not type(None):
+                return _nested_model(arg)
+    return None, False
+
+@lru_cache(maxsize=None)
+def _field_plan(schema: Type[BaseModel]) -> Tuple[Tuple[str, Optional[Type[BaseModel]], bool], ...]:
+    return tuple(
+        (name, *_nested_model(field.annotation))
+        for name, field in schema.model_fields.items()
+    )
+
+def dump_trusted(schema: Type[BaseModel], obj: Any) -> dict:
+    """
+    Plain dict of `schema`'s fields read from an ORM object, without pydantic
+    validation. Only for our own rows, whose types already match the schema;
+    render with FastJSONResponse.
+    """
+    data = {}
+    for name, nested, is_list in _field_plan(schema):
+        value = getattr(obj, name)
+        if nested is not None and value is not None:
+            value = [dump_trusted(nested, item) for item in value] if is_list else dump_trusted(nested, value)
+        data[name] = value
+    return data
@@ -1,11 +1,71 @@
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.pool_monitor import PoolMonitor, TimedAsyncQueuePool, TimedQueuePool
+from app.db.query_tracker import track_queries
 
-engine = create_engine(settings.database_url)
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+engine = create_engine(
+    settings.database_url,
+    poolclass=TimedQueuePool,
+    connect_args={"options": f"-c statement_timeout={settings.db_statement_timeout_ms}"},
+    **_pool_options()
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _create_async_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        make_url(url).set(drivername="postgresql+asyncpg"),
+        poolclass=TimedAsyncQueuePool,
+        connect_args={"server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}},
+        **_pool_options()
+    )
+
+# Same database through asyncpg, for the public read endpoints (async def routes)
+async_engine = _create_async_engine(settings.database_url)
+# Reads only: nothing to expire, and expiring would mean lazy loads, which async sessions can't do
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replica, if configured; see app.db.replica for when it is used
+replica_engine: Optional[AsyncEngine] = None
+ReplicaSessionLocal: Optional[async_sessionmaker] = None
+if settings.database_replica_url:
+    replica_engine = _create_async_engine(settings.database_replica_url)
+    ReplicaSessionLocal = async_sessionmaker(
+        replica_engine, autoflush=False, expire_on_commit=False, info={"replica": True}
+    )
+
+sync_pool_monitor = PoolMonitor("sync")
+sync_pool_monitor.attach(engine)
+async_pool_monitor = PoolMonitor("async")
+async_pool_monitor.attach(async_engine.sync_engine)
+replica_pool_monitor = PoolMonitor("replica")
+if replica_engine is not None:
+    replica_pool_monitor.attach(replica_engine.sync_engine)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+if replica_engine is not None:
+    instrument_engine(replica_engine.sync_engine, "replica")
+
+track_queries(engine)
+track_queries(async_engine.sync_engine)
+if replica_engine is not None:
+    track_queries(replica_engine.sync_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +73,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_stats() -> dict:
+    stats = {
+        "sync": sync_pool_monitor.stats(engine.pool),
+        "async": async_pool_monitor.stats(async_engine.pool),
+    }
+    if replica_engine is not None:
+        stats["replica"] = replica_pool_monitor.stats(replica_engine.pool)
+    return stats
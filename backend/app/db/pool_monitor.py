@@ -0,0 +1,107 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# "METHOD /path" of the request being served, set by PoolRouteMiddleware
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+class PoolMonitor:
+    """
+    Counters for one engine's pool, fed by checkout/checkin events and by the
+    pool's own wait timing (see _TimedPool).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._held: Dict[int, Tuple[float, Optional[str]]] = {}
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.longest_hold: Tuple[float, Optional[str]] = (0.0, None)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def attach(self, engine: Engine) -> None:
+        pool = engine.pool
+        pool.monitor = self
+
+        @event.listens_for(pool, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+                if pool.overflow() > 0:
+                    self.overflow_checkouts += 1
+                self._held[id(connection_record)] = (time.monotonic(), current_route.get())
+
+        @event.listens_for(pool, "checkin")
+        def _checkin(dbapi_connection, connection_record):
+            with self._lock:
+                held = self._held.pop(id(connection_record), None)
+                if held is not None:
+                    duration = time.monotonic() - held[0]
+                    if duration > self.longest_hold[0]:
+                        self.longest_hold = (duration, held[1])
+
+    def stats(self, pool) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            oldest = min(self._held.values(), key=lambda held: held[0], default=None)
+            return {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "wait_seconds_avg": self.wait_total / self.checkouts if self.checkouts else 0.0,
+                "wait_seconds_max": self.wait_max,
+                "longest_held_now": {
+                    "seconds": now - oldest[0], "route": oldest[1]
+                } if oldest is not None else None,
+                "longest_held_ever": {
+                    "seconds": self.longest_hold[0], "route": self.longest_hold[1]
+                },
+            }
+
+class _TimedPool:
+    """Pool mixin measuring how long checkouts wait for a free connection"""
+    monitor: Optional[PoolMonitor] = None
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            if self.monitor is not None:
+                self.monitor.record_wait(time.monotonic() - started)
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+class PoolRouteMiddleware:
+    """Tag pool checkouts with the request that makes them"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_route.set(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class QueryTracker:
+    """SQL run on behalf of one request: count, time and how often each statement repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Parameterised statement text -> executions; the same text many times is an N+1 suspect
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return sorted(
+            ((statement, count) for statement, count in self.statements.items() if count >= threshold),
+            key=lambda item: item[1], reverse=True
+        )
+
+class RequestQueries(NamedTuple):
+    """What QueryTrackerMiddleware reports for each finished request"""
+    method: str
+    route: str
+    budget: Optional[int]
+    tracker: QueryTracker
+
+# Tracker of the request being served; copied into the threadpool for def routes
+current_tracker: ContextVar[Optional[QueryTracker]] = ContextVar("current_tracker", default=None)
+
+# Called with every finished request (see app.testing's query_budget fixture)
+_observers: List[Callable[[RequestQueries], None]] = []
+_observers_lock = threading.Lock()
+
+def add_observer(observer: Callable[[RequestQueries], None]) -> None:
+    with _observers_lock:
+        _observers.append(observer)
+
+def remove_observer(observer: Callable[[RequestQueries], None]) -> None:
+    with _observers_lock:
+        _observers.remove(observer)
+
+@contextmanager
+def untracked():
+    """Leave the statements run inside out of the request's count (e.g. periodic health checks)"""
+    token = current_tracker.set(None)
+    try:
+        yield
+    finally:
+        current_tracker.reset(token)
+
+def max_queries(budget: int):
+    """
+    Declare how many SQL statements a route may run per request:
+
+        @router.get("/{tour_id}")
+        @max_queries(2)
+        async def get_tour_details(...):
+    """
+    def decorate(endpoint):
+        endpoint.max_queries = budget
+        return endpoint
+    return decorate
+
+def track_queries(engine: Engine) -> None:
+    """Feed the current request's tracker (for async engines, pass .sync_engine)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if current_tracker.get() is not None:
+            conn.info.setdefault("query_tracker_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        tracker = current_tracker.get()
+        started = conn.info.get("query_tracker_started")
+        if tracker is not None and started:
+            tracker.record(statement, time.perf_counter() - started.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_tracker_started"):
+            connection.info["query_tracker_started"].pop()
+
+def _route_and_budget(scope) -> Tuple[str, Optional[int]]:
+    # Set by the router by the time the response starts
+    route = scope.get("route")
+    if route is None:
+        return scope["path"], None
+    return route.path, getattr(getattr(route, "endpoint", None), "max_queries", None)
+
+def _log_offenders(queries: RequestQueries) -> None:
+    tracker = queries.tracker
+    name = f"{queries.method} {queries.route}"
+    if queries.budget is not None and tracker.count > queries.budget:
+        logger.warning(f"{name} ran {tracker.count} queries, over its budget of {queries.budget}")
+    for statement, count in tracker.repeated(settings.db_query_repeat_threshold):
+        logger.warning(f"{name} ran the same statement {count} times (N+1?): {' '.join(statement.split())[:300]}")
+
+class QueryTrackerMiddleware:
+    """
+    Count and time the SQL of each request, report it in X-DB-Queries and
+    X-DB-Time (milliseconds) and, with db_query_debug, log routes over their
+    max_queries budget or repeating a statement.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker()
+
+        async def send_wrapper(message):
+            # Statements run while streaming the body aren't in the headers, only in the report below
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(tracker.count)
+                headers["X-DB-Time"] = f"{tracker.seconds * 1000:.1f}"
+            await send(message)
+
+        token = current_tracker.set(tracker)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_tracker.reset(token)
+            if settings.db_query_debug or _observers:
+                route, budget = _route_and_budget(scope)
+                queries = RequestQueries(scope["method"], route, budget, tracker)
+                if settings.db_query_debug:
+                    _log_offenders(queries)
+                with _observers_lock:
+                    observers = list(_observers)
+                for observer in observers:
+                    observer(queries)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import text
+from starlette.datastructures import MutableHeaders
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.db import database
+from app.db.query_tracker import untracked
+
+logger = logging.getLogger(__name__)
+
+# Set after a write; while present the client's reads go to the primary
+STICKY_COOKIE = "read_primary"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# WAL position the primary has flushed; the replica is current once it has replayed that far
+PRIMARY_LSN_SQL = text("SELECT pg_current_wal_flush_lsn()::text")
+
+# WAL position the standby has replayed: '' before it has replayed anything,
+# NULL for a second database that isn't a standby (local testing)
+REPLICA_LSN_SQL = text("""
+    SELECT CASE WHEN pg_is_in_recovery() THEN COALESCE(pg_last_wal_replay_lsn()::text, '') END
+""")
+
+# Primary positions still waited for; beyond this many the two oldest are merged
+LSN_HISTORY_SIZE = 1000
+
+def _parse_lsn(lsn: str) -> int:
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+# Token subjects that wrote recently, for clients that don't keep cookies (per process)
+recent_writers = TTLCache(maxsize=10000, ttl=settings.replica_sticky_seconds)
+
+def _token_subject(authorization: Optional[str]) -> Optional[str]:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        # Only picks a database; the token is verified wherever it authorises anything
+        claims = jwt.get_unverified_claims(authorization[7:])
+    except JWTError:
+        return None
+    return claims.get("uid") or claims.get("sub")
+
+class ReplicaLagMonitor:
+    """
+    Replica lag, measured at most once per interval by whichever request needs it.
+
+    The lag is how long the replica has been missing a primary WAL position:
+    each check notes when the primary's current position was first seen, and
+    the lag is the age of the oldest noted position the replica hasn't
+    replayed yet. A replica a few milliseconds behind a busy primary, or
+    behind a quiet one's checkpoint, stays usable; one whose replay or WAL
+    receiver has stopped falls behind as soon as the primary writes.
+    """
+
+    def __init__(self):
+        self.lag: Optional[float] = None  # None: unknown or unreachable
+        self.checked_at = -math.inf
+        self._lock: Optional[asyncio.Lock] = None
+        # (primary LSN, time.monotonic() when first seen), oldest first
+        self._waiting: Deque[Tuple[int, float]] = deque()
+
+    def _note_primary_lsn(self, lsn: int, now: float) -> None:
+        if not self._waiting or self._waiting[-1][0] < lsn:
+            self._waiting.append((lsn, now))
+        if len(self._waiting) > LSN_HISTORY_SIZE:
+            # Keep the older time for both: lag is overestimated, never under
+            _, first_seen = self._waiting.popleft()
+            lsn, _ = self._waiting.popleft()
+            self._waiting.appendleft((lsn, first_seen))
+
+    def _lag_after_replay(self, replay_lsn: Optional[int], now: float) -> float:
+        while self._waiting and replay_lsn is not None and self._waiting[0][0] <= replay_lsn:
+            self._waiting.popleft()
+        return now - self._waiting[0][1] if self._waiting else 0.0
+
+    async def usable(self) -> bool:
+        if time.monotonic() - self.checked_at >= settings.replica_lag_check_interval_seconds:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            if not self._lock.locked():
+                async with self._lock:
+                    await self._check()
+        return self.lag is not None and self.lag <= settings.replica_max_lag_seconds
+
+    async def _check(self) -> None:
+        try:
+            # Paid by whichever request comes first in the interval; not that route's queries
+            with untracked():
+                async with database.async_engine.connect() as primary:
+                    primary_lsn = await asyncio.wait_for(primary.scalar(PRIMARY_LSN_SQL), timeout=1.0)
+                async with database.replica_engine.connect() as replica:
+                    replay_lsn = await asyncio.wait_for(replica.scalar(REPLICA_LSN_SQL), timeout=1.0)
+            now = time.monotonic()
+            if replay_lsn is None:
+                # Not a standby: nothing to wait for
+                self._waiting.clear()
+                self.lag = 0.0
+            else:
+                self._note_primary_lsn(_parse_lsn(primary_lsn), now)
+                self.lag = self._lag_after_replay(_parse_lsn(replay_lsn) if replay_lsn else None, now)
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from the primary: {e}")
+            self.lag = None
+        self.checked_at = time.monotonic()
+        if self.lag is not None and self.lag > settings.replica_max_lag_seconds:
+            logger.warning(f"Replica is {self.lag:.1f}s behind, reading from the primary")
+
+    def stats(self) -> dict:
+        return {"lag_seconds": self.lag, "usable": self.lag is not None and self.lag <= settings.replica_max_lag_seconds}
+
+replica_lag = ReplicaLagMonitor()
+
+def _sticky(request: Request) -> bool:
+    if STICKY_COOKIE in request.cookies:
+        return True
+    subject = _token_subject(request.headers.get("authorization"))
+    return subject is not None and recent_writers.get(subject) is not MISSING
+
+async def get_read_db(request: Request):
+    """
+    Session for public reads: the replica when one is configured, is within
+    the lag limit and the client hasn't written recently; the primary otherwise.
+    """
+    session_factory = database.AsyncSessionLocal
+    if database.replica_engine is not None and not _sticky(request) and await replica_lag.usable():
+        session_factory = database.ReplicaSessionLocal
+    async with session_factory() as db:
+        yield db
+
+class StickyPrimaryMiddleware:
+    """
+    After a successful write, pin the client to the primary for
+    replica_sticky_seconds: by cookie (across workers) and by token subject.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or database.replica_engine is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                max_age = math.ceil(settings.replica_sticky_seconds)
+                headers.append("Set-Cookie", f"{STICKY_COOKIE}=1; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax")
+                subject = _token_subject(dict(scope["headers"]).get(b"authorization", b"").decode("latin-1"))
+                if subject is not None:
+                    recent_writers.set(subject, True)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,23 +1,63 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, users, tours, pois, uploads, ratings
-from app.db.database import engine
-from app.models import User, Tour, PointOfInterest, Multimedia, Rating, Tip
-
-# Create database tables
-User.metadata.create_all(bind=engine)
-Tour.metadata.create_all(bind=engine)
-PointOfInterest.metadata.create_all(bind=engine)
-Multimedia.metadata.create_all(bind=engine)
-Rating.metadata.create_all(bind=engine)
-Tip.metadata.create_all(bind=engine)
+from fastapi.staticfiles import StaticFiles
+from app.core.config import settings
+from app.core.body_limit import BodySizeLimitMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from app.core.responses import FastJSONResponse
+from app.routers import auth, users, tours, pois, uploads, ratings, admin
+from app.core import passwords
+from app.db.database import engine, async_engine, replica_engine
+from app.db.pool_monitor import PoolRouteMiddleware
+from app.db.query_tracker import QueryTrackerMiddleware
+from app.db.replica import StickyPrimaryMiddleware
+from app.services import image_service, qr_sheet_service
+
+# The schema is managed by Alembic (`alembic upgrade head`), not at import.
+# Nothing here connects to the database or external services: engines connect,
+# and the Gemini/GCS clients and process pools start, on first use.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    passwords.shutdown_pool()
+    image_service.shutdown_pool()
+    qr_sheet_service.shutdown_pool()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    engine.dispose()
+    mark_process_dead()
 
 app = FastAPI(
     title="QR Tour Guide API",
     description="API for self-guided tour application with QR codes",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
+# Brotli/gzip for JSON responses, negotiated per request
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+# Clients that just wrote read from the primary, not the replica, for a few seconds
+app.add_middleware(StickyPrimaryMiddleware)
+
+# Lets pool instrumentation name the request holding each connection
+app.add_middleware(PoolRouteMiddleware)
+
+# X-DB-Queries / X-DB-Time on every response; N+1 warnings with DB_QUERY_DEBUG
+app.add_middleware(QueryTrackerMiddleware)
+
+# Request latency, status and in-flight count per route, for GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Oversized uploads are refused before they are spooled to disk
+app.add_middleware(BodySizeLimitMiddleware, max_body_size=settings.max_request_body_bytes)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +74,12 @@ app.include_router(tours.router)
 app.include_router(pois.router)
 app.include_router(uploads.router)
 app.include_router(ratings.router)
+app.include_router(admin.router)
+
+# Serve uploaded files when they are stored on local disk
+if settings.storage_backend == "local":
+    os.makedirs(settings.local_storage_path, exist_ok=True)
+    app.mount("/media", StaticFiles(directory=settings.local_storage_path), name="media")
 
 @app.get("/")
 def read_root():
@@ -41,4 +87,9 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
\ No newline at end of file
@@ -4,5 +4,8 @@ from .point_of_interest import PointOfInterest
 from .multimedia import Multimedia
 from .rating import Rating
 from .tip import Tip
+from .job import Job
+from .enhancement_cache import EnhancementCacheEntry
+from .tour_bundle import TourBundle
 
-__all__ = ["User", "Tour", "PointOfInterest", "Multimedia", "Rating", "Tip"]
\ No newline at end of file
+__all__ = ["User", "Tour", "PointOfInterest", "Multimedia", "Rating", "Tip", "Job", "EnhancementCacheEntry", "TourBundle"]
\ No newline at end of file
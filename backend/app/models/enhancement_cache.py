@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class EnhancementCacheEntry(Base):
+    __tablename__ = "enhancement_cache"
+
+    # sha256 of (model, prompt version, title, raw description, city, country, category)
+    key = Column(String(64), primary_key=True)
+    model_name = Column(String, nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    enhanced_description = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
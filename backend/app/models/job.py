@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, Enum, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+import uuid
+import enum
+from app.db.database import Base
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    kind = Column(String, nullable=False)  # Handler name, see app.services.job_queue
+    payload = Column(JSONB, nullable=False, default=dict)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Workers claim runnable jobs oldest first; finished jobs stay out of the index until swept
+        Index(
+            "idx_jobs_active_status_run_at", "status", "run_at",
+            postgresql_where=text("status IN ('QUEUED', 'RUNNING')")
+        ),
+    )
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -18,7 +18,13 @@ class Multimedia(Base):
     file_url = Column(String, nullable=False)
     file_type = Column(Enum(FileType), nullable=False)
     caption = Column(String, nullable=True)
+    # Resized WebP copies of images: {"thumb"|"medium"|"full": {"url", "width", "height"}}
+    variants = Column(JSONB, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
-    poi = relationship("PointOfInterest", back_populates="multimedia")
\ No newline at end of file
+    poi = relationship("PointOfInterest", back_populates="multimedia")
+
+    __table_args__ = (
+        Index("idx_multimedia_poi_id", "poi_id"),
+    )
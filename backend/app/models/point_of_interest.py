@@ -1,10 +1,16 @@
-from sqlalchemy import Column, String, Text, Float, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Float, Integer, DateTime, ForeignKey, Index, Enum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
+import enum
 from app.db.database import Base
 
+class EnhancementStatus(enum.Enum):
+    PENDING = "pending"
+    ENHANCED = "enhanced"
+    FAILED = "failed"
+
 class PointOfInterest(Base):
     __tablename__ = "points_of_interest"
 
@@ -13,13 +19,22 @@ class PointOfInterest(Base):
     title = Column(String, nullable=False)
     description_raw = Column(Text, nullable=False)
     description_ai_enhanced = Column(Text, nullable=True)
+    enhancement_status = Column(Enum(EnhancementStatus), default=EnhancementStatus.PENDING, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     qr_code_url = Column(String, nullable=True, unique=True)
     order_in_tour = Column(Integer, nullable=False)
+    geohash = Column(String(12), nullable=True)  # Maintained by app.services.geo_service
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     tour = relationship("Tour", back_populates="points_of_interest")
-    multimedia = relationship("Multimedia", back_populates="poi", cascade="all, delete-orphan")
\ No newline at end of file
+    multimedia = relationship("Multimedia", back_populates="poi", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("idx_poi_tour_id", "tour_id"),
+        Index("idx_poi_coordinates", "latitude", "longitude"),
+        # Prefix (LIKE 'abc%') lookups for the nearby search
+        Index("idx_poi_geohash", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}),
+    )
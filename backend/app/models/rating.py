@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, UniqueConstraint, CheckConstraint, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -17,4 +17,14 @@ class Rating(Base):
 
     # Relationships
     tour = relationship("Tour", back_populates="ratings")
-    user = relationship("User", back_populates="ratings")
\ No newline at end of file
+    user = relationship("User", back_populates="ratings")
+
+    __table_args__ = (
+        # One rating per user and tour; re-rating updates it
+        UniqueConstraint("tour_id", "user_id", name="ratings_tour_id_user_id_key"),
+        CheckConstraint("rating >= 1 AND rating <= 5", name="ratings_rating_check"),
+        # Keyset pagination indexes for the newest-first listings
+        Index("idx_ratings_tour_created_at", "tour_id", "created_at", "id"),
+        Index("idx_ratings_tour_commented", "tour_id", "created_at", "id", postgresql_where=text("comment <> ''")),
+        Index("idx_ratings_user_created_at", "user_id", "created_at", "id"),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -31,4 +31,10 @@ class Tip(Base):
 
     # Relationships
     tour = relationship("Tour", back_populates="tips")
-    giver = relationship("User", back_populates="tips_given")
\ No newline at end of file
+    giver = relationship("User", back_populates="tips_given")
+
+    __table_args__ = (
+        Index("idx_tips_tour_id", "tour_id"),
+        Index("idx_tips_giver_user_id", "giver_user_id"),
+        Index("idx_tips_status", "status"),
+    )
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Text, Integer, Boolean, Float, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Integer, Boolean, Float, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import uuid
 from app.db.database import Base
@@ -20,11 +20,39 @@ class Tour(Base):
     is_published = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Set explicitly on edits of the tour's content (details, POIs, media), never by rating writes:
+    # the version of the offline bundle, QR sheet and POI list caches
+    content_updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     average_rating = Column(Float, default=0.0)
     total_ratings = Column(Integer, default=0)
+    # Rating aggregates, maintained incrementally by app.services.rating_service
+    rating_sum = Column(Integer, default=0, nullable=False)
+    rating_count_1 = Column(Integer, default=0, nullable=False)
+    rating_count_2 = Column(Integer, default=0, nullable=False)
+    rating_count_3 = Column(Integer, default=0, nullable=False)
+    rating_count_4 = Column(Integer, default=0, nullable=False)
+    rating_count_5 = Column(Integer, default=0, nullable=False)
+
+    # Search columns, maintained by app.services.search_service on every write
+    city_key = Column(String, nullable=True, index=True)
+    country_key = Column(String, nullable=True, index=True)
+    category_key = Column(String, nullable=True, index=True)
+    search_document = deferred(Column(Text, nullable=True))
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
 
     # Relationships
     guide = relationship("User", back_populates="tours")
     points_of_interest = relationship("PointOfInterest", back_populates="tour", cascade="all, delete-orphan")
     ratings = relationship("Rating", back_populates="tour", cascade="all, delete-orphan")
-    tips = relationship("Tip", back_populates="tour", cascade="all, delete-orphan")
\ No newline at end of file
+    tips = relationship("Tip", back_populates="tour", cascade="all, delete-orphan")
+    bundles = relationship("TourBundle", back_populates="tour", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("idx_tours_guide_id", "guide_id"),
+        Index("idx_tours_is_published", "is_published"),
+        # Keyset pagination indexes for the public browse listing
+        Index("idx_tours_published_created_at", "created_at", "id", postgresql_where=text("is_published")),
+        Index("idx_tours_published_rating", "average_rating", "id", postgresql_where=text("is_published")),
+        Index("idx_tours_search_vector", "search_vector", postgresql_using="gin"),
+        # The pg_trgm index on search_document is created by migration 0001, as it needs the extension
+    )
\ No newline at end of file
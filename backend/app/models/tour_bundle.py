@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import uuid
+from app.db.database import Base
+
+class TourBundle(Base):
+    """An offline download archive of a tour, see app.services.bundle_service"""
+    __tablename__ = "tour_bundles"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    tour_id = Column(UUID(as_uuid=True), ForeignKey("tours.id"), nullable=False)
+    version = Column(String, nullable=False)  # Content version of the tour it was built from
+    content_hash = Column(String(64), nullable=False)
+    size = Column(Integer, nullable=False)
+    file_url = Column(String, nullable=False)
+    files = Column(JSONB, nullable=False)  # {archive path: sha256}, used to build deltas
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    tour = relationship("Tour", back_populates="bundles")
+
+    __table_args__ = (
+        UniqueConstraint("tour_id", "version", name="uq_tour_bundles_tour_version"),
+        Index("idx_tour_bundles_tour_hash", "tour_id", "content_hash"),
+    )
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from app.core.auth import AuthenticatedUser, require_roles
+from app.db.database import pool_stats, replica_engine
+from app.db.replica import replica_lag
+from app.models.user import UserRole
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/db/pool")
+def get_db_pool_stats(
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
+):
+    """Connection pool usage of this worker process: in use, overflow, checkout waits, longest holds"""
+    return pool_stats()
+
+@router.get("/db/replica")
+def get_db_replica_status(
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
+):
+    """Whether public reads currently go to the replica, and its last measured lag"""
+    return {"configured": replica_engine is not None, **replica_lag.stats()}
@@ -1,18 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import insert, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List
+import uuid
 from app.db.database import get_db
-from app.core.auth import get_current_active_user, require_roles
-from app.models.user import User, UserRole
+from app.db.replica import get_read_db
+from app.db.query_tracker import max_queries
+from app.core.auth import AuthenticatedUser, get_current_active_user, require_roles
+from app.models.user import UserRole
 from app.models.tour import Tour
-from app.models.point_of_interest import PointOfInterest
-from app.schemas.point_of_interest import POICreate, POIUpdate, POIResponse
-from app.services.gemini_service import enhance_poi_description
-from app.services.qr_service import generate_poi_qr_code
+from app.models.point_of_interest import PointOfInterest, EnhancementStatus
+from app.schemas.point_of_interest import POICreate, POIUpdate, POIResponse, POIBatchItemResult, NearbyPOIResponse
+from app.services.poi_jobs import ENHANCE_POI, GENERATE_POI_QR, queue_poi_enhancement, queue_poi_qr_code
+from app.services.job_queue import enqueue_jobs
+from app.services.qr_sheet_service import sheet_cache, render_qr_sheet, pages_to_pdf
+from app.core.cache import MISSING
+from app.core.http_cache import make_etag, cache_headers, is_not_modified, not_modified
+from app.core.responses import FastJSONResponse, dump_trusted
+from app.services.poi_cache import poi_cache, get_published_poi_payload, invalidate_poi
+from app.services.enhancement_cache import enhancement_cache_stats, enhancement_key, get_cached_enhancements
+from app.services.geo_service import MAX_NEARBY_RADIUS_M, nearby_criterion, distance_expression, encode_geohash
+from app.services.bundle_service import queue_tour_bundle_rebuild
 
 router = APIRouter(tags=["points_of_interest"])
 
-def check_tour_ownership(tour_id: str, current_user: User, db: Session) -> Tour:
+MAX_POI_BATCH_SIZE = 200
+
+def check_tour_ownership(tour_id: str, current_user: AuthenticatedUser, db: Session) -> Tour:
     """Helper function to check if user owns the tour or is admin"""
     tour = db.query(Tour).filter(Tour.id == tour_id).first()
     if not tour:
@@ -34,7 +49,7 @@ def create_poi(
     tour_id: str,
     poi: POICreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     tour = check_tour_ownership(tour_id, current_user, db)
 
@@ -44,35 +59,94 @@ def create_poi(
         tour_id=tour_id
     )
 
-    # Generate AI-enhanced description
-    enhanced_description = enhance_poi_description(
-        title=poi.title,
-        raw_description=poi.description_raw,
-        city=tour.city,
-        country=tour.country,
-        category=tour.category
-    )
-    db_poi.description_ai_enhanced = enhanced_description
-
     db.add(db_poi)
     db.flush()  # Get the POI ID without committing
 
-    # Generate QR code
-    qr_code_url = generate_poi_qr_code(tour_id, str(db_poi.id))
-    if qr_code_url:
-        db_poi.qr_code_url = qr_code_url
+    # AI enhancement and QR code generation run on the job queue (app.worker)
+    queue_poi_enhancement(db, db_poi, tour)
+    queue_poi_qr_code(db, db_poi)
 
+    # The tour's POI list changed: bump its version for conditional GETs
+    tour.content_updated_at = func.now()
+    queue_tour_bundle_rebuild(db, tour)
     db.commit()
     db.refresh(db_poi)
     return db_poi
 
+@router.post("/tours/{tour_id}/pois:batch", response_model=List[POIBatchItemResult])
+def create_pois_batch(
+    tour_id: str,
+    pois: List[POICreate],
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+):
+    """
+    Create many POIs of a tour at once. Valid items are inserted with a single
+    multi-row INSERT; enhancement and QR jobs are queued with one INSERT each
+    and processed in parallel by the job workers. Returns one result per item.
+    """
+    if len(pois) > MAX_POI_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_POI_BATCH_SIZE} POIs per batch"
+        )
+
+    tour = check_tour_ownership(tour_id, current_user, db)
+
+    # Inputs enhanced before are answered from the cache in one lookup
+    keys = [
+        enhancement_key(poi.title, poi.description_raw, tour.city, tour.country, tour.category)
+        for poi in pois
+    ]
+    cached = get_cached_enhancements(db, keys)
+
+    results = []
+    rows = []
+    enhance_payloads = []
+    qr_payloads = []
+    for index, (poi, key) in enumerate(zip(pois, keys)):
+        if not -90 <= poi.latitude <= 90 or not -180 <= poi.longitude <= 180:
+            results.append(POIBatchItemResult(index=index, status="error", error="Coordinates out of range"))
+            continue
+
+        poi_id = uuid.uuid4()
+        enhanced_description = cached.get(key)
+        enhancement_status = EnhancementStatus.ENHANCED if enhanced_description else EnhancementStatus.PENDING
+        rows.append({
+            **poi.dict(),
+            "id": poi_id,
+            "tour_id": tour.id,
+            "geohash": encode_geohash(poi.latitude, poi.longitude),
+            "description_ai_enhanced": enhanced_description,
+            "enhancement_status": enhancement_status,
+        })
+        if enhanced_description is None:
+            enhance_payloads.append({"poi_id": str(poi_id), "description_raw": poi.description_raw})
+        qr_payloads.append({"tour_id": str(tour.id), "poi_id": str(poi_id)})
+        results.append(POIBatchItemResult(
+            index=index,
+            status="created",
+            id=poi_id,
+            enhancement_status=enhancement_status
+        ))
+
+    if rows:
+        db.execute(insert(PointOfInterest).values(rows))
+        enqueue_jobs(db, ENHANCE_POI, enhance_payloads)
+        enqueue_jobs(db, GENERATE_POI_QR, qr_payloads)
+        tour.content_updated_at = func.now()
+        queue_tour_bundle_rebuild(db, tour)
+        db.commit()
+
+    return results
+
 @router.put("/tours/{tour_id}/pois/{poi_id}", response_model=POIResponse)
 def update_poi(
     tour_id: str,
     poi_id: str,
     poi_update: POIUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     tour = check_tour_ownership(tour_id, current_user, db)
 
@@ -96,18 +170,14 @@ def update_poi(
             description_changed = True
         setattr(poi, field, value)
 
-    # Re-generate AI description if raw description changed
+    # Re-generate AI description in the background if raw description changed
     if description_changed:
-        enhanced_description = enhance_poi_description(
-            title=poi.title,
-            raw_description=poi.description_raw,
-            city=tour.city,
-            country=tour.country,
-            category=tour.category
-        )
-        poi.description_ai_enhanced = enhanced_description
+        queue_poi_enhancement(db, poi, tour)
+    if update_data:
+        queue_tour_bundle_rebuild(db, tour)
 
     db.commit()
+    invalidate_poi(poi.id)
     db.refresh(poi)
     return poi
 
@@ -116,7 +186,7 @@ def delete_poi(
     tour_id: str,
     poi_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     tour = check_tour_ownership(tour_id, current_user, db)
 
@@ -132,55 +202,176 @@ def delete_poi(
         )
 
     db.delete(poi)
+    tour.content_updated_at = func.now()
+    queue_tour_bundle_rebuild(db, tour)
     db.commit()
+    invalidate_poi(poi_id)
     return {"message": "POI deleted successfully"}
 
 @router.get("/tours/{tour_id}/pois", response_model=List[POIResponse])
-def list_tour_pois(
+@max_queries(3)
+async def list_tour_pois(
     tour_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
 ):
+    # Version lookup first: tour flag and timestamps plus POI aggregates in one statement
+    version = (await db.execute(
+        select(
+            Tour.is_published,
+            Tour.content_updated_at,
+            func.count(PointOfInterest.id),
+            func.max(PointOfInterest.updated_at)
+        ).outerjoin(PointOfInterest, PointOfInterest.tour_id == Tour.id).where(
+            Tour.id == tour_id
+        ).group_by(Tour.id)
+    )).first()
+
     # Check if tour exists and is published (for public access)
-    tour = db.query(Tour).filter(Tour.id == tour_id).first()
-    if not tour:
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tour not found"
         )
 
-    if not tour.is_published:
+    is_published, content_updated_at, poi_count, last_poi_update = version
+    if not is_published:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tour not available"
         )
 
-    pois = db.query(PointOfInterest).filter(
-        PointOfInterest.tour_id == tour_id
-    ).order_by(PointOfInterest.order_in_tour).all()
+    last_modified = max(filter(None, (content_updated_at, last_poi_update)))
+    headers = cache_headers(make_etag("tour-pois", tour_id, content_updated_at, poi_count, last_poi_update), last_modified)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified(headers)
+
+    pois = (await db.scalars(
+        select(PointOfInterest).options(selectinload(PointOfInterest.multimedia)).where(
+            PointOfInterest.tour_id == tour_id
+        ).order_by(PointOfInterest.order_in_tour)
+    )).all()
+
+    return FastJSONResponse([dump_trusted(POIResponse, poi) for poi in pois], headers=headers)
+
+@router.get("/tours/{tour_id}/qr-sheet")
+def get_tour_qr_sheet(
+    tour_id: str,
+    format: str = Query("pdf", pattern="^(pdf|png)$", description="pdf (all pages) or png (one page)"),
+    page: int = Query(1, ge=1, description="Page number for png output"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+):
+    """Printable sheet with every POI QR code of a tour, with order numbers and titles"""
+    tour = check_tour_ownership(tour_id, current_user, db)
+
+    # Sheets are cached per content version of the tour and its POIs
+    poi_count, last_poi_update = db.query(
+        func.count(PointOfInterest.id), func.max(PointOfInterest.updated_at)
+    ).filter(PointOfInterest.tour_id == tour.id).one()
+    version = f"{tour.content_updated_at}:{poi_count}:{last_poi_update}"
+
+    pages_key = (str(tour.id), version, "pages")
+    pages = sheet_cache.get(pages_key)
+    if pages is MISSING:
+        pois = db.query(PointOfInterest.id, PointOfInterest.order_in_tour, PointOfInterest.title).filter(
+            PointOfInterest.tour_id == tour.id
+        ).order_by(PointOfInterest.order_in_tour).all()
+        pages = render_qr_sheet(str(tour.id), tour.title, [(str(poi_id), order, title) for poi_id, order, title in pois])
+        sheet_cache.set(pages_key, pages)
+
+    if format == "png":
+        if page > len(pages):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Page not found"
+            )
+        return Response(content=pages[page - 1], media_type="image/png")
+
+    pdf_key = (str(tour.id), version, "pdf")
+    content = sheet_cache.get(pdf_key)
+    if content is MISSING:
+        content = pages_to_pdf(pages)
+        sheet_cache.set(pdf_key, content)
+
+    return Response(
+        content=content,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="tour-{tour.id}-qr-sheet.pdf"'}
+    )
+
+@router.get("/pois/nearby", response_model=List[NearbyPOIResponse])
+@max_queries(1)
+async def list_nearby_pois(
+    lat: float = Query(..., ge=-90, le=90, description="Visitor latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Visitor longitude"),
+    radius_m: float = Query(1000, gt=0, le=MAX_NEARBY_RADIUS_M, description="Search radius in metres"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    POIs of published tours around a location, nearest first.
+    Candidates come from the geohash/bounding-box index; exact haversine
+    distance is only computed for those.
+    """
+    distance = distance_expression(lat, lon)
+    rows = (await db.execute(
+        select(
+            PointOfInterest.id,
+            PointOfInterest.tour_id,
+            Tour.title.label("tour_title"),
+            PointOfInterest.title,
+            PointOfInterest.latitude,
+            PointOfInterest.longitude,
+            PointOfInterest.order_in_tour,
+            distance.label("distance_m")
+        ).join(
+            Tour, Tour.id == PointOfInterest.tour_id
+        ).where(
+            Tour.is_published == True,
+            nearby_criterion(lat, lon, radius_m),
+            distance <= radius_m
+        ).order_by(distance, PointOfInterest.id).limit(limit)
+    )).all()
+
+    # Rows are trusted: build the NearbyPOIResponse shape directly, no pydantic round trip
+    return FastJSONResponse([row._asdict() for row in rows])
 
-    return pois
+@router.get("/pois/cache/stats")
+def get_poi_cache_stats(
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
+):
+    """Hit/miss counters of the QR-scan POI cache"""
+    return poi_cache.stats()
+
+@router.get("/pois/enhancement-cache/stats")
+def get_enhancement_cache_stats(
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
+):
+    """Hit-rate statistics of the Gemini enhancement cache, across the API and job workers"""
+    return enhancement_cache_stats(db)
 
 @router.get("/pois/{poi_id}", response_model=POIResponse)
-def get_poi_content(
+@max_queries(1)
+async def get_poi_content(
     poi_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get detailed POI content - this is the endpoint accessed by QR codes.
+    Served from an in-process read-through cache of the serialised response.
     """
-    poi = db.query(PointOfInterest).filter(PointOfInterest.id == poi_id).first()
-    if not poi:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="POI not found"
-        )
-
-    # Check if the tour is published
-    tour = db.query(Tour).filter(Tour.id == poi.tour_id).first()
-    if not tour or not tour.is_published:
+    cached = await get_published_poi_payload(db, poi_id)
+    if cached is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="POI not available"
         )
 
-    return poi
\ No newline at end of file
+    headers = cache_headers(make_etag("poi", poi_id, cached.updated_at), cached.updated_at)
+    if is_not_modified(request, headers["ETag"], cached.updated_at):
+        return not_modified(headers)
+
+    return Response(content=cached.payload, media_type="application/json", headers=headers)
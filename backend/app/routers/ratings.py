@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+from typing import List, Optional
 from app.db.database import get_db
-from app.core.auth import get_current_active_user, require_roles
-from app.models.user import User, UserRole
+from app.db.replica import get_read_db
+from app.db.query_tracker import max_queries
+from app.core.auth import AuthenticatedUser, get_current_active_user, require_roles
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+)
+from app.core.http_cache import make_etag, cache_headers, is_not_modified, not_modified
+from app.core.responses import FastJSONResponse, dump_trusted
+from app.models.user import UserRole
 from app.models.tour import Tour
 from app.models.rating import Rating
-from app.schemas.rating import RatingCreate, RatingResponse
+from app.schemas.rating import RatingCreate, RatingResponse, RatingPage, RatingSummary
+from app.services.job_queue import enqueue_job
+from app.services.rating_service import RECOMPUTE_RATING_AGGREGATES, rating_distribution, submit_rating
 
 router = APIRouter(tags=["ratings"])
 
@@ -16,7 +26,7 @@ def create_rating(
     tour_id: str,
     rating_data: RatingCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.VISITOR, UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.VISITOR, UserRole.GUIDE, UserRole.ADMIN]))
 ):
     """Submit a rating for a tour"""
 
@@ -48,51 +58,59 @@ def create_rating(
             detail="Rating must be between 1 and 5"
         )
 
-    # Check if user already rated this tour
-    existing_rating = db.query(Rating).filter(
-        Rating.tour_id == tour_id,
-        Rating.user_id == current_user.id
-    ).first()
-
-    if existing_rating:
-        # Update existing rating
-        existing_rating.rating = rating_data.rating
-        existing_rating.comment = rating_data.comment
-        db.commit()
-        db.refresh(existing_rating)
-        rating = existing_rating
-    else:
-        # Create new rating
-        rating = Rating(
-            tour_id=tour_id,
-            user_id=current_user.id,
-            rating=rating_data.rating,
-            comment=rating_data.comment
-        )
-        db.add(rating)
-        db.commit()
-        db.refresh(rating)
+    # Insert or re-rate and adjust the tour's aggregates in one transaction
+    rating = submit_rating(db, tour.id, current_user.id, rating_data.rating, rating_data.comment)
+    db.commit()
+    db.refresh(rating)
 
-    # Update tour's average rating and total ratings
-    ratings_query = db.query(Rating).filter(Rating.tour_id == tour_id)
-    total_ratings = ratings_query.count()
-    average_rating = ratings_query.with_entities(func.avg(Rating.rating)).scalar()
+    return rating
 
-    tour.total_ratings = total_ratings
-    tour.average_rating = float(average_rating) if average_rating else 0.0
+@router.post("/admin/ratings/recompute")
+def recompute_ratings(
+    tour_ids: Optional[List[str]] = Body(None, embed=True),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
+):
+    """Queue a job that rebuilds rating aggregates from the ratings table (all tours by default)"""
+    job = enqueue_job(db, RECOMPUTE_RATING_AGGREGATES, {"tour_ids": tour_ids})
     db.commit()
+    return {"message": "Rating aggregates recompute queued", "job_id": str(job.id)}
 
-    return rating
+def _ratings_page_query(query, cursor: Optional[str], limit: int):
+    """Newest-first keyset page of ratings, with id as tie-breaker"""
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, "created_at", "desc")
+        query = query.where(tuple_(Rating.created_at, Rating.id) < tuple_(created_at, last_id))
+
+    # Fetch one extra row to know whether there is a next page
+    return query.order_by(Rating.created_at.desc(), Rating.id.desc()).limit(limit + 1)
+
+def _ratings_page(ratings: List[Rating], limit: int) -> FastJSONResponse:
+    has_more = len(ratings) > limit
+    ratings = ratings[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor("created_at", "desc", ratings[-1].created_at, ratings[-1].id)
+
+    return FastJSONResponse({
+        "items": [dump_trusted(RatingResponse, rating) for rating in ratings],
+        "next_cursor": next_cursor
+    })
 
-@router.get("/tours/{tour_id}/ratings", response_model=List[RatingResponse])
-def get_tour_ratings(
+@router.get("/tours/{tour_id}/ratings", response_model=RatingPage)
+@max_queries(2)
+async def get_tour_ratings(
     tour_id: str,
-    db: Session = Depends(get_db)
+    with_comment: bool = Query(False, description="Only ratings with a written comment"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all ratings for a tour"""
+    """Get a tour's ratings, newest first"""
 
     # Check if tour exists and is published
-    tour = db.query(Tour).filter(Tour.id == tour_id).first()
+    tour = (await db.execute(select(Tour.is_published).where(Tour.id == tour_id))).first()
     if not tour:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,14 +123,49 @@ def get_tour_ratings(
             detail="Tour not available"
         )
 
-    ratings = db.query(Rating).filter(Rating.tour_id == tour_id).all()
-    return ratings
+    query = select(Rating).where(Rating.tour_id == tour_id)
+    if with_comment:
+        # Same predicate as the partial index idx_ratings_tour_commented
+        query = query.where(Rating.comment != "")
+    ratings = (await db.scalars(_ratings_page_query(query, cursor, limit))).all()
+    return _ratings_page(ratings, limit)
+
+@router.get("/tours/{tour_id}/ratings/summary", response_model=RatingSummary)
+@max_queries(1)
+async def get_tour_rating_summary(
+    tour_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Star distribution and average from the tour's stored aggregates"""
+    tour = (await db.execute(select(Tour).where(Tour.id == tour_id))).scalar()
+    if not tour or not tour.is_published:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tour not found"
+        )
+
+    distribution = rating_distribution(tour)
+    headers = cache_headers(make_etag(tour.id, tour.total_ratings, tour.rating_sum, *distribution.values()))
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+
+    return FastJSONResponse({
+        "tour_id": tour.id,
+        "total_ratings": tour.total_ratings or 0,
+        "average_rating": tour.average_rating or 0.0,
+        "distribution": distribution
+    }, headers=headers)
 
-@router.get("/users/me/ratings", response_model=List[RatingResponse])
+@router.get("/users/me/ratings", response_model=RatingPage)
+@max_queries(2)
 def get_my_ratings(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
 ):
-    """Get all ratings submitted by current user"""
-    ratings = db.query(Rating).filter(Rating.user_id == current_user.id).all()
-    return ratings
\ No newline at end of file
+    """Get ratings submitted by current user, newest first"""
+    query = select(Rating).where(Rating.user_id == current_user.id)
+    ratings = db.scalars(_ratings_page_query(query, cursor, limit)).all()
+    return _ratings_page(ratings, limit)
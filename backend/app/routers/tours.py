@@ -1,12 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, asc, select, tuple_, func
 from typing import List, Optional
 from app.db.database import get_db
-from app.core.auth import get_current_active_user, require_roles
+from app.db.replica import get_read_db
+from app.db.query_tracker import max_queries
+from app.core.auth import AuthenticatedUser, get_current_active_user, require_roles
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+)
 from app.models.user import User, UserRole
 from app.models.tour import Tour
-from app.schemas.tour import TourCreate, TourUpdate, TourResponse, TourListResponse
+from app.models.point_of_interest import PointOfInterest
+from app.models.tour_bundle import TourBundle
+from app.core.http_range import ranged_response, ranged_stream_response
+from app.core.http_cache import make_etag, cache_headers, is_not_modified, not_modified
+from app.core.responses import FastJSONResponse
+from app.services.bundle_service import (
+    BUNDLE_BUILD_RETRY_SECONDS, get_current_bundle, get_latest_bundle, read_bundle_range, build_delta_archive,
+    queue_tour_bundle, queue_tour_bundle_rebuild
+)
+from app.services.search_service import build_tour_search, normalize_text
+from app.services.poi_cache import invalidate_poi, invalidate_tour_pois
+from app.services.geo_service import MAX_NEARBY_RADIUS_M, nearby_criterion, distance_expression
+from app.schemas.tour import TourCreate, TourUpdate, TourResponse, TourListPage, NearbyTourResponse
 
 router = APIRouter(prefix="/tours", tags=["tours"])
 
@@ -14,7 +32,7 @@ router = APIRouter(prefix="/tours", tags=["tours"])
 def create_tour(
     tour: TourCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     db_tour = Tour(
         **tour.dict(),
@@ -26,9 +44,10 @@ def create_tour(
     return db_tour
 
 @router.get("/my-tours", response_model=List[TourResponse])
+@max_queries(2)
 def get_my_tours(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     tours = db.query(Tour).filter(Tour.guide_id == current_user.id).all()
     return tours
@@ -38,7 +57,7 @@ def update_tour(
     tour_id: str,
     tour_update: TourUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     tour = db.query(Tour).filter(Tour.id == tour_id).first()
     if not tour:
@@ -58,6 +77,9 @@ def update_tour(
     update_data = tour_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(tour, field, value)
+    if update_data:
+        tour.content_updated_at = func.now()
+        queue_tour_bundle_rebuild(db, tour)
 
     db.commit()
     db.refresh(tour)
@@ -67,9 +89,12 @@ def update_tour(
 def delete_tour(
     tour_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
-    tour = db.query(Tour).filter(Tour.id == tour_id).first()
+    # The delete cascade visits every POI's multimedia; load it up front, not per POI
+    tour = db.query(Tour).options(
+        selectinload(Tour.points_of_interest).selectinload(PointOfInterest.multimedia)
+    ).filter(Tour.id == tour_id).first()
     if not tour:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -83,55 +108,133 @@ def delete_tour(
             detail="Not authorized to delete this tour"
         )
 
+    poi_ids = [poi.id for poi in tour.points_of_interest]
     db.delete(tour)
     db.commit()
+    for poi_id in poi_ids:
+        invalidate_poi(poi_id)
     return {"message": "Tour deleted successfully"}
 
 # Public endpoints for visitors
-@router.get("/", response_model=List[TourListResponse])
-def list_published_tours(
+@router.get("/", response_model=TourListPage)
+@max_queries(1)
+async def list_published_tours(
     city: Optional[str] = Query(None, description="Filter by city"),
     country: Optional[str] = Query(None, description="Filter by country"),
     guide_id: Optional[str] = Query(None, description="Filter by guide ID"),
     category: Optional[str] = Query(None, description="Filter by category"),
-    search_query: Optional[str] = Query(None, description="Search in title and description"),
-    sort_by: Optional[str] = Query("created_at", description="Sort by: created_at, average_rating"),
+    search_query: Optional[str] = Query(None, description="Search in title, description and city"),
+    sort_by: Optional[str] = Query("created_at", description="Sort by: created_at, average_rating, relevance"),
     order: Optional[str] = Query("desc", description="Order: asc, desc"),
-    db: Session = Depends(get_db)
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Tour).filter(Tour.is_published == True)
+    # Guide username comes from the same statement instead of one query per tour
+    query = select(Tour, User.username).outerjoin(
+        User, User.id == Tour.guide_id
+    ).where(Tour.is_published == True)
 
-    # Apply filters
+    # Apply filters on the accent/case-normalised columns so B-tree indexes apply
     if city:
-        query = query.filter(Tour.city.ilike(f"%{city}%"))
+        query = query.where(Tour.city_key == normalize_text(city))
     if country:
-        query = query.filter(Tour.country.ilike(f"%{country}%"))
+        query = query.where(Tour.country_key == normalize_text(country))
     if guide_id:
-        query = query.filter(Tour.guide_id == guide_id)
+        query = query.where(Tour.guide_id == guide_id)
     if category:
-        query = query.filter(Tour.category.ilike(f"%{category}%"))
-    if search_query:
-        query = query.filter(
-            Tour.title.ilike(f"%{search_query}%") |
-            Tour.description.ilike(f"%{search_query}%")
-        )
+        query = query.where(Tour.category_key == normalize_text(category))
+
+    relevance = None
+    if search_query and normalize_text(search_query):
+        # The in-memory search backend may need a sync session to build its index
+        criterion, relevance = await db.run_sync(build_tour_search, search_query)
+        query = query.where(criterion)
+
+    # Apply keyset sorting, with id as tie-breaker so pages never overlap
+    if sort_by == "relevance" and relevance is not None:
+        sort_column = relevance
+    elif sort_by == "average_rating":
+        sort_column = Tour.average_rating
+    else:
+        sort_by = "created_at"
+        sort_column = Tour.created_at
+    if order != "asc":
+        order = "desc"
+    query = query.add_columns(sort_column.label("sort_key"))
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_by, order)
+        position = tuple_(sort_column, Tour.id)
+        if order == "desc":
+            query = query.where(position < tuple_(sort_value, last_id))
+        else:
+            query = query.where(position > tuple_(sort_value, last_id))
+
+    order_func = desc if order == "desc" else asc
+    query = query.order_by(order_func(sort_column), order_func(Tour.id))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Rows are trusted: build the TourListResponse shape directly, no pydantic round trip
+    items = []
+    for tour, guide_username, _ in rows:
+        items.append({
+            "id": tour.id,
+            "title": tour.title,
+            "description": tour.description,
+            "city": tour.city,
+            "country": tour.country,
+            "category": tour.category,
+            "duration_minutes": tour.duration_minutes,
+            "average_rating": tour.average_rating,
+            "total_ratings": tour.total_ratings,
+            "guide_username": guide_username or "Unknown"
+        })
+
+    next_cursor = None
+    if has_more:
+        last_tour, _, last_sort_key = rows[-1]
+        next_cursor = encode_cursor(sort_by, order, last_sort_key, last_tour.id)
 
-    # Apply sorting
-    if sort_by == "average_rating":
-        order_func = desc if order == "desc" else asc
-        query = query.order_by(order_func(Tour.average_rating))
-    else:  # Default to created_at
-        order_func = desc if order == "desc" else asc
-        query = query.order_by(order_func(Tour.created_at))
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
 
-    tours = query.all()
+@router.get("/nearby", response_model=List[NearbyTourResponse])
+@max_queries(1)
+async def list_nearby_tours(
+    lat: float = Query(..., ge=-90, le=90, description="Visitor latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Visitor longitude"),
+    radius_m: float = Query(5000, gt=0, le=MAX_NEARBY_RADIUS_M, description="Search radius in metres"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Published tours with at least one POI in range, sorted by their nearest POI"""
+    distance = distance_expression(lat, lon)
+    nearest = select(
+        PointOfInterest.tour_id.label("tour_id"),
+        func.min(distance).label("distance_m")
+    ).where(
+        nearby_criterion(lat, lon, radius_m),
+        distance <= radius_m
+    ).group_by(PointOfInterest.tour_id).subquery()
+
+    rows = (await db.execute(
+        select(Tour, User.username, nearest.c.distance_m).join(
+            nearest, nearest.c.tour_id == Tour.id
+        ).outerjoin(
+            User, User.id == Tour.guide_id
+        ).where(
+            Tour.is_published == True
+        ).order_by(nearest.c.distance_m, Tour.id).limit(limit)
+    )).all()
 
-    # Transform to include guide username
     result = []
-    for tour in tours:
-        guide = db.query(User).filter(User.id == tour.guide_id).first()
-        tour_dict = {
-            "id": str(tour.id),
+    for tour, guide_username, distance_m in rows:
+        result.append({
+            "id": tour.id,
             "title": tour.title,
             "description": tour.description,
             "city": tour.city,
@@ -140,18 +243,21 @@ def list_published_tours(
             "duration_minutes": tour.duration_minutes,
             "average_rating": tour.average_rating,
             "total_ratings": tour.total_ratings,
-            "guide_username": guide.username if guide else "Unknown"
-        }
-        result.append(TourListResponse(**tour_dict))
+            "guide_username": guide_username or "Unknown",
+            "distance_m": distance_m
+        })
 
-    return result
+    return FastJSONResponse(result)
 
 @router.get("/{tour_id}", response_model=TourResponse)
-def get_tour_details(
+@max_queries(1)
+async def get_tour_details(
     tour_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    tour = db.query(Tour).filter(Tour.id == tour_id).first()
+    tour = (await db.execute(select(Tour).where(Tour.id == tour_id))).scalar()
     if not tour:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -165,13 +271,71 @@ def get_tour_details(
             detail="Tour not found"
         )
 
+    headers = cache_headers(make_etag("tour", tour.id, tour.updated_at), tour.updated_at)
+    if is_not_modified(request, headers["ETag"], tour.updated_at):
+        return not_modified(headers)
+
+    response.headers.update(headers)
     return tour
 
+@router.get("/{tour_id}/bundle")
+def get_tour_bundle(
+    tour_id: str,
+    request: Request,
+    since: Optional[str] = Query(None, description="content_hash of a bundle the client already has"),
+    db: Session = Depends(get_db)
+):
+    """
+    Offline download of a published tour: a zip with manifest.json, one JSON
+    document per POI and bundled media. Supports Range requests for resuming.
+    With `since`, only the files changed since that bundle are returned,
+    listed in delta.json. Bundles are built by the job worker: until the
+    current content's is ready the previous bundle is served, or 202 when
+    the tour has none yet.
+    """
+    tour = db.query(Tour).filter(Tour.id == tour_id, Tour.is_published == True).first()
+    if not tour:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tour not found"
+        )
+
+    bundle = get_current_bundle(db, tour)
+    if bundle is None:
+        queue_tour_bundle(db, tour)
+        db.commit()
+        bundle = get_latest_bundle(db, tour.id)
+        if bundle is None:
+            return FastJSONResponse(
+                {"detail": "Tour bundle is being built"},
+                status_code=status.HTTP_202_ACCEPTED,
+                headers={"Retry-After": str(BUNDLE_BUILD_RETRY_SECONDS)}
+            )
+    headers = {"X-Content-Hash": bundle.content_hash}
+
+    # `since` equal to the current hash gets an empty delta; If-None-Match with the ETag gets a 304
+    if since:
+        base = db.query(TourBundle).filter(TourBundle.tour_id == tour.id, TourBundle.content_hash == since).first()
+        # Unknown or pruned base bundles fall back to the full archive
+        if base is not None:
+            headers["Content-Disposition"] = f'attachment; filename="tour-{tour.id}-{since[:12]}-{bundle.content_hash[:12]}.zip"'
+            headers["X-Bundle-Base"] = since
+            return ranged_response(
+                request, build_delta_archive(bundle, base), "application/zip",
+                etag=f"{bundle.content_hash}-{since}", headers=headers
+            )
+
+    headers["Content-Disposition"] = f'attachment; filename="tour-{tour.id}-{bundle.content_hash[:12]}.zip"'
+    return ranged_stream_response(
+        request, bundle.size, lambda start, end: read_bundle_range(bundle, start, end), "application/zip",
+        etag=bundle.content_hash, headers=headers
+    )
+
 # Admin-only endpoints
 @router.get("/admin/all", response_model=List[TourResponse])
 def list_all_tours_admin(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
 ):
     tours = db.query(Tour).all()
     return tours
@@ -181,7 +345,7 @@ def toggle_tour_publish_status(
     tour_id: str,
     is_published: bool,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.ADMIN]))
 ):
     tour = db.query(Tour).filter(Tour.id == tour_id).first()
     if not tour:
@@ -191,6 +355,10 @@ def toggle_tour_publish_status(
         )
 
     tour.is_published = is_published
+    if is_published:
+        # Have the offline bundle ready before the first visitor asks for it
+        queue_tour_bundle(db, tour)
     db.commit()
+    invalidate_tour_pois(db, tour.id)
     db.refresh(tour)
     return tour
\ No newline at end of file
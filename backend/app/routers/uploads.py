@@ -1,18 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File
+import uuid
+from itertools import islice
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.core.http_cache import make_etag, cache_headers, is_not_modified, not_modified
+from app.core.responses import FastJSONResponse, dump_trusted
 from app.db.database import get_db
-from app.core.auth import get_current_active_user, require_roles
-from app.models.user import User, UserRole
+from app.db.replica import get_read_db
+from app.db.query_tracker import max_queries
+from app.core.auth import AuthenticatedUser, get_current_active_user, require_roles
+from app.models.user import UserRole
 from app.models.tour import Tour
-from app.models.point_of_interest import PointOfInterest
+from app.models.point_of_interest import PointOfInterest, EnhancementStatus
 from app.models.multimedia import Multimedia, FileType
 from app.schemas.multimedia import MultimediaResponse
-from app.services.file_service import upload_kml_file, upload_multimedia_file, delete_file_from_gcs
+from app.services.file_service import (
+    upload_kml_file, upload_multimedia_file, delete_file_from_storage, validate_file_type_and_size
+)
+from app.services.image_service import (
+    IMAGE_VARIANTS, InvalidImageError, create_image_variants, store_image_variants, delete_image_variants
+)
+from app.services.kml_service import KMLError, Placemark, iter_kml_placemarks
+from app.services.poi_cache import invalidate_poi
+from app.services.poi_jobs import ENHANCE_POI, GENERATE_POI_QR
+from app.services.job_queue import enqueue_jobs
+from app.services.enhancement_cache import enhancement_key, get_cached_enhancements
+from app.services.geo_service import encode_geohash
+from app.services.bundle_service import queue_tour_bundle_rebuild
 
 router = APIRouter(tags=["uploads"])
 
-def check_tour_ownership(tour_id: str, current_user: User, db: Session) -> Tour:
+# KML stops are upserted this many at a time while the file is parsed
+KML_IMPORT_BATCH_SIZE = 100
+
+def check_tour_ownership(tour_id: str, current_user: AuthenticatedUser, db: Session) -> Tour:
     """Helper function to check if user owns the tour or is admin"""
     tour = db.query(Tour).filter(Tour.id == tour_id).first()
     if not tour:
@@ -33,24 +58,126 @@ def check_tour_ownership(tour_id: str, current_user: User, db: Session) -> Tour:
 def upload_tour_kml(
     tour_id: str,
     file: UploadFile = File(...),
+    import_pois: bool = Query(False),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
-    """Upload KML file for a tour"""
+    """
+    Upload KML file for a tour. With import_pois, its placemarks also become
+    the tour's POIs: the n-th stop in the file updates the POI with
+    order_in_tour n, or creates it. Enhancement and QR codes are queued.
+    """
     tour = check_tour_ownership(tour_id, current_user, db)
+    validate_file_type_and_size(file, "kml")
+
+    # Stops are written in the request's transaction: a file that turns out
+    # invalid halfway is rolled back, before storage is touched
+    created, updated_ids = 0, []
+    if import_pois:
+        try:
+            file.file.seek(0)
+            created, updated_ids = import_kml_placemarks(db, tour, iter_kml_placemarks(file.file))
+        except KMLError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid KML file: {str(e)}"
+            )
+        finally:
+            file.file.seek(0)
 
     # Delete existing KML file if it exists
     if tour.kml_file_url:
-        delete_file_from_gcs(tour.kml_file_url)
+        delete_file_from_storage(tour.kml_file_url)
 
     # Upload new KML file
     kml_url = upload_kml_file(file, tour_id)
 
     # Update tour with KML URL
     tour.kml_file_url = kml_url
+    tour.content_updated_at = func.now()
+    queue_tour_bundle_rebuild(db, tour)
+
     db.commit()
+    for poi_id in updated_ids:
+        invalidate_poi(poi_id)
+
+    response = {"message": "KML file uploaded successfully", "kml_url": kml_url}
+    if import_pois:
+        response.update({"pois_created": created, "pois_updated": len(updated_ids)})
+    return response
 
-    return {"message": "KML file uploaded successfully", "kml_url": kml_url}
+def import_kml_placemarks(db: Session, tour: Tour, placemarks: Iterable[Placemark]) -> Tuple[int, list]:
+    """
+    Upsert POIs from KML stops in the caller's transaction, consuming the
+    stops in batches of KML_IMPORT_BATCH_SIZE (one bulk INSERT and UPDATE
+    each) so a large file is never held in memory. Returns (created count,
+    updated POI ids).
+    """
+    existing = {
+        row.order_in_tour: row
+        for row in db.query(
+            PointOfInterest.id,
+            PointOfInterest.order_in_tour,
+            PointOfInterest.title,
+            PointOfInterest.description_raw
+        ).filter(PointOfInterest.tour_id == tour.id)
+    }
+
+    created, updated_ids = 0, []
+    stops = enumerate(placemarks, start=1)
+    while True:
+        batch = list(islice(stops, KML_IMPORT_BATCH_SIZE))
+        if not batch:
+            break
+        batch_created, batch_updated = _import_kml_batch(db, tour, batch, existing)
+        created += batch_created
+        updated_ids.extend(batch_updated)
+    return created, updated_ids
+
+def _import_kml_batch(db: Session, tour: Tour, batch: List[Tuple[int, Placemark]], existing: dict):
+    keys = [
+        enhancement_key(placemark.title, placemark.description, tour.city, tour.country, tour.category)
+        for _, placemark in batch
+    ]
+    cached = get_cached_enhancements(db, keys)
+
+    inserts, updates = [], []
+    enhance_payloads, qr_payloads = [], []
+    for (order_in_tour, placemark), key in zip(batch, keys):
+        current = existing.get(order_in_tour)
+        row = {
+            "id": current.id if current else uuid.uuid4(),
+            "title": placemark.title,
+            "description_raw": placemark.description,
+            "latitude": placemark.latitude,
+            "longitude": placemark.longitude,
+            "geohash": encode_geohash(placemark.latitude, placemark.longitude),
+        }
+
+        text_changed = current is None or (current.title, current.description_raw) != (placemark.title, placemark.description)
+        if text_changed:
+            enhanced_description = cached.get(key)
+            row["description_ai_enhanced"] = enhanced_description
+            row["enhancement_status"] = EnhancementStatus.ENHANCED if enhanced_description else EnhancementStatus.PENDING
+            if enhanced_description is None:
+                enhance_payloads.append({"poi_id": str(row["id"]), "description_raw": placemark.description})
+
+        if current is None:
+            inserts.append({**row, "tour_id": tour.id, "order_in_tour": order_in_tour})
+            qr_payloads.append({"tour_id": str(tour.id), "poi_id": str(row["id"])})
+        else:
+            updates.append(row)
+
+    if inserts:
+        db.execute(insert(PointOfInterest).values(inserts))
+    if updates:
+        # Rows without a new description keep their current enhancement
+        for keys_present in {frozenset(row) for row in updates}:
+            db.execute(update(PointOfInterest), [row for row in updates if frozenset(row) == keys_present])
+    enqueue_jobs(db, ENHANCE_POI, enhance_payloads)
+    enqueue_jobs(db, GENERATE_POI_QR, qr_payloads)
+
+    return len(inserts), [row["id"] for row in updates]
 
 @router.post("/pois/{poi_id}/media", response_model=List[MultimediaResponse])
 def upload_poi_multimedia(
@@ -58,7 +185,7 @@ def upload_poi_multimedia(
     files: List[UploadFile] = File(...),
     captions: List[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     """Upload multimedia files for a POI"""
 
@@ -72,50 +199,88 @@ def upload_poi_multimedia(
 
     tour = check_tour_ownership(str(poi.tour_id), current_user, db)
 
-    uploaded_media = []
-
-    for i, file in enumerate(files):
-        # Determine file type
+    # Check every file before sending any of them to storage
+    file_types = []
+    for file in files:
         if file.content_type.startswith("image/"):
             file_type = FileType.IMAGE
-            file_category = "image"
         elif file.content_type.startswith("video/"):
             file_type = FileType.VIDEO
-            file_category = "video"
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Unsupported file type: {file.content_type}"
             )
+        validate_file_type_and_size(file, file_type.value)
+        file_types.append(file_type)
 
-        # Upload file
-        file_url = upload_multimedia_file(file, str(tour.id), poi_id, file_category)
+    def upload(index: int) -> Tuple[str, Optional[dict]]:
+        file = files[index]
+        folder_path = f"multimedia/{tour.id}/{poi_id}"
+        rendered = None
+        if file_types[index] == FileType.IMAGE:
+            # Resize on the process pool before storing anything, so bad images fail early.
+            # This also strips the upload's metadata (GPS, camera) before it is stored.
+            rendered = create_image_variants(file.file)
 
-        # Create multimedia record
-        caption = captions[i] if captions and i < len(captions) else None
-        multimedia = Multimedia(
-            poi_id=poi_id,
-            file_url=file_url,
-            file_type=file_type,
-            caption=caption
-        )
+        file_url = upload_multimedia_file(file, str(tour.id), poi_id)
+        if rendered is None:
+            return file_url, None
+        try:
+            return file_url, store_image_variants(rendered, folder_path)
+        except Exception:
+            delete_file_from_storage(file_url)
+            raise
 
-        db.add(multimedia)
-        uploaded_media.append(multimedia)
+    # Upload concurrently; each upload streams its spooled file in fixed-size chunks
+    workers = max(1, min(settings.upload_concurrency, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(upload, i) for i in range(len(files))]
+        uploaded, errors = [], []
+        for future in futures:
+            try:
+                uploaded.append(future.result())
+            except Exception as e:
+                errors.append(e)
 
-    db.commit()
+    if errors:
+        # Don't leave orphaned files behind for a request that failed
+        for file_url, variants in uploaded:
+            delete_file_from_storage(file_url)
+            delete_image_variants(variants)
+        if isinstance(errors[0], InvalidImageError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid image file"
+            )
+        raise errors[0]
 
-    # Refresh all multimedia objects
-    for media in uploaded_media:
-        db.refresh(media)
+    rows = [
+        {
+            "poi_id": poi.id,
+            "file_url": file_url,
+            "file_type": file_types[i],
+            "caption": captions[i] if captions and i < len(captions) else None,
+            "variants": variants
+        }
+        for i, (file_url, variants) in enumerate(uploaded)
+    ]
+    # One INSERT ... RETURNING; serialize before commit expires the rows
+    uploaded_media = db.scalars(insert(Multimedia).returning(Multimedia), rows).all()
+    response = [MultimediaResponse.model_validate(media) for media in uploaded_media]
+    # Media is part of the POI's content: bump its version for conditional GETs
+    poi.updated_at = func.now()
+    queue_tour_bundle_rebuild(db, tour)
+    db.commit()
+    invalidate_poi(poi_id)
 
-    return uploaded_media
+    return response
 
 @router.delete("/multimedia/{media_id}")
 def delete_multimedia(
     media_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
+    current_user: AuthenticatedUser = Depends(require_roles([UserRole.GUIDE, UserRole.ADMIN]))
 ):
     """Delete a multimedia file"""
 
@@ -136,36 +301,60 @@ def delete_multimedia(
 
     tour = check_tour_ownership(str(poi.tour_id), current_user, db)
 
-    # Delete file from storage
-    delete_file_from_gcs(multimedia.file_url)
+    # Delete file and its resized variants from storage
+    delete_file_from_storage(multimedia.file_url)
+    delete_image_variants(multimedia.variants)
 
     # Delete record from database
     db.delete(multimedia)
+    poi.updated_at = func.now()
+    queue_tour_bundle_rebuild(db, tour)
     db.commit()
+    invalidate_poi(multimedia.poi_id)
 
     return {"message": "Multimedia deleted successfully"}
 
 @router.get("/pois/{poi_id}/media", response_model=List[MultimediaResponse])
-def get_poi_multimedia(
+@max_queries(2)
+async def get_poi_multimedia(
     poi_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    size: Optional[str] = Query(None, pattern=f"^({'|'.join(IMAGE_VARIANTS)}|original)$"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all multimedia for a POI"""
+    """
+    Get all multimedia for a POI. With `size`, `file_url` of each image points
+    at that variant (thumb, medium, full) instead of the original upload.
+    """
 
-    # Check if POI exists and is accessible (tour is published)
-    poi = db.query(PointOfInterest).filter(PointOfInterest.id == poi_id).first()
+    # Check if POI exists and is accessible (tour is published); its version covers its media
+    poi = (await db.execute(
+        select(PointOfInterest.updated_at, Tour.is_published).join(
+            Tour, Tour.id == PointOfInterest.tour_id
+        ).where(PointOfInterest.id == poi_id)
+    )).first()
     if not poi:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="POI not found"
         )
 
-    tour = db.query(Tour).filter(Tour.id == poi.tour_id).first()
-    if not tour or not tour.is_published:
+    updated_at, is_published = poi
+    if not is_published:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="POI not available"
         )
 
-    multimedia = db.query(Multimedia).filter(Multimedia.poi_id == poi_id).all()
-    return multimedia
\ No newline at end of file
+    headers = cache_headers(make_etag("poi-media", poi_id, updated_at, size), updated_at)
+    if is_not_modified(request, headers["ETag"], updated_at):
+        return not_modified(headers)
+
+    multimedia = (await db.scalars(select(Multimedia).where(Multimedia.poi_id == poi_id))).all()
+    media_list = [dump_trusted(MultimediaResponse, media) for media in multimedia]
+    if size and size != "original":
+        for media in media_list:
+            if media["variants"] and size in media["variants"]:
+                media["file_url"] = media["variants"][size]["url"]
+
+    return FastJSONResponse(media_list, headers=headers)
@@ -2,21 +2,21 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.database import get_db
-from app.core.auth import get_current_active_user, require_role
+from app.core.auth import AuthenticatedUser, get_current_user, invalidate_user, require_role
 from app.models.user import User, UserRole
 from app.schemas.user import UserResponse, UserUpdate
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
+def get_current_user_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.put("/me", response_model=UserResponse)
 def update_current_user_profile(
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_user)
 ):
     # Check if username is being updated and if it's already taken
     if user_update.username and user_update.username != current_user.username:
@@ -42,6 +42,7 @@ def update_current_user_profile(
         setattr(current_user, field, value)
 
     db.commit()
+    invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -49,7 +50,7 @@ def update_current_user_profile(
 @router.get("/", response_model=List[UserResponse])
 def list_all_users(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.ADMIN))
+    current_user: AuthenticatedUser = Depends(require_role(UserRole.ADMIN))
 ):
     users = db.query(User).all()
     return users
@@ -58,7 +59,7 @@ def list_all_users(
 def get_user_by_id(
     user_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.ADMIN))
+    current_user: AuthenticatedUser = Depends(require_role(UserRole.ADMIN))
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -73,7 +74,7 @@ def update_user_role(
     user_id: str,
     role: UserRole,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.ADMIN))
+    current_user: AuthenticatedUser = Depends(require_role(UserRole.ADMIN))
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -84,6 +85,7 @@ def update_user_role(
 
     user.role = role
     db.commit()
+    invalidate_user(user.id)
     db.refresh(user)
     return user
 
@@ -91,7 +93,7 @@ def update_user_role(
 def delete_user(
     user_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(UserRole.ADMIN))
+    current_user: AuthenticatedUser = Depends(require_role(UserRole.ADMIN))
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -109,4 +111,5 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    invalidate_user(user.id)
     return {"message": "User deleted successfully"}
\ No newline at end of file
@@ -1,15 +1,15 @@
 from .user import UserCreate, UserUpdate, UserResponse, Token
-from .tour import TourCreate, TourUpdate, TourResponse
-from .point_of_interest import POICreate, POIUpdate, POIResponse
-from .multimedia import MultimediaResponse
-from .rating import RatingCreate, RatingResponse
+from .tour import TourCreate, TourUpdate, TourResponse, TourListResponse, TourListPage, NearbyTourResponse
+from .point_of_interest import POICreate, POIUpdate, POIResponse, POIBatchItemResult, NearbyPOIResponse
+from .multimedia import MultimediaResponse, ImageVariant
+from .rating import RatingCreate, RatingResponse, RatingPage, RatingSummary
 from .tip import TipCreate, TipResponse
 
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "Token",
-    "TourCreate", "TourUpdate", "TourResponse",
-    "POICreate", "POIUpdate", "POIResponse",
-    "MultimediaResponse",
-    "RatingCreate", "RatingResponse",
+    "TourCreate", "TourUpdate", "TourResponse", "TourListResponse", "TourListPage", "NearbyTourResponse",
+    "POICreate", "POIUpdate", "POIResponse", "POIBatchItemResult", "NearbyPOIResponse",
+    "MultimediaResponse", "ImageVariant",
+    "RatingCreate", "RatingResponse", "RatingPage", "RatingSummary",
     "TipCreate", "TipResponse"
 ]
\ No newline at end of file
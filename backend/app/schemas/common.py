@@ -0,0 +1,5 @@
+from typing import Annotated
+from pydantic import BeforeValidator
+
+# ORM primary/foreign keys are UUID objects; responses expose them as strings
+UUIDStr = Annotated[str, BeforeValidator(lambda value: str(value) if value is not None else value)]
@@ -1,14 +1,21 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from app.models.multimedia import FileType
+from app.schemas.common import UUIDStr
+
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
 
 class MultimediaResponse(BaseModel):
-    id: str
-    poi_id: str
+    id: UUIDStr
+    poi_id: UUIDStr
     file_url: str
     file_type: FileType
     caption: Optional[str] = None
+    variants: Optional[Dict[str, ImageVariant]] = None
     created_at: datetime
 
     class Config:
@@ -1,6 +1,8 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from app.schemas.common import UUIDStr
+from app.models.point_of_interest import EnhancementStatus
 
 class POIBase(BaseModel):
     title: str
@@ -20,9 +22,10 @@ class POIUpdate(BaseModel):
     order_in_tour: Optional[int] = None
 
 class POIResponse(POIBase):
-    id: str
-    tour_id: str
+    id: UUIDStr
+    tour_id: UUIDStr
     description_ai_enhanced: Optional[str] = None
+    enhancement_status: EnhancementStatus
     qr_code_url: Optional[str] = None
     created_at: datetime
     updated_at: datetime
@@ -31,6 +34,23 @@ class POIResponse(POIBase):
     class Config:
         from_attributes = True
 
+class POIBatchItemResult(BaseModel):
+    index: int
+    status: str  # "created" or "error"
+    id: Optional[UUIDStr] = None
+    enhancement_status: Optional[EnhancementStatus] = None
+    error: Optional[str] = None
+
+class NearbyPOIResponse(BaseModel):
+    id: UUIDStr
+    tour_id: UUIDStr
+    tour_title: str
+    title: str
+    latitude: float
+    longitude: float
+    order_in_tour: int
+    distance_m: float
+
 # Import here to avoid circular imports
 from app.schemas.multimedia import MultimediaResponse
 POIResponse.model_rebuild()
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
+from app.schemas.common import UUIDStr
 
 class RatingBase(BaseModel):
     rating: int  # 1-5 scale
@@ -10,10 +11,20 @@ class RatingCreate(RatingBase):
     pass
 
 class RatingResponse(RatingBase):
-    id: str
-    tour_id: str
-    user_id: str
+    id: UUIDStr
+    tour_id: UUIDStr
+    user_id: UUIDStr
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class RatingPage(BaseModel):
+    items: List[RatingResponse]
+    next_cursor: Optional[str] = None
+
+class RatingSummary(BaseModel):
+    tour_id: UUIDStr
+    total_ratings: int
+    average_rating: float
+    distribution: Dict[int, int]  # stars -> number of ratings
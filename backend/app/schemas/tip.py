@@ -3,6 +3,7 @@ from typing import Optional
 from datetime import datetime
 from decimal import Decimal
 from app.models.tip import PaymentMethod, TipStatus
+from app.schemas.common import UUIDStr
 
 class TipBase(BaseModel):
     amount: Decimal
@@ -13,9 +14,9 @@ class TipCreate(TipBase):
     pass
 
 class TipResponse(TipBase):
-    id: str
-    tour_id: str
-    giver_user_id: Optional[str] = None
+    id: UUIDStr
+    tour_id: UUIDStr
+    giver_user_id: Optional[UUIDStr] = None
     transaction_id: Optional[str] = None
     status: TipStatus
     created_at: datetime
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from app.schemas.common import UUIDStr
 
 class TourBase(BaseModel):
     title: str
@@ -22,8 +23,8 @@ class TourUpdate(BaseModel):
     duration_minutes: Optional[int] = None
 
 class TourResponse(TourBase):
-    id: str
-    guide_id: str
+    id: UUIDStr
+    guide_id: UUIDStr
     kml_file_url: Optional[str] = None
     is_published: bool
     created_at: datetime
@@ -35,7 +36,7 @@ class TourResponse(TourBase):
         from_attributes = True
 
 class TourListResponse(BaseModel):
-    id: str
+    id: UUIDStr
     title: str
     description: Optional[str] = None
     city: str
@@ -47,4 +48,11 @@ class TourListResponse(BaseModel):
     guide_username: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TourListPage(BaseModel):
+    items: List[TourListResponse]
+    next_cursor: Optional[str] = None
+
+class NearbyTourResponse(TourListResponse):
+    distance_m: float
@@ -2,6 +2,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
 from app.models.user import UserRole
+from app.schemas.common import UUIDStr
 
 class UserBase(BaseModel):
     username: str
@@ -18,7 +19,7 @@ class UserUpdate(BaseModel):
     bizum_phone: Optional[str] = None
 
 class UserResponse(UserBase):
-    id: str
+    id: UUIDStr
     created_at: datetime
     updated_at: datetime
     paypal_email: Optional[str] = None
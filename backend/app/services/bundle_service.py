@@ -0,0 +1,334 @@
+import hashlib
+import io
+import json
+import logging
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.models.job import Job, JobStatus
+from app.models.tour import Tour
+from app.models.tour_bundle import TourBundle
+from app.models.point_of_interest import PointOfInterest
+from app.models.multimedia import Multimedia, FileType
+from app.schemas.tour import TourResponse
+from app.services.job_queue import enqueue_job, job_handler
+from app.services.storage_service import get_storage
+
+logger = logging.getLogger(__name__)
+
+BUILD_TOUR_BUNDLE = "build_tour_bundle"
+
+# Bump when the archive layout changes, so every tour gets a fresh bundle
+BUNDLE_FORMAT_VERSION = 2
+
+# Tour fields that change without its content (votes): left out so they don't change the content hash
+VOLATILE_TOUR_FIELDS = {"updated_at", "average_rating", "total_ratings"}
+
+# Images are bundled as this variant; videos stay online-only
+BUNDLE_IMAGE_VARIANT = "medium"
+
+# Retry-After of the 202 answering a bundle request while a tour's first bundle is built
+BUNDLE_BUILD_RETRY_SECONDS = 5
+
+# Older bundles are kept so clients holding them can still get deltas
+BUNDLES_KEPT_PER_TOUR = 5
+
+MEDIA_DOWNLOAD_WORKERS = 8
+
+# Fixed member timestamps keep archives byte-identical for identical content
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Full archives are streamed from storage; zipfile reads them through a buffer of this size
+ARCHIVE_READ_BUFFER_SIZE = 256 * 1024
+
+# Delta archive bytes keyed by (content_hash, base_hash), bounded by their total size
+bundle_cache = TTLCache(
+    maxsize=settings.bundle_cache_max_entries,
+    ttl=settings.bundle_cache_ttl_seconds,
+    max_bytes=settings.bundle_cache_max_bytes
+)
+
+# First key of the advisory locks serialising bundle builds per tour (the second is the tour id's hash)
+BUNDLE_BUILD_LOCK = 0x62756e64
+
+@contextmanager
+def _tour_build_lock(db: Session, tour_id):
+    """
+    Wait for any other build of this tour, in any process, and hold it off until
+    the block ends. The lock lives on a connection of its own, outside any
+    transaction, so the build can commit before downloading media.
+    """
+    params = {"lock": BUNDLE_BUILD_LOCK, "tour_id": str(tour_id)}
+    with db.get_bind().connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.execute(text("SELECT pg_advisory_lock(:lock, hashtext(:tour_id))"), params)
+        try:
+            yield
+        finally:
+            try:
+                connection.execute(text("SELECT pg_advisory_unlock(:lock, hashtext(:tour_id))"), params)
+            except Exception:
+                # Don't hand a connection that may still hold the lock back to the pool
+                connection.invalidate()
+                raise
+
+def _json_bytes(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def tour_content_version(db: Session, tour: Tour) -> str:
+    """Changes whenever the tour's content, one of its POIs or their media change (not on ratings)"""
+    poi_count, last_poi_update, media_count, last_media_upload = db.query(
+        func.count(func.distinct(PointOfInterest.id)),
+        func.max(PointOfInterest.updated_at),
+        func.count(Multimedia.id),
+        func.max(Multimedia.created_at)
+    ).select_from(PointOfInterest).outerjoin(
+        Multimedia, Multimedia.poi_id == PointOfInterest.id
+    ).filter(PointOfInterest.tour_id == tour.id).one()
+    return (
+        f"{BUNDLE_FORMAT_VERSION}:{tour.content_updated_at}:{poi_count}:{last_poi_update}:"
+        f"{media_count}:{last_media_upload}"
+    )
+
+def _bundled_media_url(media: Multimedia) -> Optional[str]:
+    if media.file_type != FileType.IMAGE:
+        return None
+    variant = (media.variants or {}).get(BUNDLE_IMAGE_VARIANT)
+    return variant["url"] if variant else media.file_url
+
+def _render_archive(tour: Tour, pois: List[PointOfInterest]) -> Tuple[bytes, str, Dict[str, str]]:
+    """Return (zip bytes, content hash, {path: sha256}) for a tour"""
+    media_urls = {
+        media.id: url
+        for poi in pois for media in poi.multimedia
+        if (url := _bundled_media_url(media)) is not None
+    }
+    # Media downloads are network-bound; fetch them in parallel over the pooled client
+    storage = get_storage()
+    with ThreadPoolExecutor(max_workers=MEDIA_DOWNLOAD_WORKERS) as executor:
+        downloads = dict(zip(media_urls, executor.map(storage.download, media_urls.values())))
+
+    members: Dict[str, bytes] = {}
+    poi_entries = []
+    for poi in pois:
+        media_entries = []
+        for media in sorted(poi.multimedia, key=lambda m: (m.created_at, str(m.id))):
+            path = None
+            if media.id in downloads:
+                extension = "webp" if media.variants else media.file_url.rsplit(".", 1)[-1]
+                path = f"media/{media.id}.{extension}"
+                members[path] = downloads[media.id]
+            variant = (media.variants or {}).get(BUNDLE_IMAGE_VARIANT) or {}
+            media_entries.append({
+                "id": str(media.id),
+                "file_type": media.file_type.value,
+                "caption": media.caption,
+                "path": path,
+                "url": media.file_url,
+                "width": variant.get("width"),
+                "height": variant.get("height"),
+            })
+
+        poi_path = f"pois/{poi.id}.json"
+        members[poi_path] = _json_bytes({
+            "id": str(poi.id),
+            "title": poi.title,
+            "description_raw": poi.description_raw,
+            "description_ai_enhanced": poi.description_ai_enhanced,
+            "latitude": poi.latitude,
+            "longitude": poi.longitude,
+            "order_in_tour": poi.order_in_tour,
+            "media": media_entries,
+        })
+        poi_entries.append({"id": str(poi.id), "order_in_tour": poi.order_in_tour, "title": poi.title, "path": poi_path})
+
+    files = {path: _sha256(data) for path, data in members.items()}
+    manifest = _json_bytes({
+        "format": BUNDLE_FORMAT_VERSION,
+        "tour": TourResponse.model_validate(tour).model_dump(mode="json", exclude=VOLATILE_TOUR_FIELDS),
+        "pois": poi_entries,
+        "files": files,
+    })
+    content_hash = _sha256(manifest)
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        _write_member(archive, "manifest.json", manifest)
+        for path in sorted(members):
+            _write_member(archive, path, members[path])
+    return buffer.getvalue(), content_hash, files
+
+def _write_member(archive: zipfile.ZipFile, path: str, data: bytes) -> None:
+    info = zipfile.ZipInfo(path, date_time=_ZIP_DATE_TIME)
+    # JSON compresses well; media is already compressed
+    info.compress_type = zipfile.ZIP_DEFLATED if path.endswith(".json") else zipfile.ZIP_STORED
+    archive.writestr(info, data)
+
+def _bundle_for_version(db: Session, tour_id, version: str) -> Optional[TourBundle]:
+    return db.query(TourBundle).filter(TourBundle.tour_id == tour_id, TourBundle.version == version).first()
+
+def get_current_bundle(db: Session, tour: Tour) -> Optional[TourBundle]:
+    """The bundle of the tour's current content, if it has been built"""
+    return _bundle_for_version(db, tour.id, tour_content_version(db, tour))
+
+def get_latest_bundle(db: Session, tour_id) -> Optional[TourBundle]:
+    return db.query(TourBundle).filter(TourBundle.tour_id == tour_id).order_by(TourBundle.created_at.desc()).first()
+
+def build_tour_bundle(db: Session, tour: Tour) -> TourBundle:
+    """
+    Build and store the bundle of the tour's current content, unless another
+    build got there first (job worker). Nothing stays open in the database
+    while media is downloaded and the archive uploaded.
+    """
+    tour_id = tour.id
+    with _tour_build_lock(db, tour_id):
+        version = tour_content_version(db, tour)
+        bundle = _bundle_for_version(db, tour_id, version)
+        if bundle is not None:
+            db.commit()
+            return bundle
+
+        pois = db.query(PointOfInterest).options(joinedload(PointOfInterest.multimedia)).filter(
+            PointOfInterest.tour_id == tour_id
+        ).order_by(PointOfInterest.order_in_tour).all()
+        # Keep the loaded rows readable once the transaction ends
+        db.expunge(tour)
+        for poi in pois:
+            db.expunge(poi)
+        db.commit()
+
+        archive, content_hash, files = _render_archive(tour, pois)
+        file_url = get_storage().upload(
+            BytesIO(archive), f"bundles/{tour_id}/{content_hash}.zip", "application/zip", size=len(archive)
+        )
+        db.execute(insert(TourBundle).values(
+            tour_id=tour_id,
+            version=version,
+            content_hash=content_hash,
+            size=len(archive),
+            file_url=file_url,
+            files=files
+        ).on_conflict_do_nothing(constraint="uq_tour_bundles_tour_version"))
+        _prune_bundles(db, tour_id)
+        db.commit()
+    logger.info(f"Built bundle {content_hash} for tour {tour_id} ({len(archive)} bytes)")
+    return db.query(TourBundle).filter(TourBundle.tour_id == tour_id, TourBundle.version == version).one()
+
+def _prune_bundles(db: Session, tour_id) -> None:
+    stale = db.query(TourBundle).filter(TourBundle.tour_id == tour_id).order_by(
+        TourBundle.created_at.desc()
+    ).offset(BUNDLES_KEPT_PER_TOUR).all()
+    for bundle in stale:
+        # Identical content can be shared by several versions
+        shared = db.query(TourBundle.id).filter(
+            TourBundle.file_url == bundle.file_url, TourBundle.id != bundle.id
+        ).first()
+        if shared is None:
+            get_storage().delete(bundle.file_url)
+        db.delete(bundle)
+
+def read_bundle_range(bundle: TourBundle, start: int, end: int) -> bytes:
+    """Bytes `start` to `end` (inclusive) of a stored bundle archive"""
+    return get_storage().download_range(bundle.file_url, start, end)
+
+class _StoredArchive(io.RawIOBase):
+    """Seekable, read-only view of a stored bundle, fetched by ranges, for zipfile"""
+
+    def __init__(self, bundle: TourBundle):
+        self.bundle = bundle
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.bundle.size}[whence]
+        self.position = max(base + offset, 0)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.bundle.size or not len(buffer):
+            return 0
+        end = min(self.position + len(buffer), self.bundle.size) - 1
+        data = read_bundle_range(self.bundle, self.position, end)
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+def build_delta_archive(bundle: TourBundle, base: TourBundle) -> bytes:
+    """
+    Archive with the new manifest and only the files that differ from `base`.
+    delta.json lists the changed and removed paths. Only those members are
+    read from the stored full archive.
+    """
+    key = (bundle.content_hash, base.content_hash)
+    delta = bundle_cache.get(key)
+    if delta is not MISSING:
+        return delta
+
+    changed = sorted(path for path, digest in bundle.files.items() if base.files.get(path) != digest)
+    removed = sorted(set(base.files) - set(bundle.files))
+
+    buffer = BytesIO()
+    stored = io.BufferedReader(_StoredArchive(bundle), buffer_size=ARCHIVE_READ_BUFFER_SIZE)
+    with zipfile.ZipFile(stored) as full, zipfile.ZipFile(buffer, "w") as archive:
+        _write_member(archive, "manifest.json", full.read("manifest.json"))
+        _write_member(archive, "delta.json", _json_bytes({
+            "base": base.content_hash,
+            "content_hash": bundle.content_hash,
+            "changed": changed,
+            "removed": removed,
+        }))
+        for path in changed:
+            _write_member(archive, path, full.read(path))
+
+    delta = buffer.getvalue()
+    bundle_cache.set(key, delta)
+    return delta
+
+def queue_tour_bundle(db: Session, tour: Tour, delay_seconds: float = 0) -> None:
+    """
+    Build the tour's bundle within `delay_seconds`. A build still waiting to
+    run covers it, brought forward if it was due later.
+    """
+    run_at = func.now() + timedelta(seconds=delay_seconds)
+    queued = db.query(Job).filter(
+        Job.kind == BUILD_TOUR_BUNDLE,
+        Job.status == JobStatus.QUEUED,
+        Job.payload["tour_id"].astext == str(tour.id)
+    ).update({Job.run_at: func.least(Job.run_at, run_at)}, synchronize_session=False)
+    if not queued:
+        enqueue_job(db, BUILD_TOUR_BUNDLE, {"tour_id": str(tour.id)}, delay_seconds=delay_seconds)
+
+def queue_tour_bundle_rebuild(db: Session, tour: Tour) -> None:
+    """
+    After a content change of a published tour, rebuild its bundle once edits
+    settle (bundle_rebuild_delay_seconds), so visitors don't pay for the
+    build. Unpublished tours are built when they are published.
+    """
+    if tour.is_published:
+        queue_tour_bundle(db, tour, delay_seconds=settings.bundle_rebuild_delay_seconds)
+
+@job_handler(BUILD_TOUR_BUNDLE)
+def build_bundle_job(db: Session, payload: Dict[str, Any]) -> None:
+    tour = db.query(Tour).filter(Tour.id == payload["tour_id"]).first()
+    if tour is None or not tour.is_published:
+        return
+    build_tour_bundle(db, tour)
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache, MISSING
+from app.core.config import settings
+from app.core.metrics import ENHANCEMENT_CACHE_LOOKUPS, ENHANCEMENT_GENERATIONS, sample_value
+from app.models.enhancement_cache import EnhancementCacheEntry
+from app.services.gemini_service import GEMINI_MODEL, PROMPT_TEMPLATE_VERSION, generate_enhanced_description
+
+logger = logging.getLogger(__name__)
+
+_memory_cache = TTLCache(
+    maxsize=settings.enhancement_cache_max_entries,
+    ttl=settings.enhancement_cache_ttl_seconds
+)
+
+def enhancement_key(title: str, raw_description: str, city: str, country: str, category: str) -> str:
+    """Content address of an enhancement: identical inputs always map to the same key"""
+    material = json.dumps(
+        [GEMINI_MODEL, PROMPT_TEMPLATE_VERSION, title, raw_description, city, country, category],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+def get_cached_enhancement(db: Session, key: str) -> Optional[str]:
+    """Look the key up in memory, then in the enhancement_cache table"""
+    enhanced = _memory_cache.get(key)
+    if enhanced is not MISSING:
+        ENHANCEMENT_CACHE_LOOKUPS.labels("memory_hit").inc()
+        return enhanced
+
+    enhanced = db.query(EnhancementCacheEntry.enhanced_description).filter(
+        EnhancementCacheEntry.key == key
+    ).scalar()
+    if enhanced is None:
+        ENHANCEMENT_CACHE_LOOKUPS.labels("miss").inc()
+    else:
+        ENHANCEMENT_CACHE_LOOKUPS.labels("db_hit").inc()
+        _memory_cache.set(key, enhanced)
+    return enhanced
+
+def get_cached_enhancements(db: Session, keys: Iterable[str]) -> Dict[str, str]:
+    """Batch variant of get_cached_enhancement: one query for all memory misses"""
+    found = {}
+    missing = []
+    for key in set(keys):
+        enhanced = _memory_cache.get(key)
+        if enhanced is MISSING:
+            missing.append(key)
+        else:
+            found[key] = enhanced
+    if found:
+        ENHANCEMENT_CACHE_LOOKUPS.labels("memory_hit").inc(len(found))
+
+    if missing:
+        rows = db.query(EnhancementCacheEntry.key, EnhancementCacheEntry.enhanced_description).filter(
+            EnhancementCacheEntry.key.in_(missing)
+        ).all()
+        for key, enhanced in rows:
+            found[key] = enhanced
+            _memory_cache.set(key, enhanced)
+        if rows:
+            ENHANCEMENT_CACHE_LOOKUPS.labels("db_hit").inc(len(rows))
+        if len(rows) < len(missing):
+            ENHANCEMENT_CACHE_LOOKUPS.labels("miss").inc(len(missing) - len(rows))
+
+    return found
+
+def store_enhancement(db: Session, key: str, enhanced_description: str) -> None:
+    """Persist an enhancement in the caller's transaction (first writer wins)"""
+    db.execute(
+        insert(EnhancementCacheEntry).values(
+            key=key,
+            model_name=GEMINI_MODEL,
+            prompt_version=PROMPT_TEMPLATE_VERSION,
+            enhanced_description=enhanced_description
+        ).on_conflict_do_nothing(index_elements=[EnhancementCacheEntry.key])
+    )
+    _memory_cache.set(key, enhanced_description)
+
+def cached_enhance_poi_description(
+    db: Session,
+    title: str,
+    raw_description: str,
+    city: str,
+    country: str,
+    category: str
+) -> str:
+    """
+    generate_enhanced_description behind the content-addressed cache.
+    The Gemini call happens outside any transaction; raises EnhancementError.
+    """
+    key = enhancement_key(title, raw_description, city, country, category)
+    enhanced = get_cached_enhancement(db, key)
+    if enhanced is not None:
+        return enhanced
+    db.commit()
+
+    enhanced = generate_enhanced_description(title, raw_description, city, country, category)
+    ENHANCEMENT_GENERATIONS.inc()
+    store_enhancement(db, key, enhanced)
+    return enhanced
+
+def enhancement_cache_stats(db: Session) -> dict:
+    """
+    Entries stored in enhancement_cache, and the lookups and generations counted
+    by every process sharing PROMETHEUS_MULTIPROC_DIR (API and job workers on one
+    host; across hosts, sum their /metrics). "memory" is this process's cache only.
+    """
+    memory_hits, db_hits, db_misses = (
+        sample_value("enhancement_cache_lookups_total", {"result": result})
+        for result in ("memory_hit", "db_hit", "miss")
+    )
+    lookups = memory_hits + db_hits + db_misses
+    return {
+        "entries": db.query(func.count(EnhancementCacheEntry.key)).scalar(),
+        "memory": _memory_cache.stats(),
+        "memory_hits": int(memory_hits),
+        "db_hits": int(db_hits),
+        "db_misses": int(db_misses),
+        "generated": int(sample_value("enhancement_generations_total")),
+        "hit_rate": (memory_hits + db_hits) / lookups if lookups else 0.0,
+    }
@@ -1,13 +1,36 @@
-import google.generativeai as genai
+import threading
 from app.core.config import settings
+from app.core.metrics import track_dependency
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=settings.gemini_api_key)
+_genai = None
+_genai_lock = threading.Lock()
 
-def enhance_poi_description(
+GEMINI_MODEL = 'gemini-pro'
+# Bump whenever the prompt below changes, so cached enhancements are regenerated
+PROMPT_TEMPLATE_VERSION = 1
+
+class EnhancementError(Exception):
+    """Raised when Gemini could not produce an enhanced description"""
+
+def _get_genai():
+    """
+    The configured google.generativeai module, imported on first use: it takes
+    over half a second to import and only the job worker calls Gemini.
+    """
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            if not settings.gemini_api_key:
+                raise EnhancementError("GEMINI_API_KEY is not set")
+            import google.generativeai as genai
+            genai.configure(api_key=settings.gemini_api_key)
+            _genai = genai
+        return _genai
+
+def generate_enhanced_description(
     title: str,
     raw_description: str,
     city: str,
@@ -15,10 +38,12 @@ def enhance_poi_description(
     category: str
 ) -> str:
     """
-    Use Gemini to enhance a Point of Interest description for tourists.
+    Ask Gemini for an enhanced POI description, raising EnhancementError on
+    failure so callers (e.g. the job queue) can retry.
     """
+    genai = _get_genai()
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = genai.GenerativeModel(GEMINI_MODEL)
 
         prompt = f"""
         You are a knowledgeable tour guide creating engaging content for tourists.
@@ -43,15 +68,12 @@ def enhance_poi_description(
         Enhanced Description:
         """
 
-        response = model.generate_content(prompt)
-
-        if response and response.text:
-            return response.text.strip()
-        else:
-            logger.warning(f"Gemini returned empty response for POI: {title}")
-            return raw_description
-
+        with track_dependency("gemini", "generate_content"):
+            response = model.generate_content(prompt)
+        text = response.text if response else None
     except Exception as e:
-        logger.error(f"Error calling Gemini API for POI {title}: {str(e)}")
-        # Return original description if AI enhancement fails
-        return raw_description
\ No newline at end of file
+        raise EnhancementError(f"Error calling Gemini API for POI {title}: {str(e)}") from e
+
+    if text:
+        return text.strip()
+    raise EnhancementError(f"Gemini returned empty response for POI: {title}")
@@ -0,0 +1,144 @@
+import math
+from typing import List, Set, Tuple
+from sqlalchemy import and_, event, func, inspect, or_
+from app.models.point_of_interest import PointOfInterest
+
+EARTH_RADIUS_M = 6371008.8
+GEOHASH_PRECISION = 9  # ~5m cells, plenty for a printed QR sign
+MAX_COVERING_CELLS = 16
+MAX_NEARBY_RADIUS_M = 50000
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, char_index, even = 0, 0, True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                char_index = (char_index << 1) | 1
+                lon_range[0] = mid
+            else:
+                char_index <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                char_index = (char_index << 1) | 1
+                lat_range[0] = mid
+            else:
+                char_index <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[char_index])
+            bit, char_index = 0, 0
+
+    return "".join(chars)
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Return (height, width) of a geohash cell in degrees"""
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(latitude: float, longitude: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing the search circle"""
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    min_lat = max(latitude - d_lat, -90.0)
+    max_lat = min(latitude + d_lat, 90.0)
+    cos_lat = math.cos(math.radians(latitude))
+    if max_lat >= 90.0 or min_lat <= -90.0 or cos_lat < 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+    d_lon = math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat))
+    if d_lon >= 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, longitude - d_lon, longitude + d_lon
+
+def _lon_ranges(min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+    """Split a longitude range that crosses the antimeridian"""
+    if min_lon < -180.0:
+        return [(min_lon + 360.0, 180.0), (-180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+    return [(min_lon, max_lon)]
+
+def _steps(start: float, end: float, step: float) -> List[float]:
+    values = []
+    value = start
+    while value < end:
+        values.append(value)
+        value += step
+    values.append(end)
+    return values
+
+def covering_geohashes(min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> Set[str]:
+    """
+    Return the geohash prefixes of every cell intersecting the bounding box,
+    at the finest precision that keeps the cell count small.
+    """
+    lon_ranges = _lon_ranges(min_lon, max_lon)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        lat_cells = math.ceil((max_lat - min_lat) / height) + 1
+        lon_cells = sum(math.ceil((hi - lo) / width) + 1 for lo, hi in lon_ranges)
+        if lat_cells * lon_cells <= MAX_COVERING_CELLS:
+            break
+
+    cells = set()
+    for lat in _steps(min_lat, max_lat, height):
+        for lo, hi in lon_ranges:
+            for lon in _steps(lo, hi, width):
+                cells.add(encode_geohash(lat, min(lon, 179.9999999), precision))
+    return cells
+
+def nearby_criterion(latitude: float, longitude: float, radius_m: float):
+    """
+    Index-friendly prefilter for POIs within radius_m: geohash prefix ranges
+    (varchar_pattern_ops index) narrowed by the exact bounding box.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_m)
+    cells = covering_geohashes(min_lat, max_lat, min_lon, max_lon)
+    lon_filter = or_(*[
+        PointOfInterest.longitude.between(lo, hi) for lo, hi in _lon_ranges(min_lon, max_lon)
+    ])
+    return and_(
+        or_(*[PointOfInterest.geohash.like(f"{cell}%") for cell in sorted(cells)]),
+        PointOfInterest.latitude.between(min_lat, max_lat),
+        lon_filter
+    )
+
+def distance_expression(latitude: float, longitude: float):
+    """Great-circle distance in metres from a point to each POI, computed in SQL"""
+    d_lat = func.radians(PointOfInterest.latitude - latitude)
+    d_lon = func.radians(PointOfInterest.longitude - longitude)
+    a = (
+        func.power(func.sin(d_lat / 2), 2)
+        + math.cos(math.radians(latitude))
+        * func.cos(func.radians(PointOfInterest.latitude))
+        * func.power(func.sin(d_lon / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_M * func.asin(func.least(1.0, func.sqrt(a)))
+
+@event.listens_for(PointOfInterest, "before_insert")
+def _poi_before_insert(mapper, connection, target):
+    target.geohash = encode_geohash(target.latitude, target.longitude)
+
+@event.listens_for(PointOfInterest, "before_update")
+def _poi_before_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+        target.geohash = encode_geohash(target.latitude, target.longitude)
@@ -0,0 +1,207 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, Dict, Optional, Tuple
+from PIL import Image, ImageOps
+from app.core.config import settings
+from app.services.storage_service import get_storage
+
+logger = logging.getLogger(__name__)
+
+# name -> (longest edge in pixels, WebP quality)
+IMAGE_VARIANTS = {
+    "thumb": (320, 70),
+    "medium": (1024, 80),
+    "full": (2048, 85),
+}
+
+# name -> (webp bytes, width, height)
+RenderedVariants = Dict[str, Tuple[bytes, int, int]]
+
+# Uploads are copied to and from the worker's temporary file in chunks of this size
+COPY_CHUNK_SIZE = 1024 * 1024
+
+EXIF_ORIENTATION = 0x0112
+
+# JPEG segments kept in originals: JFIF header, ICC colour profile, Adobe colour transform
+_JPEG_KEPT_SEGMENTS = {0xE0: b"", 0xE2: b"ICC_PROFILE\0", 0xEE: b"Adobe"}
+
+class InvalidImageError(Exception):
+    pass
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded API server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.image_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def shutdown_pool() -> None:
+    """Stop the worker processes, if any were started (application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _strip_jpeg_metadata(data: bytes, orientation: int) -> bytes:
+    """
+    Copy a JPEG without its EXIF/XMP/comment segments and anything after the
+    image (e.g. embedded previews), leaving the compressed image untouched.
+    An orientation other than 1 is kept as the only EXIF tag.
+    """
+    if data[:2] != b"\xff\xd8":
+        raise InvalidImageError("Not a JPEG file")
+    out = [data[:2]]
+    if orientation != 1:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        payload = exif.tobytes()  # starts with the "Exif\0\0" header
+        out.append(b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload)
+
+    position = 2
+    while position < len(data):
+        if data[position] != 0xFF:
+            raise InvalidImageError("Corrupt JPEG segment")
+        marker = data[position + 1]
+        if marker == 0xFF:  # fill byte
+            position += 1
+            continue
+        if marker == 0xD9:  # end of image: drop whatever follows
+            out.append(data[position:position + 2])
+            break
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # markers without a length
+            out.append(data[position:position + 2])
+            position += 2
+            continue
+        length = struct.unpack(">H", data[position + 2:position + 4])[0]
+        end = position + 2 + length
+        segment = data[position:end]
+        if marker == 0xDA:
+            # Start of scan: entropy-coded data runs to the next marker that isn't
+            # byte stuffing (FF00) or a restart marker (FFD0-FFD7)
+            while end < len(data) - 1:
+                if data[end] == 0xFF and data[end + 1] != 0x00 and not 0xD0 <= data[end + 1] <= 0xD7:
+                    break
+                end += 1
+            else:
+                end = len(data)  # truncated file: keep the scan as it is
+            segment = data[position:end]
+        keep = (
+            not 0xE0 <= marker <= 0xEF and marker != 0xFE
+            or marker in _JPEG_KEPT_SEGMENTS and segment[4:].startswith(_JPEG_KEPT_SEGMENTS[marker])
+        )
+        if keep:
+            out.append(segment)
+        position = end
+    return b"".join(out)
+
+def _strip_metadata(path: str, image_format: str, orientation: int) -> None:
+    """Rewrite the original upload at `path` without metadata"""
+    with open(path, "rb") as source:
+        data = source.read()
+    if image_format == "JPEG":
+        cleaned = _strip_jpeg_metadata(data, orientation)
+    else:
+        # PNG and WebP are re-encoded (PNG losslessly), upright, without EXIF or text chunks
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        buffer = BytesIO()
+        options = {"icc_profile": image.info["icc_profile"]} if "icc_profile" in image.info else {}
+        if image_format == "WEBP":
+            options["quality"] = 95
+        image.save(buffer, format=image_format, **options)
+        cleaned = buffer.getvalue()
+    with open(path, "wb") as target:
+        target.write(cleaned)
+
+def render_image_variants(path: str) -> RenderedVariants:
+    """
+    Decode the uploaded image at `path` and encode every variant as WebP, then
+    rewrite the file itself without its metadata (GPS position, camera, XMP).
+    Orientation is applied to the variants and kept in the original.
+    Runs in a worker process.
+    """
+    try:
+        with Image.open(path) as original:
+            image_format = original.format
+            orientation = original.getexif().get(EXIF_ORIENTATION, 1)
+            # JPEGs can be decoded straight at a reduced scale, far cheaper than full size
+            largest = max(size for size, _ in IMAGE_VARIANTS.values())
+            original.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(original)
+    except Exception as e:
+        raise InvalidImageError(str(e))
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    rendered = {}
+    # Largest first, each variant resized from the previous one
+    for name, (size, quality) in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1][0]):
+        image.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+        rendered[name] = (buffer.getvalue(), image.width, image.height)
+
+    try:
+        _strip_metadata(path, image_format, orientation)
+    except InvalidImageError:
+        raise
+    except Exception as e:
+        raise InvalidImageError(str(e))
+    return rendered
+
+def create_image_variants(fileobj: BinaryIO) -> RenderedVariants:
+    """
+    Render variants of an uploaded image on the process pool, and replace the
+    upload's contents with its metadata-free copy. The worker gets the image
+    as a temporary file, not as bytes through the pool's pipe.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "upload")
+        fileobj.seek(0)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(fileobj, target, COPY_CHUNK_SIZE)
+
+        rendered = _get_pool().submit(render_image_variants, path).result()
+
+        fileobj.seek(0)
+        fileobj.truncate()
+        with open(path, "rb") as source:
+            shutil.copyfileobj(source, fileobj, COPY_CHUNK_SIZE)
+        fileobj.seek(0)
+    return rendered
+
+def store_image_variants(rendered: RenderedVariants, folder_path: str) -> Dict[str, dict]:
+    """Upload rendered variants; returns {name: {url, width, height}} for Multimedia.variants"""
+    stem = uuid.uuid4()
+    variants = {}
+    try:
+        for name, (data, width, height) in rendered.items():
+            url = get_storage().upload(BytesIO(data), f"{folder_path}/{stem}_{name}.webp", "image/webp", size=len(data))
+            variants[name] = {"url": url, "width": width, "height": height}
+    except Exception:
+        delete_image_variants(variants)
+        raise
+    return variants
+
+def delete_image_variants(variants: Optional[Dict[str, dict]]) -> None:
+    for variant in (variants or {}).values():
+        try:
+            get_storage().delete(variant["url"])
+        except Exception as e:
+            logger.error(f"Error deleting image variant from storage: {str(e)}")
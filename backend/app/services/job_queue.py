@@ -0,0 +1,161 @@
+import logging
+import random
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Dict[str, Any]], None]
+
+# Finished jobs are deleted this many rows per statement
+SWEEP_BATCH_SIZE = 1000
+
+_handlers: Dict[str, JobHandler] = {}
+_failure_handlers: Dict[str, JobHandler] = {}
+
+class JobError(Exception):
+    """Raised by a handler to fail the current attempt (it will be retried)"""
+
+def job_handler(kind: str, on_failure: Optional[JobHandler] = None):
+    """
+    Register the function that runs jobs of `kind`. `on_failure` is called
+    once the job has used up all its attempts.
+    """
+    def register(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        if on_failure is not None:
+            _failure_handlers[kind] = on_failure
+        return func
+    return register
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: Dict[str, Any],
+    max_attempts: Optional[int] = None,
+    delay_seconds: float = 0
+) -> Job:
+    """
+    Add a job to the caller's session. It is committed, and becomes visible
+    to workers, together with the rest of the caller's transaction; it runs
+    no sooner than `delay_seconds` after that.
+    """
+    job = Job(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts or settings.job_max_attempts
+    )
+    if delay_seconds:
+        job.run_at = func.now() + timedelta(seconds=delay_seconds)
+    db.add(job)
+    return job
+
+def enqueue_jobs(db: Session, kind: str, payloads: List[Dict[str, Any]], max_attempts: Optional[int] = None) -> None:
+    """Enqueue many jobs of one kind with a single multi-row INSERT"""
+    if not payloads:
+        return
+    db.execute(insert(Job).values([
+        {
+            "id": uuid.uuid4(),
+            "kind": kind,
+            "payload": payload,
+            "status": JobStatus.QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts or settings.job_max_attempts,
+        }
+        for payload in payloads
+    ]))
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, in seconds, after `attempts` failures"""
+    delay = min(settings.job_backoff_max_seconds, settings.job_backoff_base_seconds * 2 ** (attempts - 1))
+    return delay * (0.5 + random.random() / 2)
+
+def claim_next_job(db: Session) -> Optional[Job]:
+    """
+    Claim the oldest runnable job. SKIP LOCKED lets concurrent workers claim
+    different rows without blocking each other; RUNNING jobs whose lease
+    expired (crashed worker) are picked up again.
+    """
+    lease_expired = Job.locked_at < func.now() - timedelta(seconds=settings.job_lease_seconds)
+    job = db.query(Job).filter(
+        or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_at <= func.now()),
+            and_(Job.status == JobStatus.RUNNING, lease_expired)
+        )
+    ).order_by(Job.run_at).with_for_update(skip_locked=True).first()
+
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = JobStatus.RUNNING
+    job.attempts += 1
+    job.locked_at = func.now()
+    db.commit()
+    return job
+
+def run_job(db: Session, job: Job) -> bool:
+    """Run a claimed job and record the outcome. Returns True on success."""
+    job_id, kind, payload = job.id, job.kind, dict(job.payload)
+    handler = _handlers.get(kind)
+
+    try:
+        if handler is None:
+            raise JobError(f"No handler registered for job kind {kind}")
+        handler(db, payload)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Job {job_id} ({kind}) failed: {str(e)}")
+        _record_failure(db, job_id, e)
+        return False
+
+    db.query(Job).filter(Job.id == job_id).update(
+        {Job.status: JobStatus.DONE, Job.locked_at: None, Job.last_error: None},
+        synchronize_session=False
+    )
+    db.commit()
+    return True
+
+def sweep_finished_jobs(db: Session, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """
+    Delete done jobs, and failed ones older than job_failed_retention_days, in
+    batches. Rows another sweeper holds are skipped. Returns how many went.
+    """
+    failed_before = func.now() - timedelta(days=settings.job_failed_retention_days)
+    finished = or_(Job.status == JobStatus.DONE, and_(Job.status == JobStatus.FAILED, Job.updated_at < failed_before))
+    deleted = 0
+    while True:
+        batch = select(Job.id).where(finished).limit(batch_size).with_for_update(skip_locked=True)
+        count = db.execute(delete(Job).where(Job.id.in_(batch.scalar_subquery()))).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+def _record_failure(db: Session, job_id, error: Exception) -> None:
+    job = db.query(Job).filter(Job.id == job_id).with_for_update().first()
+    if job is None:
+        db.rollback()
+        return
+
+    job.last_error = str(error)[:2000]
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = JobStatus.FAILED
+        on_failure = _failure_handlers.get(job.kind)
+        if on_failure is not None:
+            try:
+                with db.begin_nested():
+                    on_failure(db, dict(job.payload))
+            except Exception as e:
+                logger.error(f"Failure handler for job {job_id} ({job.kind}) raised: {str(e)}")
+    else:
+        job.status = JobStatus.QUEUED
+        job.run_at = func.now() + timedelta(seconds=backoff_delay(job.attempts))
+    db.commit()
@@ -0,0 +1,80 @@
+import logging
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on POIs created from one KML file
+MAX_KML_POIS = 500
+
+class KMLError(Exception):
+    pass
+
+class Placemark(NamedTuple):
+    title: str
+    description: str
+    latitude: float
+    longitude: float
+
+def _local_name(tag: str) -> str:
+    # "{http://www.opengis.net/kml/2.2}Placemark" -> "Placemark"
+    return tag.rsplit("}", 1)[-1]
+
+def _parse_coordinates(text: Optional[str]) -> List[Tuple[float, float]]:
+    """Parse a KML <coordinates> body ("lon,lat[,alt] ...") into (lat, lon) pairs"""
+    points = []
+    for chunk in (text or "").split():
+        parts = chunk.split(",")
+        if len(parts) < 2:
+            raise KMLError(f"Invalid coordinate: {chunk}")
+        try:
+            longitude, latitude = float(parts[0]), float(parts[1])
+        except ValueError:
+            raise KMLError(f"Invalid coordinate: {chunk}")
+        if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+            raise KMLError(f"Coordinate out of range: {chunk}")
+        points.append((latitude, longitude))
+    return points
+
+def _placemark_stops(placemark: ET.Element) -> Iterator[Placemark]:
+    name = (placemark.findtext("{*}name") or "").strip() or "Untitled stop"
+    description = (placemark.findtext("{*}description") or "").strip() or name
+
+    # Only Points are stops. Route geometry (LineStrings) stays in the stored
+    # KML file for maps to draw; its vertices are not places to visit.
+    for element in placemark.iter():
+        if _local_name(element.tag) != "Point":
+            continue
+        for latitude, longitude in _parse_coordinates(element.findtext("{*}coordinates"))[:1]:
+            yield Placemark(name, description, latitude, longitude)
+
+def iter_kml_placemarks(fileobj: BinaryIO, max_stops: int = MAX_KML_POIS) -> Iterator[Placemark]:
+    """
+    Stream the stops (Point placemarks) of a KML document in document order.
+    Parsed placemarks are dropped from the tree as soon as they are read, so
+    memory stays flat regardless of file size.
+    """
+    stack = []
+    count = 0
+    try:
+        for event, element in ET.iterparse(fileobj, events=("start", "end")):
+            if event == "start":
+                stack.append(element)
+                continue
+
+            stack.pop()
+            if _local_name(element.tag) != "Placemark":
+                continue
+
+            for stop in _placemark_stops(element):
+                count += 1
+                if count > max_stops:
+                    raise KMLError(f"KML file has more than {max_stops} stops")
+                yield stop
+
+            # Free the placemark subtree
+            element.clear()
+            if stack:
+                stack[-1].remove(element)
+    except ET.ParseError as e:
+        raise KMLError(f"Malformed KML: {str(e)}")
@@ -0,0 +1,63 @@
+import logging
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.core.cache import TTLCache, MISSING
+from app.core.config import settings
+from app.models.tour import Tour
+from app.models.point_of_interest import PointOfInterest
+from app.schemas.point_of_interest import POIResponse
+
+logger = logging.getLogger(__name__)
+
+class CachedPOI(NamedTuple):
+    payload: bytes
+    updated_at: datetime  # Row version, for ETag / Last-Modified
+
+# Serialised POIResponse bodies of published POIs, keyed by POI id
+poi_cache = TTLCache(maxsize=settings.poi_cache_max_entries, ttl=settings.poi_cache_ttl_seconds)
+
+async def get_published_poi_payload(db: AsyncSession, poi_id: str) -> Optional[CachedPOI]:
+    """
+    Return the JSON body and version of a published POI, or None if it doesn't
+    exist or its tour isn't published. Misses load POI, tour flag and
+    multimedia in a single statement.
+    """
+    try:
+        poi_id = str(uuid.UUID(poi_id))
+    except ValueError:
+        return None
+
+    payload = poi_cache.get(poi_id)
+    if payload is not MISSING:
+        return payload
+
+    version = poi_cache.begin()
+    row = (await db.execute(
+        select(PointOfInterest, Tour.is_published).join(
+            Tour, Tour.id == PointOfInterest.tour_id
+        ).options(
+            joinedload(PointOfInterest.multimedia)
+        ).where(PointOfInterest.id == poi_id)
+    )).unique().first()
+
+    if row is None or not row[1]:
+        return None
+
+    payload = CachedPOI(POIResponse.model_validate(row[0]).model_dump_json().encode(), row[0].updated_at)
+    # A lagging replica may still return the version that was just invalidated
+    if not (db.info.get("replica") and poi_cache.invalidated_within(poi_id, settings.replica_max_lag_seconds)):
+        poi_cache.set(poi_id, payload, version=version)
+    return payload
+
+def invalidate_poi(poi_id) -> None:
+    poi_cache.invalidate(str(uuid.UUID(str(poi_id))))
+
+def invalidate_tour_pois(db: Session, tour_id) -> None:
+    """Drop every cached POI of a tour, e.g. after a publish toggle"""
+    poi_ids = db.query(PointOfInterest.id).filter(PointOfInterest.tour_id == tour_id).all()
+    for (poi_id,) in poi_ids:
+        invalidate_poi(poi_id)
@@ -0,0 +1,99 @@
+import logging
+from typing import Any, Dict
+from sqlalchemy.orm import Session
+from app.models.tour import Tour
+from app.models.point_of_interest import PointOfInterest, EnhancementStatus
+from app.services.job_queue import JobError, enqueue_job, job_handler
+from app.services.enhancement_cache import enhancement_key, get_cached_enhancement, cached_enhance_poi_description
+from app.services.qr_service import generate_poi_qr_code
+from app.services.bundle_service import queue_tour_bundle_rebuild
+
+logger = logging.getLogger(__name__)
+
+# Workers run in their own processes, so they can't invalidate the API's
+# in-process POI cache; results show up once cached entries expire.
+
+ENHANCE_POI = "enhance_poi"
+GENERATE_POI_QR = "generate_poi_qr"
+
+def queue_poi_enhancement(db: Session, poi: PointOfInterest, tour: Tour) -> None:
+    """
+    Enhance the POI's current description. Inputs seen before are answered
+    from the enhancement cache right away; anything else is marked pending
+    and queued for Gemini.
+    """
+    key = enhancement_key(poi.title, poi.description_raw, tour.city, tour.country, tour.category)
+    enhanced_description = get_cached_enhancement(db, key)
+    if enhanced_description is not None:
+        poi.description_ai_enhanced = enhanced_description
+        poi.enhancement_status = EnhancementStatus.ENHANCED
+        return
+
+    poi.enhancement_status = EnhancementStatus.PENDING
+    enqueue_job(db, ENHANCE_POI, {
+        "poi_id": str(poi.id),
+        "description_raw": poi.description_raw,
+    })
+
+def queue_poi_qr_code(db: Session, poi: PointOfInterest) -> None:
+    enqueue_job(db, GENERATE_POI_QR, {
+        "tour_id": str(poi.tour_id),
+        "poi_id": str(poi.id),
+    })
+
+def _mark_enhancement_failed(db: Session, payload: Dict[str, Any]) -> None:
+    db.query(PointOfInterest).filter(
+        PointOfInterest.id == payload["poi_id"],
+        PointOfInterest.description_raw == payload["description_raw"]
+    ).update({PointOfInterest.enhancement_status: EnhancementStatus.FAILED}, synchronize_session=False)
+
+@job_handler(ENHANCE_POI, on_failure=_mark_enhancement_failed)
+def enhance_poi(db: Session, payload: Dict[str, Any]) -> None:
+    row = db.query(PointOfInterest.title, Tour.city, Tour.country, Tour.category).join(
+        Tour, Tour.id == PointOfInterest.tour_id
+    ).filter(
+        PointOfInterest.id == payload["poi_id"],
+        PointOfInterest.description_raw == payload["description_raw"]
+    ).first()
+    if row is None:
+        # POI deleted or its description edited since; a newer job covers it
+        return
+
+    title, city, country, category = row
+    enhanced_description = cached_enhance_poi_description(
+        db,
+        title=title,
+        raw_description=payload["description_raw"],
+        city=city,
+        country=country,
+        category=category
+    )
+
+    updated = db.query(PointOfInterest).filter(
+        PointOfInterest.id == payload["poi_id"],
+        PointOfInterest.description_raw == payload["description_raw"]
+    ).update({
+        PointOfInterest.description_ai_enhanced: enhanced_description,
+        PointOfInterest.enhancement_status: EnhancementStatus.ENHANCED,
+    }, synchronize_session=False)
+    if updated:
+        # The enhanced description is part of the offline bundle
+        tour = db.query(Tour).join(PointOfInterest, PointOfInterest.tour_id == Tour.id).filter(
+            PointOfInterest.id == payload["poi_id"]
+        ).one()
+        queue_tour_bundle_rebuild(db, tour)
+
+@job_handler(GENERATE_POI_QR)
+def generate_qr_code(db: Session, payload: Dict[str, Any]) -> None:
+    exists = db.query(PointOfInterest.id).filter(PointOfInterest.id == payload["poi_id"]).first()
+    db.commit()
+    if exists is None:
+        return
+
+    qr_code_url = generate_poi_qr_code(payload["tour_id"], payload["poi_id"])
+    if not qr_code_url:
+        raise JobError(f"QR code generation failed for POI {payload['poi_id']}")
+
+    db.query(PointOfInterest).filter(PointOfInterest.id == payload["poi_id"]).update(
+        {PointOfInterest.qr_code_url: qr_code_url}, synchronize_session=False
+    )
@@ -1,54 +1,50 @@
 import qrcode
 from io import BytesIO
-from google.cloud import storage
-from app.core.config import settings
+from app.core.metrics import track_dependency
+from app.services.storage_service import get_storage
 import logging
 
 logger = logging.getLogger(__name__)
 
-def generate_poi_qr_code(tour_id: str, poi_id: str, base_url: str = "https://your-app.com") -> str:
+DEFAULT_BASE_URL = "https://your-app.com"
+
+def build_poi_url(tour_id: str, poi_id: str, base_url: str = DEFAULT_BASE_URL) -> str:
+    """URL that a POI's QR code points to"""
+    return f"{base_url}/tours/{tour_id}/poi/{poi_id}"
+
+def build_qr_image(data: str, box_size: int = 10):
+    """Render `data` as a black-on-white QR code (qrcode PilImage)"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
+def generate_poi_qr_code(tour_id: str, poi_id: str, base_url: str = DEFAULT_BASE_URL) -> str:
     """
-    Generate QR code for a POI and upload to Google Cloud Storage.
+    Generate QR code for a POI and upload it to storage.
     Returns the public URL of the uploaded QR code image.
     """
     try:
         # Create the URL that the QR code will point to
-        poi_url = f"{base_url}/tours/{tour_id}/poi/{poi_id}"
-
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(poi_url)
-        qr.make(fit=True)
-
-        # Create QR code image
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-
-        # Convert to bytes
-        img_buffer = BytesIO()
-        qr_image.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-
-        # Upload to Google Cloud Storage
-        client = storage.Client(project=settings.google_cloud_project)
-        bucket = client.bucket(settings.google_cloud_storage_bucket)
-
-        # Create blob name
-        blob_name = f"qr_codes/{tour_id}/{poi_id}.png"
-        blob = bucket.blob(blob_name)
+        poi_url = build_poi_url(tour_id, poi_id, base_url)
 
-        # Upload the file
-        blob.upload_from_file(img_buffer, content_type='image/png')
+        with track_dependency("qrcode", "render"):
+            # Create QR code image
+            qr_image = build_qr_image(poi_url)
 
-        # Make the blob publicly readable
-        blob.make_public()
+            # Convert to bytes
+            img_buffer = BytesIO()
+            qr_image.save(img_buffer, format='PNG')
+            img_buffer.seek(0)
 
-        # Return the public URL
-        return blob.public_url
+        # Upload to storage (publicly readable)
+        blob_name = f"qr_codes/{tour_id}/{poi_id}.png"
+        return get_storage().upload(img_buffer, blob_name, 'image/png', size=img_buffer.getbuffer().nbytes)
 
     except Exception as e:
         logger.error(f"Error generating QR code for POI {poi_id}: {str(e)}")
@@ -0,0 +1,111 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.services.qr_service import build_poi_url, build_qr_image
+
+logger = logging.getLogger(__name__)
+
+# A4 portrait at 150 dpi, 3 x 4 codes per page
+PAGE_DPI = 150
+PAGE_SIZE = (1240, 1754)
+PAGE_MARGIN = 60
+GRID_COLUMNS = 3
+GRID_ROWS = 4
+CODES_PER_PAGE = GRID_COLUMNS * GRID_ROWS
+LABEL_HEIGHT = 70
+
+# (order_in_tour, title, url) for one code on the sheet
+SheetItem = Tuple[int, str, str]
+
+# Rendered sheets keyed by (tour_id, content version, format, page)
+sheet_cache = TTLCache(maxsize=settings.qr_sheet_cache_max_entries, ttl=settings.qr_sheet_cache_ttl_seconds)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded API server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.qr_sheet_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def shutdown_pool() -> None:
+    """Stop the worker processes, if any were started (application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _fit_text(draw: ImageDraw.ImageDraw, text: str, font, max_width: int) -> str:
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+def render_sheet_page(items: List[SheetItem], page_number: int, page_count: int, tour_title: str) -> bytes:
+    """Render one sheet page as PNG bytes. Runs in a worker process."""
+    page = Image.new("L", PAGE_SIZE, "white")
+    draw = ImageDraw.Draw(page)
+    title_font = ImageFont.load_default(size=32)
+    label_font = ImageFont.load_default(size=24)
+
+    header = _fit_text(draw, f"{tour_title}  ({page_number}/{page_count})", title_font, PAGE_SIZE[0] - 2 * PAGE_MARGIN)
+    draw.text((PAGE_MARGIN, PAGE_MARGIN // 2), header, fill="black", font=title_font)
+
+    top = PAGE_MARGIN + 40
+    cell_width = (PAGE_SIZE[0] - 2 * PAGE_MARGIN) // GRID_COLUMNS
+    cell_height = (PAGE_SIZE[1] - top - PAGE_MARGIN) // GRID_ROWS
+    code_size = min(cell_width, cell_height - LABEL_HEIGHT) - 20
+
+    for index, (order_in_tour, title, url) in enumerate(items):
+        column, row = index % GRID_COLUMNS, index // GRID_COLUMNS
+        x = PAGE_MARGIN + column * cell_width
+        y = top + row * cell_height
+
+        code = build_qr_image(url, box_size=6).get_image().convert("L")
+        code = code.resize((code_size, code_size), Image.NEAREST)
+        page.paste(code, (x + (cell_width - code_size) // 2, y))
+
+        label = _fit_text(draw, f"{order_in_tour}. {title}", label_font, cell_width - 10)
+        label_width = draw.textlength(label, font=label_font)
+        draw.text((x + (cell_width - label_width) / 2, y + code_size + 10), label, fill="black", font=label_font)
+
+    buffer = BytesIO()
+    page.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def render_qr_sheet(tour_id: str, tour_title: str, pois: List[Tuple[str, int, str]]) -> List[bytes]:
+    """
+    Render printable sheet pages (PNG bytes) for (poi_id, order_in_tour, title)
+    tuples. Pages are rendered in parallel on the process pool.
+    """
+    items = [(order, title, build_poi_url(tour_id, poi_id)) for poi_id, order, title in pois]
+    chunks = [items[i:i + CODES_PER_PAGE] for i in range(0, len(items), CODES_PER_PAGE)] or [[]]
+    page_count = len(chunks)
+
+    pool = _get_pool()
+    futures = [
+        pool.submit(render_sheet_page, chunk, number, page_count, tour_title)
+        for number, chunk in enumerate(chunks, start=1)
+    ]
+    return [future.result() for future in futures]
+
+def pages_to_pdf(pages: List[bytes]) -> bytes:
+    # Bilevel pages are stored losslessly and ~20x smaller than greyscale/RGB
+    images = [Image.open(BytesIO(page)).convert("1", dither=Image.Dither.NONE) for page in pages]
+    buffer = BytesIO()
+    images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=PAGE_DPI)
+    return buffer.getvalue()
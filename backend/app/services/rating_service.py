@@ -0,0 +1,107 @@
+import logging
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Float, cast, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.tour import Tour
+from app.models.rating import Rating
+from app.services.job_queue import job_handler
+
+logger = logging.getLogger(__name__)
+
+RECOMPUTE_RATING_AGGREGATES = "recompute_rating_aggregates"
+
+STARS = range(1, 6)
+
+def star_column(stars: int):
+    return getattr(Tour, f"rating_count_{stars}")
+
+def rating_distribution(tour: Tour) -> Dict[int, int]:
+    return {stars: getattr(tour, f"rating_count_{stars}") for stars in STARS}
+
+def _apply_delta(db: Session, tour_id, count_delta: int, sum_delta: int, star_deltas: Dict[int, int]) -> None:
+    """
+    Adjust the tour's aggregates in one UPDATE. Every value is computed from
+    the row's current values under its row lock, so concurrent votes can't
+    overwrite each other.
+    """
+    total = func.coalesce(Tour.total_ratings, 0) + count_delta
+    values = {
+        Tour.total_ratings: total,
+        Tour.rating_sum: Tour.rating_sum + sum_delta,
+        Tour.average_rating: func.coalesce(cast(Tour.rating_sum + sum_delta, Float) / func.nullif(total, 0), 0.0),
+    }
+    for stars, delta in star_deltas.items():
+        if delta:
+            values[star_column(stars)] = star_column(stars) + delta
+    db.execute(update(Tour).where(Tour.id == tour_id).values(values).execution_options(synchronize_session=False))
+
+def submit_rating(db: Session, tour_id, user_id, stars: int, comment: Optional[str]) -> Rating:
+    """
+    Create the user's rating of a tour, or replace it, and update the tour's
+    aggregates in the caller's transaction.
+    """
+    inserted = db.execute(
+        insert(Rating).values(tour_id=tour_id, user_id=user_id, rating=stars, comment=comment)
+        .on_conflict_do_nothing(constraint="ratings_tour_id_user_id_key")
+        .returning(Rating.id)
+    ).scalar()
+
+    if inserted is not None:
+        _apply_delta(db, tour_id, 1, stars, {stars: 1})
+        return db.query(Rating).filter(Rating.id == inserted).one()
+
+    # Re-rate: lock the existing row so the old value we subtract is the one we replace
+    rating = db.query(Rating).filter(
+        Rating.tour_id == tour_id,
+        Rating.user_id == user_id
+    ).with_for_update().one()
+    previous = rating.rating
+    rating.rating = stars
+    rating.comment = comment
+    db.flush()
+
+    if previous != stars:
+        _apply_delta(db, tour_id, 0, stars - previous, {previous: -1, stars: 1})
+    return rating
+
+def recompute_rating_aggregates(db: Session, tour_ids: Optional[List[str]] = None) -> None:
+    """Rebuild aggregates from the ratings table with two bulk UPDATEs"""
+    aggregates = select(
+        Rating.tour_id,
+        func.count().label("total"),
+        func.sum(Rating.rating).label("rating_sum"),
+        *[func.count().filter(Rating.rating == stars).label(f"count_{stars}") for stars in STARS]
+    ).group_by(Rating.tour_id)
+    if tour_ids:
+        aggregates = aggregates.where(Rating.tour_id.in_(tour_ids))
+    aggregates = aggregates.subquery()
+
+    rated = {
+        Tour.total_ratings: aggregates.c.total,
+        Tour.rating_sum: aggregates.c.rating_sum,
+        Tour.average_rating: cast(aggregates.c.rating_sum, Float) / aggregates.c.total,
+        **{star_column(stars): aggregates.c[f"count_{stars}"] for stars in STARS},
+    }
+    db.execute(
+        update(Tour).where(Tour.id == aggregates.c.tour_id).values(rated)
+        .execution_options(synchronize_session=False)
+    )
+
+    unrated = update(Tour).where(
+        ~exists().where(Rating.tour_id == Tour.id),
+        or_(Tour.total_ratings != 0, Tour.rating_sum != 0)
+    ).values({
+        Tour.total_ratings: 0,
+        Tour.rating_sum: 0,
+        Tour.average_rating: 0.0,
+        **{star_column(stars): 0 for stars in STARS},
+    })
+    if tour_ids:
+        unrated = unrated.where(Tour.id.in_(tour_ids))
+    db.execute(unrated.execution_options(synchronize_session=False))
+
+@job_handler(RECOMPUTE_RATING_AGGREGATES)
+def recompute_rating_aggregates_job(db: Session, payload: Dict[str, Any]) -> None:
+    recompute_rating_aggregates(db, payload.get("tour_ids"))
+    logger.info(f"Recomputed rating aggregates for {len(payload.get('tour_ids') or []) or 'all'} tours")
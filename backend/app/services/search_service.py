@@ -0,0 +1,269 @@
+import math
+import re
+import threading
+import time
+import uuid
+import unicodedata
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Float, case, cast, event, func, inspect, literal
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.db.query_tracker import untracked
+from app.models.tour import Tour
+
+logger = logging.getLogger(__name__)
+
+SEARCHABLE_FIELDS = ("title", "description", "city", "country", "category")
+
+# Relative weight of each field in the in-memory index (mirrors setweight A/B/C)
+FIELD_WEIGHTS = {"title": 3.0, "city": 2.0, "description": 1.0}
+
+# Minimum trigram similarity for a misspelled query term to match an indexed term
+FUZZY_THRESHOLD = 0.3
+
+# Upper bound of matches handed back to SQL by the in-memory backend
+MAX_MEMORY_MATCHES = 1000
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Session.info key of index changes waiting for their transaction to commit
+_PENDING_KEY = "search_index_pending"
+
+def normalize_text(value: Optional[str]) -> str:
+    """Lowercase and strip accents so 'Málaga' and 'malaga' compare equal"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold().strip()
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalize_text(value))
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def trigram_similarity(a: str, b: str) -> float:
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+def _weighted_terms(title: str, description: Optional[str], city: str) -> Dict[str, float]:
+    weighted: Dict[str, float] = defaultdict(float)
+    for field, text in (("title", title), ("description", description), ("city", city)):
+        for token in tokenize(text):
+            weighted[token] += FIELD_WEIGHTS[field]
+    return weighted
+
+class InMemoryTourSearchIndex:
+    """
+    Pure-Python inverted index over tour title/description/city.
+    Used when Postgres full-text extensions are unavailable (tests, local dev);
+    scoring is weighted tf-idf with trigram-based typo tolerance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._trigram_terms: Dict[str, Set[str]] = defaultdict(set)
+        self._doc_terms: Dict[str, Set[str]] = {}
+        # time.monotonic() of the last full load, None until then
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    @property
+    def built(self) -> bool:
+        return self.loaded_at is not None
+
+    def is_stale(self, ttl_seconds: float) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > ttl_seconds
+
+    def add(self, tour_id: str, title: str, description: Optional[str], city: str) -> None:
+        weighted = _weighted_terms(title, description, city)
+        with self._lock:
+            self._add_locked(tour_id, weighted)
+
+    def remove(self, tour_id: str) -> None:
+        with self._lock:
+            self._remove_locked(tour_id)
+
+    def load(self, rows: Iterable[Tuple[str, str, Optional[str], str]]) -> None:
+        """Replace the whole index with (tour_id, title, description, city) rows"""
+        fresh = InMemoryTourSearchIndex()
+        for tour_id, title, description, city in rows:
+            fresh._add_locked(tour_id, _weighted_terms(title, description, city))
+        # Searches keep using the previous contents until the swap
+        with self._lock:
+            self._postings, self._trigram_terms, self._doc_terms = fresh._postings, fresh._trigram_terms, fresh._doc_terms
+            self.loaded_at = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._trigram_terms = defaultdict(set)
+            self._doc_terms = {}
+            self.loaded_at = None
+
+    def _add_locked(self, tour_id: str, weighted: Dict[str, float]) -> None:
+        self._remove_locked(tour_id)
+        for token, weight in weighted.items():
+            if token not in self._postings:
+                for gram in trigrams(token):
+                    self._trigram_terms[gram].add(token)
+            self._postings[token][tour_id] = weight
+        self._doc_terms[tour_id] = set(weighted)
+
+    def _remove_locked(self, tour_id: str) -> None:
+        for token in self._doc_terms.pop(tour_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(tour_id, None)
+            if not postings:
+                del self._postings[token]
+                for gram in trigrams(token):
+                    self._trigram_terms[gram].discard(token)
+
+    def _expand_term(self, term: str) -> List[Tuple[str, float]]:
+        """Return indexed terms matching a query term, with a similarity factor"""
+        if term in self._postings:
+            return [(term, 1.0)]
+
+        candidates: Set[str] = set()
+        for gram in trigrams(term):
+            candidates |= self._trigram_terms.get(gram, set())
+
+        expanded = []
+        for candidate in candidates:
+            if candidate.startswith(term):
+                expanded.append((candidate, 0.9))
+                continue
+            similarity = trigram_similarity(term, candidate)
+            if similarity >= FUZZY_THRESHOLD:
+                expanded.append((candidate, similarity))
+        return expanded
+
+    def search(self, query: str, limit: int = MAX_MEMORY_MATCHES) -> Dict[str, float]:
+        """Return {tour_id: relevance} for the best matching tours"""
+        terms = tokenize(query)
+        if not terms:
+            return {}
+
+        with self._lock:
+            total_docs = max(len(self._doc_terms), 1)
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                for indexed_term, similarity in self._expand_term(term):
+                    postings = self._postings[indexed_term]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for tour_id, weight in postings.items():
+                        scores[tour_id] += similarity * idf * weight
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return dict(best)
+
+tour_search_index = InMemoryTourSearchIndex()
+
+def _use_memory_backend() -> bool:
+    return settings.search_backend == "memory"
+
+def rebuild_memory_index(db: Session) -> None:
+    """Load every tour into the in-memory index"""
+    rows = db.query(Tour.id, Tour.title, Tour.description, Tour.city).all()
+    tour_search_index.load((str(tour_id), title, description, city) for tour_id, title, description, city in rows)
+    logger.info(f"Built in-memory tour search index with {len(rows)} tours")
+
+def build_tour_search(db: Session, search_query: str):
+    """
+    Return (criterion, rank) SQL expressions for a free-text tour search.
+    The criterion restricts rows to matches and rank orders them by relevance,
+    whichever backend answered the query.
+    """
+    normalized = normalize_text(search_query)
+
+    if _use_memory_backend():
+        # This process only sees its own writes as they commit; reload to pick up everyone else's
+        if tour_search_index.is_stale(settings.search_memory_index_ttl_seconds):
+            # A reload isn't the request's own work: keep it out of its query budget
+            with untracked():
+                rebuild_memory_index(db)
+        scores = tour_search_index.search(normalized)
+        if not scores:
+            return literal(False), literal(0.0)
+        ranked = {uuid.UUID(tour_id): score for tour_id, score in scores.items()}
+        criterion = Tour.id.in_(list(ranked))
+        rank = case(ranked, value=Tour.id, else_=0.0)
+        return criterion, cast(rank, Float)
+
+    ts_query = func.websearch_to_tsquery("simple", normalized)
+    # `<%` is pg_trgm word similarity: tolerates typos in title/city terms
+    criterion = Tour.search_vector.op("@@")(ts_query) | literal(normalized).op("<%")(Tour.search_document)
+    rank = func.ts_rank_cd(Tour.search_vector, ts_query) + func.word_similarity(normalized, Tour.search_document)
+    return criterion, cast(rank, Float)
+
+def _weighted_vector(text: Optional[str], weight: str):
+    return func.setweight(func.to_tsvector("simple", normalize_text(text)), weight)
+
+def _refresh_search_columns(target: Tour) -> None:
+    target.city_key = normalize_text(target.city)
+    target.country_key = normalize_text(target.country)
+    target.category_key = normalize_text(target.category)
+    target.search_document = normalize_text(f"{target.title} {target.city}")
+    target.search_vector = (
+        _weighted_vector(target.title, "A")
+        .op("||")(_weighted_vector(target.city, "B"))
+        .op("||")(_weighted_vector(target.description, "C"))
+    )
+
+def _search_fields_changed(target: Tour) -> bool:
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in SEARCHABLE_FIELDS)
+
+@event.listens_for(Tour, "before_insert")
+def _tour_before_insert(mapper, connection, target):
+    _refresh_search_columns(target)
+
+@event.listens_for(Tour, "before_update")
+def _tour_before_update(mapper, connection, target):
+    if _search_fields_changed(target):
+        _refresh_search_columns(target)
+
+def _pending_changes(target: Tour) -> Optional[dict]:
+    session = object_session(target)
+    return None if session is None else session.info.setdefault(_PENDING_KEY, {})
+
+# The index follows committed data only: changes are queued on the session
+# and applied after its commit, or dropped with a rollback
+
+@event.listens_for(Tour, "after_insert")
+@event.listens_for(Tour, "after_update")
+def _tour_after_write(mapper, connection, target):
+    if _use_memory_backend() and tour_search_index.built and _search_fields_changed(target):
+        pending = _pending_changes(target)
+        if pending is not None:
+            pending[str(target.id)] = (target.title, target.description, target.city)
+
+@event.listens_for(Tour, "after_delete")
+def _tour_after_delete(mapper, connection, target):
+    if _use_memory_backend() and tour_search_index.built:
+        pending = _pending_changes(target)
+        if pending is not None:
+            pending[str(target.id)] = None
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session):
+    for tour_id, fields in session.info.pop(_PENDING_KEY, {}).items():
+        if fields is None:
+            tour_search_index.remove(tour_id)
+        else:
+            tour_search_index.add(tour_id, *fields)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,185 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional
+from requests.adapters import HTTPAdapter
+from app.core.config import settings
+from app.core.metrics import track_dependency
+
+logger = logging.getLogger(__name__)
+
+# Larger files go through a resumable upload sent in chunks of this size,
+# which bounds memory per upload (GCS requires a multiple of 256KB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+
+COPY_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+class StorageBackend(ABC):
+    """Where uploaded files live. Objects are addressed by a relative path and exposed by public URL."""
+
+    @abstractmethod
+    def upload(self, fileobj: BinaryIO, path: str, content_type: Optional[str], size: Optional[int] = None) -> str:
+        """Store `fileobj` at `path` and return its public URL"""
+
+    @abstractmethod
+    def delete(self, file_url: str) -> None:
+        """Delete the object behind a URL returned by upload(); unknown URLs are ignored"""
+
+    @abstractmethod
+    def download(self, file_url: str) -> bytes:
+        """Read back the object behind a URL returned by upload()"""
+
+    @abstractmethod
+    def download_range(self, file_url: str, start: int, end: int) -> bytes:
+        """Read bytes `start` to `end` (inclusive) of the object behind a URL returned by upload()"""
+
+class GCSStorageBackend(StorageBackend):
+    """
+    Google Cloud Storage. One client per process: its authorized HTTP session
+    keeps a pool of TLS connections that every upload and delete reuses.
+    """
+
+    def __init__(self, project: str, bucket_name: str, pool_size: int):
+        self.project = project
+        self.bucket_name = bucket_name
+        self.pool_size = pool_size
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                # ~150ms to import; only processes that actually store files pay for it
+                from google.cloud import storage
+                client = storage.Client(project=self.project)
+                # The default pool keeps 10 connections; size it for concurrent uploads
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                client._http.mount("https://", adapter)
+                self._client = client
+            return self._client
+
+    @track_dependency("gcs", "upload")
+    def upload(self, fileobj: BinaryIO, path: str, content_type: Optional[str], size: Optional[int] = None) -> str:
+        blob = self.client.bucket(self.bucket_name).blob(path)
+        if size is None or size > UPLOAD_CHUNK_SIZE:
+            blob.chunk_size = UPLOAD_CHUNK_SIZE
+        # Public-read is applied by the upload itself, not by a second make_public() call
+        blob.upload_from_file(fileobj, size=size, content_type=content_type, predefined_acl="publicRead")
+        return blob.public_url
+
+    def _blob_for_url(self, file_url: str):
+        # URL format: https://storage.googleapis.com/bucket-name/path/to/file
+        if "storage.googleapis.com" not in file_url:
+            return None
+        bucket_name = file_url.split("/")[3]
+        blob_name = "/".join(file_url.split("/")[4:])
+        return self.client.bucket(bucket_name).blob(blob_name)
+
+    @track_dependency("gcs", "delete")
+    def delete(self, file_url: str) -> None:
+        blob = self._blob_for_url(file_url)
+        if blob is not None:
+            blob.delete()
+
+    @track_dependency("gcs", "download")
+    def download(self, file_url: str) -> bytes:
+        blob = self._blob_for_url(file_url)
+        if blob is None:
+            raise ValueError(f"Not a storage URL: {file_url}")
+        return blob.download_as_bytes()
+
+    @track_dependency("gcs", "download_range")
+    def download_range(self, file_url: str, start: int, end: int) -> bytes:
+        blob = self._blob_for_url(file_url)
+        if blob is None:
+            raise ValueError(f"Not a storage URL: {file_url}")
+        return blob.download_as_bytes(start=start, end=end)
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files on local disk, served by the API under /media (see app.main).
+    For on-prem deployments, local development and load tests.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            raise ValueError(f"Path escapes storage root: {path}")
+        return full_path
+
+    @track_dependency("local_storage", "upload")
+    def upload(self, fileobj: BinaryIO, path: str, content_type: Optional[str], size: Optional[int] = None) -> str:
+        full_path = self._full_path(path)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(fileobj, out, COPY_BUFFER_SIZE)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        return f"{self.base_url}/{path}"
+
+    @track_dependency("local_storage", "delete")
+    def delete(self, file_url: str) -> None:
+        prefix = f"{self.base_url}/"
+        if not file_url.startswith(prefix):
+            return
+        try:
+            os.remove(self._full_path(file_url[len(prefix):]))
+        except FileNotFoundError:
+            pass
+
+    def _path_for_url(self, file_url: str) -> str:
+        prefix = f"{self.base_url}/"
+        if not file_url.startswith(prefix):
+            raise ValueError(f"Not a storage URL: {file_url}")
+        return self._full_path(file_url[len(prefix):])
+
+    @track_dependency("local_storage", "download")
+    def download(self, file_url: str) -> bytes:
+        with open(self._path_for_url(file_url), "rb") as f:
+            return f.read()
+
+    @track_dependency("local_storage", "download_range")
+    def download_range(self, file_url: str, start: int, end: int) -> bytes:
+        with open(self._path_for_url(file_url), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> StorageBackend:
+    """The process-wide storage backend selected by STORAGE_BACKEND"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if settings.storage_backend == "local":
+                _storage = LocalStorageBackend(settings.local_storage_path, settings.local_storage_base_url)
+            elif settings.storage_backend == "gcs":
+                if not settings.google_cloud_storage_bucket:
+                    raise ValueError("STORAGE_BACKEND=gcs needs GOOGLE_CLOUD_STORAGE_BUCKET")
+                _storage = GCSStorageBackend(
+                    settings.google_cloud_project,
+                    settings.google_cloud_storage_bucket,
+                    settings.storage_pool_size
+                )
+            else:
+                raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+            logger.info(f"Using {settings.storage_backend} storage backend")
+        return _storage
@@ -0,0 +1,60 @@
+"""
+Pytest plugin for tests of this app: enable with `pytest -p app.testing` or
+`pytest_plugins = ["app.testing"]` in conftest.py.
+
+The `query_budget` fixture fails a test whose requests run more SQL than
+their route declares with @max_queries (app.db.query_tracker), or than an
+explicit limit:
+
+    def test_tour_details(client, query_budget):
+        client.get(f"/tours/{tour_id}")      # checked against the route's @max_queries
+
+        with query_budget(3):
+            client.get(f"/tours/{tour_id}/pois")   # each request: at most 3 statements
+"""
+from contextlib import contextmanager
+from typing import List
+import pytest
+from app.core.config import settings
+from app.db.query_tracker import RequestQueries, add_observer, remove_observer
+
+def _describe(queries: RequestQueries, limit: int) -> str:
+    lines = [f"{queries.method} {queries.route} ran {queries.tracker.count} SQL statements, over its budget of {limit}"]
+    for statement, count in queries.tracker.repeated(settings.db_query_repeat_threshold):
+        lines.append(f"  {count}x {' '.join(statement.split())[:200]}")
+    return "\n".join(lines)
+
+class QueryBudget:
+    """Requests seen during one test"""
+
+    def __init__(self):
+        self.requests: List[RequestQueries] = []
+
+    def observe(self, queries: RequestQueries) -> None:
+        self.requests.append(queries)
+
+    @contextmanager
+    def __call__(self, limit: int):
+        first = len(self.requests)
+        yield self
+        failures = [_describe(queries, limit) for queries in self.requests[first:] if queries.tracker.count > limit]
+        if failures:
+            pytest.fail("\n".join(failures), pytrace=False)
+
+    def over_declared_budgets(self) -> List[str]:
+        return [
+            _describe(queries, queries.budget) for queries in self.requests
+            if queries.budget is not None and queries.tracker.count > queries.budget
+        ]
+
+@pytest.fixture
+def query_budget():
+    budget = QueryBudget()
+    add_observer(budget.observe)
+    try:
+        yield budget
+    finally:
+        remove_observer(budget.observe)
+    failures = budget.over_declared_budgets()
+    if failures:
+        pytest.fail("\n".join(failures), pytrace=False)
@@ -0,0 +1,102 @@
+"""
+Background job worker.
+
+Run with `python -m app.worker`; starts `settings.worker_processes` processes,
+each running `settings.worker_threads` threads that claim jobs from the
+`jobs` table and run them. SKIP LOCKED keeps the threads from colliding.
+The parent deletes finished jobs every `settings.job_sweep_interval_seconds`.
+With `settings.worker_metrics_port` set, the parent serves their metrics
+(see app.core.metrics; needs PROMETHEUS_MULTIPROC_DIR).
+"""
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from app.core.config import settings
+from app.core.metrics import MULTIPROCESS, serve_worker_metrics
+from app.db.database import SessionLocal
+from app.services.job_queue import claim_next_job, run_job, sweep_finished_jobs
+import app.services.poi_jobs  # noqa: F401  (registers the POI job handlers)
+import app.services.bundle_service  # noqa: F401  (registers the tour bundle job handler)
+import app.services.rating_service  # noqa: F401  (registers the rating aggregates job handler)
+
+logger = logging.getLogger(__name__)
+
+def run_worker(stop_event=None) -> None:
+    """Claim and run jobs until stop_event is set"""
+    while stop_event is None or not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db)
+            if job is None:
+                time.sleep(settings.job_poll_interval_seconds)
+                continue
+            run_job(db, job)
+        except Exception as e:
+            logger.error(f"Worker loop error: {str(e)}")
+            time.sleep(settings.job_poll_interval_seconds)
+        finally:
+            db.close()
+
+def run_sweeper(stop_event) -> None:
+    """Delete finished jobs until stop_event is set"""
+    while not stop_event.wait(settings.job_sweep_interval_seconds):
+        db = SessionLocal()
+        try:
+            deleted = sweep_finished_jobs(db)
+            if deleted:
+                logger.info(f"Deleted {deleted} finished jobs")
+        except Exception as e:
+            logger.error(f"Job sweep error: {str(e)}")
+        finally:
+            db.close()
+
+def _worker_process(stop_event) -> None:
+    # The parent handles SIGINT/SIGTERM and tells children to stop via stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    threads = [
+        threading.Thread(target=run_worker, args=(stop_event,), name=f"job-thread-{i}")
+        for i in range(settings.worker_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+
+    def shutdown(signum, frame):
+        logger.info("Stopping workers")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    processes = [
+        context.Process(target=_worker_process, args=(stop_event,), name=f"job-worker-{i}")
+        for i in range(settings.worker_processes)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {len(processes)} job worker processes")
+
+    sweeper = threading.Thread(target=run_sweeper, args=(stop_event,), name="job-sweeper", daemon=True)
+    sweeper.start()
+
+    if settings.worker_metrics_port is not None:
+        if MULTIPROCESS:
+            serve_worker_metrics(settings.worker_metrics_port)
+            logger.info(f"Serving worker metrics on port {settings.worker_metrics_port}")
+        else:
+            logger.warning("WORKER_METRICS_PORT needs PROMETHEUS_MULTIPROC_DIR; worker metrics not served")
+
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
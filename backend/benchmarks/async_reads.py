@@ -0,0 +1,106 @@
+"""
+Benchmark: requests/sec of a public read on the sync and the async stack.
+
+Serves, from one uvicorn worker, the old sync implementation of
+GET /tours/{tour_id} (def route, psycopg2 session on the threadpool) at
+/sync/tours/{id} next to the app itself (async def route, asyncpg session)
+mounted at /async. Both are then driven with the same number of concurrent
+keep-alive clients for a fixed time; requests taking longer than
+REQUEST_TIMEOUT seconds are counted as errors.
+
+Needs the app settings in the environment and a database with at least one
+published tour:
+
+    python -m benchmarks.async_reads [concurrency] [seconds]
+"""
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy.orm import Session
+from app.db.database import SessionLocal, get_db
+from app.main import app as main_app
+from app.models.tour import Tour
+from app.schemas.tour import TourResponse
+
+PORT = 8765
+# Requests stuck longer than this count as errors (e.g. waiting on an exhausted pool)
+REQUEST_TIMEOUT = 10
+
+app = FastAPI()
+
+@app.get("/sync/tours/{tour_id}", response_model=TourResponse)
+def get_tour_details_sync(tour_id: str, db: Session = Depends(get_db)):
+    tour = db.query(Tour).filter(Tour.id == tour_id).first()
+    if not tour or not tour.is_published:
+        raise HTTPException(status_code=404, detail="Tour not found")
+    return tour
+
+app.mount("/async", main_app)
+
+async def drive(url: str, concurrency: int, seconds: float):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                except httpx.TimeoutException:
+                    errors += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    if not latencies:
+        return 0.0, float("nan"), float("nan"), errors
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)], errors
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    db = SessionLocal()
+    tour_id = db.query(Tour.id).filter(Tour.is_published == True).limit(1).scalar()
+    db.close()
+    if tour_id is None:
+        sys.exit("No published tour in the database")
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "benchmarks.async_reads:app",
+        "--port", str(PORT), "--log-level", "warning", "--no-access-log"
+    ])
+    try:
+        base = f"http://127.0.0.1:{PORT}"
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/async/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        print(f"GET /tours/{{id}}, {concurrency} concurrent clients, {seconds:.0f}s each")
+        for name, path in (("sync", f"/sync/tours/{tour_id}"), ("async", f"/async/tours/{tour_id}")):
+            asyncio.run(drive(base + path, concurrency, 1))  # warm up pools
+            rate, p50, p99, errors = asyncio.run(drive(base + path, concurrency, seconds))
+            print(f"  {name:5} {rate:8.1f} req/s  p50 {p50 * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms  errors {errors}")
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: bcrypt login throughput.
+
+Reports, for a few work factors, how many password checks per second one
+core sustains, then drives the real hashing pool (password_hash_workers
+processes, BCRYPT_ROUNDS) with a burst of concurrent logins and reports
+logins/sec, logins/sec per worker and how many were turned away with 503.
+
+Needs the app settings in the environment (no database connection is made):
+
+    python -m benchmarks.password_hashing [concurrent logins]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core import passwords
+from app.core.config import settings
+
+PASSWORD = "correct horse battery staple"
+
+def per_core_rate(rounds: int) -> float:
+    hashed = passwords._hash(PASSWORD, rounds)
+    checks = max(1, 2 ** (14 - rounds))
+    started = time.perf_counter()
+    for _ in range(checks):
+        passwords._verify_and_update(PASSWORD, hashed, rounds)
+    return checks / (time.perf_counter() - started)
+
+def burst(hashed: str, logins: int):
+    def login(_):
+        try:
+            return passwords.verify_and_update(PASSWORD, hashed)[0]
+        except passwords.PasswordHasherBusy:
+            return None
+
+    # Warm the pool so process start-up isn't measured
+    for _ in range(settings.password_hash_workers):
+        login(None)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=logins) as callers:
+        results = list(callers.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    return results.count(True), results.count(None), elapsed
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+
+    print("password checks per second on one core")
+    for rounds in (10, 11, 12, 13):
+        print(f"  cost {rounds}: {per_core_rate(rounds):7.1f}/s")
+
+    rounds = settings.bcrypt_rounds
+    workers = settings.password_hash_workers
+    accepted, rejected, elapsed = burst(passwords._hash(PASSWORD, rounds), logins)
+    rate = accepted / elapsed
+    print(
+        f"burst of {logins} logins at cost {rounds}, {workers} workers, "
+        f"{settings.password_hash_max_pending} pending allowed:"
+    )
+    print(f"  {accepted} served in {elapsed:.2f}s ({rate:.1f}/s, {rate / workers:.1f}/s per worker), {rejected} got 503")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: per-item cost of serialising list responses.
+
+"before" is the previous path: build pydantic models, validate them again
+through response_model and render with the stdlib JSONResponse.
+"after" is the trusted path: plain dicts of ORM values rendered by orjson.
+Also reports gzip/brotli sizes of a POI list with long descriptions.
+
+Needs the app settings in the environment (no database connection is made):
+
+    python -m benchmarks.serialization [items]
+"""
+import gzip
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+from typing import List
+import brotli
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.core.responses import FastJSONResponse, dump_trusted
+from app.models.point_of_interest import PointOfInterest, EnhancementStatus
+from app.models.multimedia import Multimedia, FileType
+from app.models.tour import Tour
+from app.schemas.point_of_interest import POIResponse
+from app.schemas.tour import TourListPage, TourListResponse
+
+DESCRIPTION = (
+    "Built in the 12th century as the minaret of the Almohad mosque, the tower was later "
+    "crowned with a Renaissance belfry. Visitors climb 35 ramps wide enough for a horse. "
+) * 6
+
+def make_tours(count: int):
+    now = datetime.now(timezone.utc)
+    return [
+        (Tour(
+            id=uuid.uuid4(), title=f"Old town walk {i}", description=DESCRIPTION[:200], city="Sevilla",
+            country="Spain", category="history", duration_minutes=90, average_rating=4.5,
+            total_ratings=120, created_at=now, updated_at=now
+        ), "guide")
+        for i in range(count)
+    ]
+
+def make_pois(count: int):
+    now = datetime.now(timezone.utc)
+    pois = []
+    for i in range(count):
+        poi = PointOfInterest(
+            id=uuid.uuid4(), tour_id=uuid.uuid4(), title=f"Stop {i}", description_raw=DESCRIPTION[:300],
+            description_ai_enhanced=DESCRIPTION, enhancement_status=EnhancementStatus.ENHANCED,
+            latitude=37.38, longitude=-5.99, qr_code_url=f"https://example.com/qr/{i}.png",
+            order_in_tour=i, created_at=now, updated_at=now
+        )
+        poi.multimedia = [
+            Multimedia(
+                id=uuid.uuid4(), poi_id=poi.id, file_url="https://example.com/a.jpg", file_type=FileType.IMAGE,
+                caption="Facade", created_at=now,
+                variants={"thumb": {"url": "https://example.com/a_thumb.webp", "width": 320, "height": 240}}
+            )
+        ]
+        pois.append(poi)
+    return pois
+
+def tour_item(tour, guide_username):
+    return {
+        "id": tour.id, "title": tour.title, "description": tour.description, "city": tour.city,
+        "country": tour.country, "category": tour.category, "duration_minutes": tour.duration_minutes,
+        "average_rating": tour.average_rating, "total_ratings": tour.total_ratings,
+        "guide_username": guide_username,
+    }
+
+page_adapter = TypeAdapter(TourListPage)
+poi_list_adapter = TypeAdapter(List[POIResponse])
+
+def tours_before(rows):
+    items = [TourListResponse(**{**tour_item(tour, username), "id": str(tour.id)}) for tour, username in rows]
+    page = page_adapter.validate_python(TourListPage(items=items, next_cursor=None), from_attributes=True)
+    return JSONResponse(page_adapter.dump_python(page, mode="json")).body
+
+def tours_after(rows):
+    return FastJSONResponse({"items": [tour_item(tour, username) for tour, username in rows], "next_cursor": None}).body
+
+def pois_before(pois):
+    validated = poi_list_adapter.validate_python(pois, from_attributes=True)
+    return JSONResponse(poi_list_adapter.dump_python(validated, mode="json")).body
+
+def pois_after(pois):
+    return FastJSONResponse([dump_trusted(POIResponse, poi) for poi in pois]).body
+
+def per_item_us(func, data, count: int) -> float:
+    runs = 20
+    return min(timeit.repeat(lambda: func(data), number=runs, repeat=5)) / runs / count * 1e6
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    tours = make_tours(count)
+    pois = make_pois(count)
+
+    print(f"{count} items per response, microseconds per item")
+    for name, before, after, data in (
+        ("tour list", tours_before, tours_after, tours),
+        ("POI list", pois_before, pois_after, pois),
+    ):
+        slow = per_item_us(before, data, count)
+        fast = per_item_us(after, data, count)
+        print(f"  {name:10} before {slow:7.2f}  after {fast:7.2f}  ({slow / fast:.1f}x)")
+
+    body = pois_after(pois)
+    print(f"POI list body: {len(body)} bytes, gzip {len(gzip.compress(body, 6))}, brotli {len(brotli.compress(body, quality=4))}")
+
+if __name__ == "__main__":
+    main()
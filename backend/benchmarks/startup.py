@@ -0,0 +1,76 @@
+"""
+Benchmark: cold start of an API worker.
+
+Each run is a fresh interpreter that imports app.main, enters the app's
+lifespan and serves its first requests in-process: GET /health (no database)
+and GET /tours (first database connection). Reports the median and worst of
+each phase over the runs, plus the slowest modules imported by app.main
+(from `python -X importtime`) to show where import time goes.
+
+Needs the app settings in the environment and a migrated database:
+
+    python -m benchmarks.startup [runs]
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+DEFAULT_RUNS = 10
+TOP_IMPORTS = 10
+
+PROBE = """
+import json, time
+from fastapi.testclient import TestClient  # the harness, not the app: not timed
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    ready = time.perf_counter()
+    assert client.get("/health").status_code == 200
+    health = time.perf_counter()
+    assert client.get("/tours").status_code == 200
+    tours = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "lifespan startup": ready - imported,
+    "first GET /health": health - ready,
+    "first GET /tours": tours - health,
+}))
+"""
+
+def _probe() -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def _slowest_imports() -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level and direct children only: their cumulative times don't overlap much
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            modules.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(modules, reverse=True)[:TOP_IMPORTS]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS
+    samples = [_probe() for _ in range(runs)]
+
+    print(f"{runs} cold starts")
+    for phase in samples[0]:
+        values = [sample[phase] for sample in samples]
+        print(f"  {phase:<20} median {statistics.median(values) * 1000:7.1f} ms   max {max(values) * 1000:7.1f} ms")
+
+    print("slowest imports (cumulative)")
+    for seconds, name in _slowest_imports():
+        print(f"  {seconds * 1000:7.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+#!/bin/sh
+# Let postgres-replica (docker-compose.yml) stream WAL from this server.
+# Runs from /docker-entrypoint-initdb.d, i.e. only when the data volume is first created.
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
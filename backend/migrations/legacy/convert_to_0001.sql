@@ -0,0 +1,136 @@
+-- Bring a database set up before migrations (by create_tables.sql, by
+-- Base.metadata.create_all on startup, or both) to the schema of revision 0001,
+-- after which Alembic can take over:
+--
+--   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f migrations/legacy/convert_to_0001.sql
+--   alembic stamp 0001
+--   alembic upgrade head
+--
+-- Safe to run more than once; everything happens in one transaction. Take a
+-- backup first. Column defaults create_tables.sql declared (gen_random_uuid(),
+-- 0, 'EUR', ...) are left in place: the models set those values themselves.
+
+BEGIN;
+
+-- Enum types. create_tables.sql named them user_role, ... with lowercase labels;
+-- the models store member names ('ADMIN') in types named userrole, ...
+DO $$
+DECLARE
+    legacy_names text[] := ARRAY['user_role', 'file_type', 'payment_method', 'tip_status', 'enhancement_status', 'job_status'];
+    model_names text[] := ARRAY['userrole', 'filetype', 'paymentmethod', 'tipstatus', 'enhancementstatus', 'jobstatus'];
+    label text;
+BEGIN
+    FOR i IN 1..array_length(legacy_names, 1) LOOP
+        IF to_regtype(legacy_names[i]) IS NOT NULL THEN
+            EXECUTE format('ALTER TYPE %I RENAME TO %I', legacy_names[i], model_names[i]);
+        END IF;
+        FOR label IN
+            SELECT enumlabel FROM pg_enum
+            WHERE enumtypid = to_regtype(model_names[i]) AND enumlabel <> upper(enumlabel)
+        LOOP
+            EXECUTE format('ALTER TYPE %I RENAME VALUE %L TO %L', model_names[i], label, upper(label));
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Uniqueness on users is a unique index (ix_*), not a constraint plus a plain index
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_username_key;
+ALTER TABLE users DROP CONSTRAINT IF EXISTS users_email_key;
+DROP INDEX IF EXISTS idx_users_username;
+DROP INDEX IF EXISTS idx_users_email;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email);
+
+-- Single-column indexes the models name ix_<table>_<column>
+DO $$
+DECLARE
+    legacy_names text[] := ARRAY['idx_tours_title', 'idx_tours_city', 'idx_tours_country', 'idx_tours_category',
+                                 'idx_tours_city_key', 'idx_tours_country_key', 'idx_tours_category_key'];
+BEGIN
+    FOR i IN 1..array_length(legacy_names, 1) LOOP
+        IF to_regclass(legacy_names[i]) IS NOT NULL THEN
+            IF to_regclass(replace(legacy_names[i], 'idx_', 'ix_')) IS NULL THEN
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', legacy_names[i], replace(legacy_names[i], 'idx_', 'ix_'));
+            ELSE
+                EXECUTE format('DROP INDEX %I', legacy_names[i]);
+            END IF;
+        END IF;
+    END LOOP;
+END $$;
+CREATE INDEX IF NOT EXISTS ix_tours_title ON tours (title);
+CREATE INDEX IF NOT EXISTS ix_tours_city ON tours (city);
+CREATE INDEX IF NOT EXISTS ix_tours_country ON tours (country);
+CREATE INDEX IF NOT EXISTS ix_tours_category ON tours (category);
+CREATE INDEX IF NOT EXISTS ix_tours_city_key ON tours (city_key);
+CREATE INDEX IF NOT EXISTS ix_tours_country_key ON tours (country_key);
+CREATE INDEX IF NOT EXISTS ix_tours_category_key ON tours (category_key);
+CREATE INDEX IF NOT EXISTS ix_users_id ON users (id);
+CREATE INDEX IF NOT EXISTS ix_tours_id ON tours (id);
+CREATE INDEX IF NOT EXISTS ix_points_of_interest_id ON points_of_interest (id);
+CREATE INDEX IF NOT EXISTS ix_multimedia_id ON multimedia (id);
+CREATE INDEX IF NOT EXISTS ix_ratings_id ON ratings (id);
+CREATE INDEX IF NOT EXISTS ix_tips_id ON tips (id);
+CREATE INDEX IF NOT EXISTS ix_jobs_id ON jobs (id);
+CREATE INDEX IF NOT EXISTS ix_tour_bundles_id ON tour_bundles (id);
+
+-- Indexes create_all never made (they only existed in create_tables.sql)
+CREATE INDEX IF NOT EXISTS idx_tours_guide_id ON tours (guide_id);
+CREATE INDEX IF NOT EXISTS idx_tours_is_published ON tours (is_published);
+CREATE INDEX IF NOT EXISTS idx_poi_tour_id ON points_of_interest (tour_id);
+CREATE INDEX IF NOT EXISTS idx_poi_coordinates ON points_of_interest (latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_multimedia_poi_id ON multimedia (poi_id);
+CREATE INDEX IF NOT EXISTS idx_tips_tour_id ON tips (tour_id);
+CREATE INDEX IF NOT EXISTS idx_tips_giver_user_id ON tips (giver_user_id);
+CREATE INDEX IF NOT EXISTS idx_tips_status ON tips (status);
+
+-- Foreign keys without ON DELETE CASCADE: the ORM cascades deletes itself
+ALTER TABLE points_of_interest DROP CONSTRAINT IF EXISTS points_of_interest_tour_id_fkey,
+    ADD CONSTRAINT points_of_interest_tour_id_fkey FOREIGN KEY (tour_id) REFERENCES tours (id);
+ALTER TABLE multimedia DROP CONSTRAINT IF EXISTS multimedia_poi_id_fkey,
+    ADD CONSTRAINT multimedia_poi_id_fkey FOREIGN KEY (poi_id) REFERENCES points_of_interest (id);
+ALTER TABLE ratings DROP CONSTRAINT IF EXISTS ratings_tour_id_fkey,
+    ADD CONSTRAINT ratings_tour_id_fkey FOREIGN KEY (tour_id) REFERENCES tours (id);
+ALTER TABLE tips DROP CONSTRAINT IF EXISTS tips_tour_id_fkey,
+    ADD CONSTRAINT tips_tour_id_fkey FOREIGN KEY (tour_id) REFERENCES tours (id);
+ALTER TABLE tour_bundles DROP CONSTRAINT IF EXISTS tour_bundles_tour_id_fkey,
+    ADD CONSTRAINT tour_bundles_tour_id_fkey FOREIGN KEY (tour_id) REFERENCES tours (id);
+
+-- Rating range check (create_all didn't add it)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ratings_rating_check') THEN
+        ALTER TABLE ratings ADD CONSTRAINT ratings_rating_check CHECK (rating >= 1 AND rating <= 5);
+    END IF;
+END $$;
+
+-- updated_at triggers
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+DROP TRIGGER IF EXISTS update_users_updated_at ON users;
+CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_tours_updated_at ON tours;
+CREATE TRIGGER update_tours_updated_at BEFORE UPDATE ON tours
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_poi_updated_at ON points_of_interest;
+CREATE TRIGGER update_poi_updated_at BEFORE UPDATE ON points_of_interest
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_jobs_updated_at ON jobs;
+CREATE TRIGGER update_jobs_updated_at BEFORE UPDATE ON jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Trigram search index, where pg_trgm can be installed (as in 0001)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_tours_search_document_trgm ON tours USING GIN (search_document gin_trgm_ops);
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,31 @@
+"""tour content version
+
+tours.content_updated_at changes only when the tour's content does, not on
+every rating like updated_at. Existing tours start from their updated_at.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 23:40:12.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tours', sa.Column('content_updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE tours SET content_updated_at = COALESCE(updated_at, created_at, now())")
+    op.alter_column('tours', 'content_updated_at', nullable=False, server_default=sa.text('now()'))
+
+
+def downgrade() -> None:
+    op.drop_column('tours', 'content_updated_at')
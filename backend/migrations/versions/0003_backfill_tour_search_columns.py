@@ -0,0 +1,77 @@
+"""backfill tour search columns
+
+Tours written before search_service maintained city_key, country_key,
+category_key, search_document and search_vector have them NULL, so they
+never match a search or a city/country/category filter. Fill them in with
+the same normalization the ORM listeners apply on every write.
+
+Needs a database connection: with --sql this revision emits nothing.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:21:37.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.services.search_service import normalize_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+SELECT_BATCH = sa.text("""
+    SELECT id, title, description, city, country, category FROM tours
+    WHERE search_vector IS NULL AND id > :after
+    ORDER BY id LIMIT :limit
+""")
+
+UPDATE_TOUR = sa.text("""
+    UPDATE tours SET
+        city_key = :city_key,
+        country_key = :country_key,
+        category_key = :category_key,
+        search_document = :search_document,
+        search_vector = setweight(to_tsvector('simple', :title), 'A')
+            || setweight(to_tsvector('simple', :city), 'B')
+            || setweight(to_tsvector('simple', :description), 'C')
+    WHERE id = :id
+""")
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        return
+    connection = op.get_bind()
+    after = '00000000-0000-0000-0000-000000000000'
+    while True:
+        rows = connection.execute(SELECT_BATCH, {"after": after, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        connection.execute(UPDATE_TOUR, [
+            {
+                "id": row.id,
+                "city_key": normalize_text(row.city),
+                "country_key": normalize_text(row.country),
+                "category_key": normalize_text(row.category),
+                "search_document": normalize_text(f"{row.title} {row.city}"),
+                "title": normalize_text(row.title),
+                "city": normalize_text(row.city),
+                "description": normalize_text(row.description),
+            }
+            for row in rows
+        ])
+        after = rows[-1].id
+
+
+def downgrade() -> None:
+    # The columns stay in the schema; nothing to undo
+    pass
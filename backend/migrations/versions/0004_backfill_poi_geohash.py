@@ -0,0 +1,57 @@
+"""backfill poi geohash
+
+POIs written before geo_service maintained points_of_interest.geohash have
+it NULL, so the nearby searches, which select by geohash prefix, never
+return them. Compute it the way the ORM listeners do on every write.
+
+Needs a database connection: with --sql this revision emits nothing.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:48:05.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.services.geo_service import encode_geohash
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+SELECT_BATCH = sa.text("""
+    SELECT id, latitude, longitude FROM points_of_interest
+    WHERE geohash IS NULL AND id > :after
+    ORDER BY id LIMIT :limit
+""")
+
+UPDATE_POI = sa.text("UPDATE points_of_interest SET geohash = :geohash WHERE id = :id")
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        return
+    connection = op.get_bind()
+    after = '00000000-0000-0000-0000-000000000000'
+    while True:
+        rows = connection.execute(SELECT_BATCH, {"after": after, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        connection.execute(UPDATE_POI, [
+            {"id": row.id, "geohash": encode_geohash(row.latitude, row.longitude)}
+            for row in rows
+        ])
+        after = rows[-1].id
+
+
+def downgrade() -> None:
+    # The column stays in the schema; nothing to undo
+    pass
@@ -0,0 +1,34 @@
+"""partial index on active jobs
+
+Finished jobs stay in the table until the worker sweeps them; index only
+the queued and running ones the workers claim from.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 21:47:34.171755
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('idx_jobs_status_run_at', table_name='jobs')
+    op.create_index(
+        'idx_jobs_active_status_run_at', 'jobs', ['status', 'run_at'], unique=False,
+        postgresql_where=sa.text("status IN ('QUEUED', 'RUNNING')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_jobs_active_status_run_at', table_name='jobs')
+    op.create_index('idx_jobs_status_run_at', 'jobs', ['status', 'run_at'], unique=False)
@@ -0,0 +1,137 @@
+import io
+import threading
+import zipfile
+import pytest
+from sqlalchemy import func
+from app.db.database import SessionLocal
+from app.models import Job, PointOfInterest, Tour
+from app.models.job import JobStatus
+from app.services import bundle_service
+from app.services.bundle_service import BUILD_TOUR_BUNDLE, build_tour_bundle
+
+def _rebuild_jobs(db, tour) -> int:
+    return db.query(Job).filter(
+        Job.kind == BUILD_TOUR_BUNDLE, Job.status == JobStatus.QUEUED, Job.payload["tour_id"].astext == str(tour.id)
+    ).count()
+
+@pytest.fixture(autouse=True)
+def remove_jobs(db):
+    yield
+    db.query(Job).filter(Job.kind == BUILD_TOUR_BUNDLE).delete(synchronize_session=False)
+    db.commit()
+
+def test_first_request_queues_the_build(client, make_tour, db):
+    tour = make_tour(pois=2)
+    response = client.get(f"/tours/{tour.id}/bundle")
+    assert response.status_code == 202
+    assert response.headers["Retry-After"]
+    assert _rebuild_jobs(db, tour) == 1
+
+    build_tour_bundle(db, db.get(Tour, tour.id))
+    response = client.get(f"/tours/{tour.id}/bundle")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert "manifest.json" in archive.namelist()
+
+def test_outdated_bundle_is_served_while_the_rebuild_waits(client, make_tour, db):
+    tour = make_tour(pois=2)
+    built = build_tour_bundle(db, db.get(Tour, tour.id))
+    db.query(PointOfInterest).filter(PointOfInterest.tour_id == tour.id).update({"title": "Renamed"})
+    db.commit()
+    bundle_service.queue_tour_bundle_rebuild(db, db.get(Tour, tour.id))
+    db.commit()
+
+    response = client.get(f"/tours/{tour.id}/bundle")
+    assert response.status_code == 200
+    assert response.headers["X-Content-Hash"] == built.content_hash
+    # The delayed rebuild is brought forward rather than queued twice
+    assert _rebuild_jobs(db, tour) == 1
+    due = db.query(Job).filter(Job.kind == BUILD_TOUR_BUNDLE, Job.payload["tour_id"].astext == str(tour.id)).one()
+    assert db.query(Job.id).filter(Job.id == due.id, Job.run_at <= func.now()).first() is not None
+
+def test_ranges_are_read_from_storage(client, make_tour, db):
+    tour = make_tour(pois=2)
+    build_tour_bundle(db, db.get(Tour, tour.id))
+    full = client.get(f"/tours/{tour.id}/bundle").content
+
+    response = client.get(f"/tours/{tour.id}/bundle", headers={"Range": "bytes=10-99"})
+    assert response.status_code == 206
+    assert response.content == full[10:100]
+    assert response.headers["Content-Range"] == f"bytes 10-99/{len(full)}"
+
+def test_since_the_current_bundle_returns_an_empty_delta(client, make_tour, db):
+    tour = make_tour(pois=2)
+    build_tour_bundle(db, db.get(Tour, tour.id))
+    full = client.get(f"/tours/{tour.id}/bundle")
+    content_hash = full.headers["X-Content-Hash"]
+
+    response = client.get(f"/tours/{tour.id}/bundle", params={"since": content_hash})
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ["delta.json", "manifest.json"]
+
+    revalidated = client.get(f"/tours/{tour.id}/bundle", headers={"If-None-Match": full.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+def test_content_changes_queue_one_rebuild(client, make_tour, db, auth_headers):
+    tour = make_tour(pois=2)
+    guide = db.get(Tour, tour.id).guide
+    poi_id = db.query(PointOfInterest.id).filter(PointOfInterest.tour_id == tour.id).first()[0]
+
+    for title in ("First edit", "Second edit"):
+        response = client.put(f"/tours/{tour.id}/pois/{poi_id}", json={"title": title}, headers=auth_headers(guide))
+        assert response.status_code == 200, response.text
+    assert _rebuild_jobs(db, tour) == 1
+
+def test_ratings_queue_no_rebuild(client, make_tour, make_user, db, auth_headers):
+    tour = make_tour(pois=1)
+    response = client.post(f"/tours/{tour.id}/ratings", json={"rating": 5}, headers=auth_headers(make_user()))
+    assert response.status_code in (200, 201), response.text
+    assert _rebuild_jobs(db, tour) == 0
+
+def test_delta_lists_changed_files(client, make_tour, db):
+    tour = make_tour(pois=2)
+    old = build_tour_bundle(db, db.get(Tour, tour.id))
+    poi = db.query(PointOfInterest).filter(PointOfInterest.tour_id == tour.id).order_by(PointOfInterest.order_in_tour).first()
+    poi.title = "Renamed"
+    db.commit()
+    new = build_tour_bundle(db, db.get(Tour, tour.id))
+
+    response = client.get(f"/tours/{tour.id}/bundle", params={"since": old.content_hash})
+    assert response.headers["X-Content-Hash"] == new.content_hash
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert sorted(archive.namelist()) == ["delta.json", "manifest.json", f"pois/{poi.id}.json"]
+        assert b"Renamed" in archive.read(f"pois/{poi.id}.json")
+
+def test_build_commits_before_rendering(make_tour, db, monkeypatch):
+    tour = make_tour(pois=2)
+    open_transactions = []
+    render = bundle_service._render_archive
+    monkeypatch.setattr(
+        bundle_service, "_render_archive", lambda *args: open_transactions.append(db.in_transaction()) or render(*args)
+    )
+    build_tour_bundle(db, db.get(Tour, tour.id))
+    assert open_transactions == [False]
+
+def test_builds_wait_for_a_build_in_another_process(make_tour, db, monkeypatch):
+    tour = make_tour(pois=2)
+    renders = []
+    render = bundle_service._render_archive
+    monkeypatch.setattr(bundle_service, "_render_archive", lambda *args: renders.append(1) or render(*args))
+
+    def build():
+        session = SessionLocal()
+        try:
+            build_tour_bundle(session, session.get(Tour, tour.id))
+        finally:
+            session.close()
+
+    builder = threading.Thread(target=build)
+    # Another worker holding the tour's build lock
+    with bundle_service._tour_build_lock(db, tour.id):
+        builder.start()
+        builder.join(timeout=1.0)
+        assert builder.is_alive() and renders == []
+
+    builder.join(timeout=10.0)
+    assert not builder.is_alive() and renders == [1]
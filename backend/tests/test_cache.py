@@ -0,0 +1,25 @@
+from app.core.cache import MISSING, TTLCache
+
+def test_max_bytes_evicts_least_recently_used():
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.get("a")
+    cache.set("c", b"1234")
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == b"1234" and cache.get("c") == b"1234"
+    assert cache.stats()["bytes"] == 8
+
+def test_values_over_max_bytes_are_not_cached():
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10)
+    cache.set("a", b"1234")
+    assert cache.set("big", b"x" * 11) is False
+    assert cache.get("a") == b"1234"
+
+def test_replacing_and_invalidating_release_bytes():
+    cache = TTLCache(maxsize=10, ttl=60, max_bytes=10)
+    cache.set("a", b"1234")
+    cache.set("a", b"12")
+    assert cache.stats()["bytes"] == 2
+    cache.invalidate("a")
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,24 @@
+from app.models import Tour
+from app.services.bundle_service import build_tour_bundle
+
+def test_not_modified_carries_the_compressed_validators(client, make_tour):
+    tour = make_tour(pois=12)
+    response = client.get(f"/tours/{tour.id}/pois", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/")
+
+    revalidated = client.get(f"/tours/{tour.id}/pois", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert "Accept-Encoding" in revalidated.headers["Vary"]
+
+def test_not_modified_keeps_a_strong_validator_the_client_holds(client, make_tour, db):
+    tour = make_tour(pois=1)
+    build_tour_bundle(db, db.get(Tour, tour.id))
+    etag = client.get(f"/tours/{tour.id}/bundle", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert not etag.startswith("W/")
+
+    revalidated = client.get(f"/tours/{tour.id}/bundle", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
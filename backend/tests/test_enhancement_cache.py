@@ -0,0 +1,26 @@
+import uuid
+from app.models import EnhancementCacheEntry
+from app.models.user import UserRole
+from app.services import enhancement_cache
+from app.services.enhancement_cache import cached_enhance_poi_description, enhancement_key
+
+def test_stats_count_generations_and_hits(client, db, make_user, auth_headers, monkeypatch):
+    monkeypatch.setattr(enhancement_cache, "generate_enhanced_description", lambda *args: "Enhanced")
+    admin = auth_headers(make_user(UserRole.ADMIN))
+    title = f"Stop {uuid.uuid4().hex}"
+    before = client.get("/pois/enhancement-cache/stats", headers=admin).json()
+
+    try:
+        for _ in range(2):
+            assert cached_enhance_poi_description(db, title, "A stop", "Sevilla", "Spain", "History") == "Enhanced"
+            db.commit()
+        after = client.get("/pois/enhancement-cache/stats", headers=admin).json()
+    finally:
+        key = enhancement_key(title, "A stop", "Sevilla", "Spain", "History")
+        db.query(EnhancementCacheEntry).filter(EnhancementCacheEntry.key == key).delete()
+        db.commit()
+
+    assert after["generated"] == before["generated"] + 1
+    assert after["db_misses"] == before["db_misses"] + 1
+    assert after["memory_hits"] == before["memory_hits"] + 1
+    assert after["entries"] == before["entries"] + 1
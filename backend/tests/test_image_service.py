@@ -0,0 +1,60 @@
+import tempfile
+from io import BytesIO
+import pytest
+from PIL import Image
+from app.services.image_service import EXIF_ORIENTATION, IMAGE_VARIANTS, create_image_variants, render_image_variants
+
+GPS_IFD = 0x8825
+
+def _photo(format: str = "JPEG", orientation: int = 6, **options) -> bytes:
+    image = Image.effect_noise((640, 480), 40).convert("RGB")
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = orientation
+    exif[0x010F] = "Camera maker"
+    exif.get_ifd(GPS_IFD)[2] = (37.0, 23.0, 0.0)  # GPSLatitude
+    buffer = BytesIO()
+    image.save(buffer, format=format, exif=exif.tobytes(), **options)
+    return buffer.getvalue()
+
+def _render(data: bytes):
+    with tempfile.NamedTemporaryFile() as upload:
+        upload.write(data)
+        upload.flush()
+        rendered = render_image_variants(upload.name)
+        with open(upload.name, "rb") as cleaned:
+            return rendered, cleaned.read()
+
+@pytest.mark.parametrize("options", [{}, {"progressive": True}])
+def test_jpeg_metadata_is_stripped_without_reencoding(options):
+    original = _photo(**options)
+    # Phones append previews and depth maps after the image; they carry EXIF too
+    rendered, cleaned = _render(original + _photo())
+
+    exif = Image.open(BytesIO(cleaned)).getexif()
+    assert dict(exif) == {EXIF_ORIENTATION: 6}
+    assert exif.get_ifd(GPS_IFD) == {}
+    assert b"Camera maker" not in cleaned
+    assert Image.open(BytesIO(cleaned)).tobytes() == Image.open(BytesIO(original)).tobytes()
+    # Variants are upright: 640x480 rotated by the orientation tag
+    assert rendered["full"][1:] == (480, 640)
+    assert set(rendered) == set(IMAGE_VARIANTS)
+
+def test_upright_jpeg_keeps_no_exif_at_all():
+    _, cleaned = _render(_photo(orientation=1))
+    assert dict(Image.open(BytesIO(cleaned)).getexif()) == {}
+
+def test_png_is_reencoded_upright_without_exif():
+    original = _photo(format="PNG")
+    _, cleaned = _render(original)
+    image = Image.open(BytesIO(cleaned))
+    assert dict(image.getexif()) == {}
+    assert image.size == (480, 640)
+    assert image.tobytes() == Image.open(BytesIO(original)).transpose(Image.Transpose.ROTATE_270).tobytes()
+
+def test_create_image_variants_replaces_the_upload_in_place():
+    upload = tempfile.SpooledTemporaryFile(max_size=1024)
+    upload.write(_photo())
+    rendered = create_image_variants(upload)
+    assert upload.tell() == 0
+    assert dict(Image.open(upload).getexif()) == {EXIF_ORIENTATION: 6}
+    assert rendered["thumb"][1:] == (240, 320)
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+from app.models import Job
+from app.models.job import JobStatus
+from app.services.job_queue import sweep_finished_jobs
+
+def test_sweep_deletes_done_and_old_failed_jobs(db):
+    jobs = {
+        name: Job(kind="test_sweep", payload={"name": name}, status=status)
+        for name, status in [
+            ("queued", JobStatus.QUEUED), ("running", JobStatus.RUNNING), ("done", JobStatus.DONE),
+            ("done_too", JobStatus.DONE), ("failed", JobStatus.FAILED), ("old_failed", JobStatus.FAILED),
+        ]
+    }
+    # A trigger stamps updated_at on every UPDATE: backdate it on insert
+    jobs["old_failed"].updated_at = datetime.now(timezone.utc) - timedelta(days=30)
+    db.add_all(jobs.values())
+    db.commit()
+
+    try:
+        assert sweep_finished_jobs(db, batch_size=1) >= 3
+        remaining = {payload["name"] for (payload,) in db.query(Job.payload).filter(Job.kind == "test_sweep")}
+        assert remaining == {"queued", "running", "failed"}
+    finally:
+        db.query(Job).filter(Job.kind == "test_sweep").delete(synchronize_session=False)
+        db.commit()
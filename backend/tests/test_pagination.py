@@ -0,0 +1,42 @@
+import base64
+import json
+import uuid
+import pytest
+
+def _cursor(*payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(payload)).encode()).decode().rstrip("=")
+
+@pytest.mark.parametrize("sort_by, value", [
+    ("created_at", 12345),
+    ("created_at", "yesterday"),
+    ("average_rating", "4.5"),
+    ("average_rating", True),
+    ("relevance", "high"),
+])
+def test_cursor_values_of_the_wrong_type_are_rejected(client, sort_by, value):
+    params = {"sort_by": sort_by, "order": "desc", "cursor": _cursor(sort_by, "desc", value, str(uuid.uuid4()))}
+    if sort_by == "relevance":
+        params["search_query"] = "giralda"
+    response = client.get("/tours/", params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_rating_cursor_with_a_number_is_rejected(client, make_tour):
+    tour = make_tour()
+    cursor = _cursor("created_at", "desc", 12345, str(uuid.uuid4()))
+    response = client.get(f"/tours/{tour.id}/ratings", params={"cursor": cursor})
+    assert response.status_code == 400
+
+def test_next_cursor_pages_through_tours(client, make_tour):
+    tours = [make_tour(title=f"Page {n}") for n in range(3)]
+    created = {str(tour.id) for tour in tours}
+    for sort_by in ("created_at", "average_rating"):
+        seen, cursor = [], None
+        while True:
+            params = {"sort_by": sort_by, "limit": 1, **({"cursor": cursor} if cursor else {})}
+            page = client.get("/tours/", params=params).json()
+            seen += [item["id"] for item in page["items"] if item["id"] in created]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(created)
@@ -0,0 +1,61 @@
+"""
+Routes declaring @max_queries, called through the query_budget fixture so a
+test fails when a route runs more SQL than its budget (e.g. an N+1 query).
+Every tour has several POIs, media and ratings: a query per row would show.
+"""
+import pytest
+from app.core.config import settings
+from app.models import Multimedia, PointOfInterest, Rating, Tour
+from app.models.multimedia import FileType
+from app.models.user import UserRole
+from app.services.search_service import tour_search_index
+
+@pytest.fixture
+def rated_tour(db, make_tour, make_user):
+    tour = make_tour(pois=3, title="Cathedral and Giralda")
+    for stars in (5, 4, 3):
+        db.add(Rating(tour_id=tour.id, user_id=make_user(UserRole.VISITOR).id, rating=stars, comment="Good"))
+    db.commit()
+    return tour
+
+@pytest.fixture
+def poi_with_media(db, rated_tour):
+    poi = db.query(PointOfInterest).filter(PointOfInterest.tour_id == rated_tour.id).first()
+    db.add_all([
+        Multimedia(poi_id=poi.id, file_url=f"/media/photo-{n}.jpg", file_type=FileType.IMAGE) for n in range(3)
+    ])
+    db.commit()
+    return poi
+
+def test_tour_routes(client, query_budget, rated_tour, auth_headers, db):
+    guide = db.get(Tour, rated_tour.id).guide
+    for path in (
+        "/tours/my-tours", "/tours/", f"/tours/?city={rated_tour.city}", f"/tours/{rated_tour.id}",
+        "/tours/nearby?lat=37.381&lon=-5.99"
+    ):
+        assert client.get(path, headers=auth_headers(guide)).status_code == 200
+    assert len(query_budget.requests) == 5
+
+def test_memory_search_reload_stays_within_budget(client, query_budget, rated_tour, monkeypatch):
+    monkeypatch.setattr(settings, "search_backend", "memory")
+    tour_search_index.clear()  # the first search builds the index
+    try:
+        response = client.get("/tours/", params={"search_query": "giralda", "sort_by": "relevance"})
+    finally:
+        tour_search_index.clear()
+    assert response.status_code == 200
+    assert str(rated_tour.id) in [item["id"] for item in response.json()["items"]]
+
+def test_poi_routes(client, query_budget, poi_with_media):
+    for path in (
+        f"/tours/{poi_with_media.tour_id}/pois", f"/pois/{poi_with_media.id}", "/pois/nearby?lat=37.381&lon=-5.99",
+        f"/pois/{poi_with_media.id}/media", f"/pois/{poi_with_media.id}/media?size=thumb"
+    ):
+        assert client.get(path).status_code == 200
+
+def test_rating_routes(client, query_budget, rated_tour, db, auth_headers):
+    visitor = db.query(Rating).filter(Rating.tour_id == rated_tour.id).first().user
+    assert client.get(f"/tours/{rated_tour.id}/ratings").json()["items"]
+    assert client.get(f"/tours/{rated_tour.id}/ratings", params={"with_comment": True, "limit": 1}).status_code == 200
+    assert client.get(f"/tours/{rated_tour.id}/ratings/summary").status_code == 200
+    assert client.get("/users/me/ratings", headers=auth_headers(visitor)).json()["items"]
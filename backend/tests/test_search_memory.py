@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import insert
+from app.core.config import settings
+from app.models import Tour
+from app.services.search_service import InMemoryTourSearchIndex, build_tour_search, rebuild_memory_index, tour_search_index
+
+@pytest.fixture
+def memory_backend(monkeypatch, db):
+    monkeypatch.setattr(settings, "search_backend", "memory")
+    monkeypatch.setattr(settings, "search_memory_index_ttl_seconds", 3600.0)
+    rebuild_memory_index(db)
+    yield tour_search_index
+    tour_search_index.clear()
+
+def test_matches_ignore_accents_and_case():
+    index = InMemoryTourSearchIndex()
+    index.add("1", "Catedral de Málaga", "Gothic and Renaissance", "Málaga")
+    assert "1" in index.search("MALAGA")
+    assert "1" in index.search("renaissance")
+
+def test_misspelled_and_prefix_terms_match():
+    index = InMemoryTourSearchIndex()
+    index.add("1", "Alhambra palaces", None, "Granada")
+    assert "1" in index.search("alhambar")
+    assert "1" in index.search("alham")
+    assert index.search("zzzz") == {}
+
+def test_title_matches_outrank_description_matches():
+    index = InMemoryTourSearchIndex()
+    index.add("title", "Flamenco night", None, "Sevilla")
+    index.add("description", "Tapas crawl", "Ends with flamenco", "Sevilla")
+    scores = index.search("flamenco")
+    assert scores["title"] > scores["description"]
+
+def test_load_replaces_every_entry():
+    index = InMemoryTourSearchIndex()
+    index.add("old", "Roman walls", None, "Lugo")
+    index.load([("new", "Roman bridge", None, "Córdoba")])
+    assert set(index.search("roman")) == {"new"}
+    assert index.built and not index.is_stale(60)
+
+def test_committed_writes_reach_the_index(memory_backend, make_tour, db):
+    tour = make_tour(title="Mezquita evening walk", city="Córdoba")
+    assert str(tour.id) in memory_backend.search("mezquita")
+
+    tour.title = "Patios of Córdoba"
+    db.commit()
+    assert str(tour.id) not in memory_backend.search("mezquita")
+    assert str(tour.id) in memory_backend.search("patios")
+
+    tour_id = str(tour.id)
+    db.delete(tour)
+    db.commit()
+    assert tour_id not in memory_backend.search("patios")
+
+def test_rolled_back_writes_leave_no_entry(memory_backend, make_user, db):
+    guide = make_user()
+    db.add(Tour(guide_id=guide.id, title="Phantom catacombs", city="Sevilla", country="Spain", category="History"))
+    db.flush()
+    db.rollback()
+    assert memory_backend.search("catacombs") == {}
+
+def test_stale_index_reloads_writes_from_other_processes(memory_backend, make_user, monkeypatch, db):
+    guide = make_user()
+    # Core INSERT: no ORM events, like a write made by another worker
+    db.execute(insert(Tour).values(
+        guide_id=guide.id, title="Lighthouse trail", city="A Coruña", country="Spain", category="Nature"
+    ))
+    db.commit()
+    assert memory_backend.search("lighthouse") == {}
+
+    monkeypatch.setattr(settings, "search_memory_index_ttl_seconds", 0.0)
+    build_tour_search(db, "lighthouse")
+    assert len(memory_backend.search("lighthouse")) == 1
+
+def test_search_route_ranks_with_the_memory_index(memory_backend, make_tour, client):
+    best = make_tour(title="Giralda tower climb", city="Sevilla")
+    other = make_tour(title="Triana ceramics", description="View of the Giralda from the river", city="Sevilla")
+    response = client.get("/tours/", params={"search_query": "giralda", "sort_by": "relevance"})
+    assert response.status_code == 200
+    ids = [item["id"] for item in response.json()["items"]]
+    assert ids[:2] == [str(best.id), str(other.id)]
@@ -0,0 +1,62 @@
+import io
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from app.core.body_limit import BodySizeLimitMiddleware
+from app.models.user import UserRole
+from app.services import file_service
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=1024)
+    received = []
+
+    @app.post("/upload")
+    def upload(file: UploadFile = File(...)):
+        received.append(file.filename)
+        return {"size": len(file.file.read())}
+
+    with TestClient(app) as client:
+        client.received = received
+        yield client
+
+def test_body_within_the_limit_is_accepted(limited_client):
+    response = limited_client.post("/upload", files={"file": ("a.bin", b"x" * 500)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 500}
+
+def test_declared_content_length_over_the_limit_is_refused_unread(limited_client):
+    response = limited_client.post("/upload", files={"file": ("a.bin", b"x" * 5000)})
+    assert response.status_code == 413
+    assert limited_client.received == []
+
+def test_streamed_body_over_the_limit_is_refused(limited_client):
+    # No Content-Length: the body arrives chunked and is counted as it comes in
+    def chunks():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.bin\"\r\n\r\n"
+        for _ in range(10):
+            yield b"x" * 512
+        yield b"\r\n--b--\r\n"
+
+    response = limited_client.post("/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert limited_client.received == []
+
+def test_file_over_its_type_limit_is_refused_before_storage(client, make_user, db, monkeypatch, auth_headers):
+    monkeypatch.setattr(file_service, "MAX_FILE_SIZE", 1024)
+    stored = []
+    monkeypatch.setattr(file_service, "upload_file_to_storage", lambda *args, **kwargs: stored.append(args))
+    guide = make_user(UserRole.GUIDE)
+    tour_id = client.post(
+        "/tours/", json={"title": "KML", "city": "Sevilla", "country": "Spain", "category": "History"},
+        headers=auth_headers(guide)
+    ).json()["id"]
+
+    response = client.post(
+        f"/tours/{tour_id}/kml",
+        files={"file": ("route.kml", io.BytesIO(b"<kml>" + b" " * 2048 + b"</kml>"), "application/vnd.google-earth.kml+xml")},
+        headers=auth_headers(guide)
+    )
+    assert response.status_code == 413
+    assert stored == []